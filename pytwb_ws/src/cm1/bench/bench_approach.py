@@ -0,0 +1,61 @@
+#
+## approach_action: continuous trapezoidal approach against the former
+## mini_walk stop-and-go loop on a simulated base with odometry, both cruising
+## at SPEED (the approach_action default), high_speed=True added for reference
+##   python3 bench/bench_approach.py
+#
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cm1'))
+from lib.controllib import TrapezoidProfile, UnicyclePlant
+
+SPEED = 0.1
+HIGH_SPEED = 0.2
+RATE = 20
+LOOKUP = 0.05  # TF lookup latency per step of the former loop (sec)
+THRESHOLD = 0.95
+LIMIT = 120.0
+
+# former loop: mini_walk(5) = 0.1 m/s for 0.5 sec, stop, look up TF again
+def stop_and_go(start, plant):
+    distance = start
+    while plant.time < LIMIT:
+        if distance < THRESHOLD:
+            break
+        plant.command(SPEED, 0.0)
+        plant.step(0.5)
+        plant.command(0.0, 0.0)
+        plant.step(LOOKUP)
+        distance = start - plant.odom
+    plant.command(0.0, 0.0)
+    plant.step(1.0)  # let the base come to rest
+    return plant.time - 1.0, start - plant.odom
+
+def continuous(start, plant, speed=SPEED):
+    profile = TrapezoidProfile(speed, 0.4, 0.4, lag=1.0/RATE + 0.1)
+    dt = 1.0 / RATE
+    while plant.time < LIMIT:
+        speed = profile.step(start - plant.odom - THRESHOLD, dt)
+        plant.command(speed, 0.0)
+        if speed == 0.0:
+            break
+        plant.step(dt)
+    t = plant.time
+    plant.step(1.0)
+    return t, start - plant.odom
+
+def main():
+    ok = True
+    print(f'{"start(m)":>8s} | {"stop-and-go time(s) final(m)":>30s} | {"continuous time(s) final(m)":>30s}'
+          f' | {"high_speed time(s) final(m)":>30s}')
+    for start in (1.1, 1.5, 2.0, 3.0):
+        t0, d0 = stop_and_go(start, UnicyclePlant())
+        t1, d1 = continuous(start, UnicyclePlant())
+        t2, d2 = continuous(start, UnicyclePlant(), HIGH_SPEED)
+        ok = ok and abs(d1 - THRESHOLD) < 0.01 and abs(d2 - THRESHOLD) < 0.01
+        print(f'{start:8.2f} | {t0:19.2f} {d0:10.3f} | {t1:19.2f} {d1:10.3f} | {t2:19.2f} {d2:10.3f}')
+    return ok
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
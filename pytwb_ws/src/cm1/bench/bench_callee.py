@@ -0,0 +1,139 @@
+#
+## ActorBT callee execution: per step overhead of CalleeSequence against the
+## former pop(0) SharedData, plus parallel groups, deadlines and cancellation
+##   python3 bench/bench_callee.py
+#
+import os
+import sys
+import threading
+from time import perf_counter, sleep
+
+import py_trees
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cm1'))
+from lib.calleelib import CalleeSequence, Call, Parallel
+from lib.motionlib import TOKEN_ACTOR
+
+Status = py_trees.common.Status
+STEPS = 10
+REPEAT = 2000
+
+# former lib/actor_bt.SharedData with the runner passed in
+class LegacySharedData:
+    def __init__(self, runner) -> None:
+        self.runner = runner
+        self.sem = threading.Semaphore()
+        self.callee = []
+        self.status = Status.INVALID
+
+    def set_callee(self, callee):
+        with self.sem:
+            self.callee = callee
+
+    def execute(self):
+        type, args = self.callee.pop(0)
+        if not args: args = ()
+        self.runner(type, self.actor_callback, *args)
+
+    def actor_callback(self, result):
+        has_next = False
+        with self.sem:
+            if len(self.callee) == 0:
+                if result == False:
+                    self.status = Status.FAILURE
+                else:
+                    self.status = Status.SUCCESS
+            else:
+                has_next = True
+        if has_next:
+            self.execute()
+
+    def get_status(self):
+        with self.sem:
+            ret = self.status
+        return ret
+
+    def initialise(self):
+        with self.sem:
+            self.status = Status.RUNNING
+        self.execute()
+
+# actor finishing at once in the caller thread
+def immediate(type, callback, *args):
+    callback(True)
+
+# actor finishing after the given seconds in its own thread
+def delayed(durations, log):
+    def runner(type, callback, *args):
+        if type == TOKEN_ACTOR:
+            # actor run as the motion of a token
+            _, type, *args = args
+        log.append(type)
+        threading.Timer(durations.get(type, 0.0), callback, (durations.get(type + '.result', True),)).start()
+    return runner
+
+def wait(shared, limit=5.0):
+    start = perf_counter()
+    while shared.get_status() == Status.RUNNING and perf_counter() - start < limit:
+        sleep(0.001)
+    return shared.get_status(), perf_counter() - start
+
+def overhead(make):
+    callee = [('a%d' % i, (i,)) for i in range(STEPS)]
+    start = perf_counter()
+    for _ in range(REPEAT):
+        shared = make()
+        shared.set_callee(list(callee))
+        shared.initialise()
+        assert shared.get_status() == Status.SUCCESS
+    return (perf_counter() - start) / (REPEAT * STEPS) * 1e6
+
+def main():
+    ok = True
+    legacy = overhead(lambda: LegacySharedData(immediate))
+    new = overhead(lambda: CalleeSequence(immediate))
+    print(f'sequence overhead per step: legacy {legacy:.1f}us, CalleeSequence {new:.1f}us')
+
+    durations = {'open': 0.2, 'home': 0.3}
+    log = []
+    s = CalleeSequence(delayed(durations, log))
+    s.set_callee([('open', None), ('home', None)])
+    s.initialise()
+    _, sequential = wait(s)
+    s = CalleeSequence(delayed(durations, log))
+    s.set_callee([Parallel(Call('open'), Call('home', key='home_result'))])
+    s.initialise()
+    status, parallel = wait(s)
+    ok = ok and status == Status.SUCCESS and s.take_results() == {'home_result': True}
+    print(f'open then home {sequential:.2f}s, open with home {parallel:.2f}s')
+
+    # deadline: the slow actor is abandoned and its cancel actor started
+    log.clear()
+    s = CalleeSequence(delayed({'move': 1.0}, log))
+    s.set_callee([Call('move', timeout=0.1, cancel='cancel_arm')])
+    s.initialise()
+    status, waited = wait(s)
+    ok = ok and status == Status.FAILURE and 'cancel_arm' in log
+    print(f'deadline 0.1s: {status.name} after {waited:.2f}s, started {log}')
+
+    # failure of one call in a group cancels the other
+    log.clear()
+    s = CalleeSequence(delayed({'open': 0.05, 'open.result': False, 'home': 1.0}, log))
+    s.set_callee([Parallel(Call('open'), Call('home', cancel='cancel_arm')), ('never', None)])
+    s.initialise()
+    status, waited = wait(s)
+    ok = ok and status == Status.FAILURE and 'cancel_arm' in log and 'never' not in log
+    print(f'group failure: {status.name} after {waited:.2f}s, started {log}')
+
+    # result passing and preemption
+    log.clear()
+    s = CalleeSequence(delayed({'first': 0.01, 'first.result': (1, 2), 'second': 1.0}, log))
+    s.set_callee([('first', None), Call('second', lambda r: (*r, 3), cancel='cancel_base')])
+    s.initialise()
+    sleep(0.1)
+    ok = ok and s.cancel() and 'cancel_base' in log
+    print(f'preempted: {s.get_status().name}, started {log}')
+    return 0 if ok else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+#
+## CognitiveNetwork.register_flist: voxel hash clustering against the former linear scan
+##   python3 bench/bench_cluster.py [num_observations]
+#
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cm1'))
+from lib.pointlib import PointEx, PointBag, PointCluster
+from lib.transformlib import RigidTransform
+
+# former implementation, kept as reference
+def linear_register(cand_points, point):
+    cand = None
+    min_d = 0.01
+    for found in cand_points:
+        d = (found.x-point.x)**2 + (found.y-point.y)**2 + (found.z-point.z)**2
+        if d >= min_d: continue
+        cand = found
+        min_d = d
+    if not cand:
+        cand = PointBag(point)
+        cand_points.append(cand)
+    else:
+        cand.append(point)
+    return cand
+
+def linear_best(cand_points):
+    max_count = 0
+    target = None
+    for c in cand_points:
+        if c.count > max_count:
+            target = c
+            max_count = c.count
+    return target
+
+def observations(num, objects=40, noise=0.01, outliers=0.3):
+    random.seed(0)
+    identity = RigidTransform()
+    centers = [(random.uniform(-2, 6), random.uniform(-2, 4), random.uniform(0, 1)) for _ in range(objects)]
+    ret = []
+    for _ in range(num):
+        if random.random() < outliers:
+            p = PointEx(random.uniform(-2, 6), random.uniform(-2, 4), random.uniform(0, 1))
+        else:
+            cx, cy, cz = random.choice(centers)
+            p = PointEx(random.gauss(cx, noise), random.gauss(cy, noise), random.gauss(cz, noise))
+        p.setTransform(None, identity)
+        ret.append(p)
+    return ret
+
+def assignments(bags, joined):
+    # cluster index of every observation, clusters numbered by creation
+    index = {id(b): i for i, b in enumerate(bags)}
+    return [index[id(b)] for b in joined]
+
+def main(num=10000):
+    points = observations(num)
+
+    t0 = time.perf_counter()
+    cand_points = []
+    linear_joined = []
+    for p in points:
+        linear_joined.append(linear_register(cand_points, p))
+        ref = linear_best(cand_points)
+    t_linear = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    cluster = PointCluster(0.1)
+    hash_joined = []
+    for p in points:
+        hash_joined.append(cluster.append(p))
+        best = cluster.best
+    t_hash = time.perf_counter() - t0
+
+    same = assignments(cand_points, linear_joined) == assignments(cluster.bags, hash_joined)
+    same = same and all(a.count == b.count and (a.x, a.y, a.z) == (b.x, b.y, b.z)
+                        for a, b in zip(cand_points, cluster.bags))
+
+    print(f'observations: {num}, clusters: {len(cluster)} (linear {len(cand_points)})')
+    print(f'linear: {t_linear/num*1e6:9.2f} us/observation')
+    print(f'hash  : {t_hash/num*1e6:9.2f} us/observation')
+    print(f'best  : linear count {ref.count} at ({ref.x:.3f}, {ref.y:.3f}), '
+          f'hash count {best.count} at ({best.x:.3f}, {best.y:.3f})')
+    print(f'assignment: {"identical" if same else "DIFFERENT"}')
+    return same and ref.count == best.count
+
+if __name__ == '__main__':
+    ok = main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000)
+    sys.exit(0 if ok else 1)
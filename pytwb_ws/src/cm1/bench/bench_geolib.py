@@ -0,0 +1,128 @@
+#
+## geolib.get_approach_pose: numpy engine against the former sympy solver
+##   python3 bench/bench_geolib.py [num_targets]
+#
+import math
+import os
+import random
+import sys
+import time
+
+from sympy import Point, Circle, Line, Segment, Symbol, solve
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cm1'))
+from lib.geolib import get_approach_pose, get_approach_poses, get_pose, approach_hint, approach_poses
+
+# former implementation, kept as reference
+def sympy_approach_pose(region, point, current):
+    if not isinstance(point, Point):
+        point = Point(float(point.x), float(point.y))
+    current_point = Point(float(current.translation.x), float(current.translation.y))
+    near_boundaries = region.get_near_boundaries(point, thresh=0.5)
+    points = 0
+    i_x = 0.0
+    i_y = 0.0
+    if near_boundaries:
+        for b in near_boundaries:
+            for ip in b[1].segment.intersect(Circle(point, 1)):
+                i_x += ip.x
+                i_y += ip.y
+                points += 1
+        i_x /= points
+        i_y /= points
+    if points <= 0:
+        approach_line = Line(point, current_point)
+    else:
+        approach_line = Line(point, Point(i_x, i_y))
+    t = Symbol("t")
+    px = approach_line.arbitrary_point(parameter=t)
+    f = solve(approach_line.p1.distance(px)-0.6, t)
+    first = True
+    for cand_t in f:
+        cand = px.subs(t, cand_t).evalf()
+        d = float(current_point.distance(cand))
+        if first:
+            first = False
+            min_distance = d
+            pos = cand
+        elif d < min_distance:
+            min_distance = d
+            pos = cand
+    return get_pose(pos, point)
+
+# stand-ins for vector_map region, boundary and ROS transform
+class _Attr:
+    def __init__(self, **kw):
+        self.__dict__.update(kw)
+
+class BoxRegion:
+    def __init__(self, x0=-2.0, y0=-2.0, x1=6.0, y1=4.0):
+        corners = [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+        self.boundaries = [
+            _Attr(segment=Segment(Point(*corners[i]), Point(*corners[(i+1) % 4])))
+            for i in range(4)]
+
+    def get_near_boundaries(self, point, thresh=0.5):
+        ret = []
+        for b in self.boundaries:
+            d = float(b.segment.distance(point))
+            if d < thresh:
+                ret.append((d, b))
+        return ret
+
+def transform(x, y):
+    return _Attr(translation=_Attr(x=x, y=y, z=0.0))
+
+def main(num=50):
+    random.seed(0)
+    region = BoxRegion()
+    targets = []
+    currents = []
+    for i in range(num):
+        # every other target lies close to a wall to exercise the boundary path
+        if i % 2:
+            tx, ty = random.uniform(-1.8, 5.8), random.choice((-1.7, 3.7))
+        else:
+            tx, ty = random.uniform(-1.0, 5.0), random.uniform(-1.0, 3.0)
+        targets.append(_Attr(x=tx, y=ty))
+        currents.append(transform(random.uniform(-1.5, 5.5), random.uniform(-1.5, 3.5)))
+
+    t0 = time.perf_counter()
+    ref = [sympy_approach_pose(region, p, c) for p, c in zip(targets, currents)]
+    t_sympy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    new = [get_approach_pose(region, p, c) for p, c in zip(targets, currents)]
+    t_numpy = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    batch, _ = get_approach_poses(region, targets, currents)
+    t_batch = time.perf_counter() - t0
+
+    # split of the batch: boundary query of the region (sympy) and numpy geometry
+    points = [(p.x, p.y) for p in targets]
+    cur = [(c.translation.x, c.translation.y) for c in currents]
+    t0 = time.perf_counter()
+    hints = [approach_hint(region, p) for p in points]
+    t_query = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    approach_poses(points, cur, hints)
+    t_geometry = time.perf_counter() - t0
+
+    err = 0.0
+    for r, n, b in zip(ref, new, batch):
+        err = max(err, abs(r[0]-n[0]), abs(r[1]-n[1]), abs(r[0]-b[0]), abs(r[1]-b[1]))
+        da = (r[2] - n[2] + math.pi) % (2 * math.pi) - math.pi
+        err = max(err, abs(da))
+    print(f'targets: {num}')
+    print(f'sympy : {t_sympy/num*1e3:9.3f} ms/pose')
+    print(f'numpy : {t_numpy/num*1e3:9.3f} ms/pose')
+    print(f'batch : {t_batch/num*1e3:9.3f} ms/pose')
+    print(f'  region query (sympy in get_near_boundaries): {t_query/num*1e3:9.3f} ms/pose')
+    print(f'  numpy geometry                             : {t_geometry/num*1e3:9.3f} ms/pose')
+    print(f'max abs difference: {err:.3e}')
+    return err < 1e-9
+
+if __name__ == '__main__':
+    ok = main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,64 @@
+#
+## match_angle_goal/face_body_goal: convergence of the PI heading controller
+## against the former bang-bang mini_turn loop on a simulated unicycle base
+##   python3 bench/bench_heading.py
+#
+import math
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cm1'))
+from lib.controllib import HeadingController, UnicyclePlant, wrap_angle
+
+TURN = 1.0
+RATE = 20
+LOOKUP = 0.05  # pose lookup latency per iteration (sec)
+LIMIT = 60.0  # simulated time limit (sec)
+
+# former loop: mini_turn(±5) = full speed turn for 0.5 sec, stop, look up pose again
+def bang_bang(goal, plant):
+    overshoot = 0.0
+    sign = math.copysign(1.0, wrap_angle(goal - plant.theta))
+    while plant.time < LIMIT:
+        plant.step(LOOKUP)
+        err = wrap_angle(goal - plant.theta)
+        overshoot = max(overshoot, -sign * err)
+        if abs(err) < 0.02:
+            plant.command(0.0, 0.0)
+            return plant.time, overshoot, True
+        plant.command(0.0, TURN if err > 0 else -TURN)
+        plant.step(0.5)
+        plant.command(0.0, 0.0)
+    return plant.time, overshoot, False
+
+def closed_loop(goal, plant):
+    controller = HeadingController(max_rate=TURN)
+    dt = 1.0 / RATE
+    overshoot = 0.0
+    sign = math.copysign(1.0, wrap_angle(goal - plant.theta))
+    while plant.time < LIMIT:
+        err = wrap_angle(goal - plant.theta)
+        overshoot = max(overshoot, -sign * err)
+        rate = controller.step(err, dt)
+        if controller.settled:
+            plant.command(0.0, 0.0)
+            return plant.time, overshoot, True
+        plant.command(0.0, rate)
+        plant.step(dt)
+    return plant.time, overshoot, False
+
+def main():
+    ok = True
+    print(f'{"error(deg)":>10s} | {"bang-bang time(s) overshoot(deg)":>34s} | {"PI time(s) overshoot(deg)":>28s}')
+    for deg in (5, 20, 45, 90, 135, 179):
+        goal = math.radians(deg)
+        t0, o0, c0 = bang_bang(goal, UnicyclePlant())
+        t1, o1, c1 = closed_loop(goal, UnicyclePlant())
+        ok = ok and c1
+        r0 = f'{t0:8.2f} {math.degrees(o0):8.2f}' + ('' if c0 else ' (no conv.)')
+        r1 = f'{t1:8.2f} {math.degrees(o1):8.2f}'
+        print(f'{deg:10d} | {r0:>34s} | {r1:>28s}')
+    return ok
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
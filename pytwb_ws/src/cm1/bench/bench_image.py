@@ -0,0 +1,76 @@
+#
+## sensor_msgs/Image to ndarray, zero-copy view against a copying decode (CvBridge)
+##   python3 bench/bench_image.py [seconds]
+##   frames of 1280x720 are fed at 30 Hz
+#
+import array
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cm1'))
+from lib.imagelib import decode_image, decode_depth
+
+WIDTH = 1280
+HEIGHT = 720
+RATE = 30
+
+# stand-in for sensor_msgs/Image as delivered by rclpy
+class _Attr:
+    def __init__(self, **kw):
+        self.__dict__.update(kw)
+
+def fake_image(encoding, dtype, channels, seq=0):
+    data = np.random.default_rng(seq).integers(0, 255, HEIGHT * WIDTH * channels * np.dtype(dtype).itemsize, dtype=np.uint8)
+    return _Attr(
+        header=_Attr(stamp=_Attr(sec=seq // RATE, nanosec=(seq % RATE) * (10**9 // RATE))),
+        height=HEIGHT, width=WIDTH, encoding=encoding, is_bigendian=0,
+        step=WIDTH * channels * np.dtype(dtype).itemsize,
+        data=array.array('B', data.tobytes()))
+
+def copy_decode(msg, desired=None):
+    try:
+        from cv_bridge import CvBridge
+    except ImportError:
+        # equivalent of CvBridge.imgmsg_to_cv2: copy into a new array
+        image = np.array(decode_image(msg))
+        if desired and desired != msg.encoding:
+            image = image[..., ::-1].copy()
+        return image
+    return CvBridge().imgmsg_to_cv2(msg, desired or 'passthrough')
+
+def run(name, decode, msgs, seconds):
+    frames = seconds * RATE
+    wall = 0.0
+    cpu0 = time.process_time()
+    for i in range(frames):
+        msg = msgs[i % len(msgs)]
+        t0 = time.perf_counter()
+        image = decode(msg)
+        # touch the data as a consumer would
+        image[HEIGHT // 2, WIDTH // 2]
+        wall += time.perf_counter() - t0
+    cpu = time.process_time() - cpu0
+    print(f'{name:24s}: latency {wall/frames*1e3:7.3f} ms/frame, '
+          f'cpu at {RATE} Hz {cpu/seconds*100:6.2f} %')
+
+def main(seconds=10):
+    bgr = [fake_image('bgr8', np.uint8, 3, i) for i in range(3)]
+    rgb = [fake_image('rgb8', np.uint8, 3, i) for i in range(3)]
+    depth = [fake_image('32FC1', np.float32, 1, i) for i in range(3)]
+    depth16 = [fake_image('16UC1', np.uint16, 1, i) for i in range(3)]
+    run('bgr8 copy', lambda m: copy_decode(m, 'bgr8'), bgr, seconds)
+    run('bgr8 view', lambda m: decode_image(m, 'bgr8'), bgr, seconds)
+    run('rgb8->bgr8 copy', lambda m: copy_decode(m, 'bgr8'), rgb, seconds)
+    run('rgb8->bgr8 cvtColor', lambda m: decode_image(m, 'bgr8'), rgb, seconds)
+    run('32FC1 copy', copy_decode, depth, seconds)
+    run('32FC1 view', decode_depth, depth, seconds)
+    run('16UC1 scaled', decode_depth, depth16, seconds)
+    v = decode_image(bgr[0], 'bgr8')
+    return (not v.flags.writeable) and np.array_equal(v, copy_decode(bgr[0], 'bgr8'))
+
+if __name__ == '__main__':
+    ok = main(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,67 @@
+#
+## simlib.find_coke: frames/s of the former three pass segmentation, the mask
+## moments version and the ROI tracker on 1280x720 frames
+##   python3 bench/bench_simlib.py [frames]
+#
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cm1'))
+from lib.simlib import find_coke, ColorTracker
+
+WIDTH = 1280
+HEIGHT = 720
+
+# former implementation, kept as reference
+def find_coke_3pass(image):
+    hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+    color_min = np.array([150,100, 50])
+    color_max = np.array([180,255,255])
+    color_mask = cv2.inRange(hsv_image, color_min, color_max)
+    cv_image2 = cv2.bitwise_and(image, image, mask=color_mask)
+    gray_image2 = cv2.cvtColor(cv_image2, cv2.COLOR_BGR2GRAY)
+    mu = cv2.moments(gray_image2, True)
+    if mu["m00"] == 0:
+        return None
+    return (int(mu["m10"]/mu["m00"]), int(mu["m01"]/mu["m00"]))
+
+# grey noisy background with a red can drifting across
+def frames(num):
+    rng = np.random.default_rng(0)
+    base = np.repeat(rng.integers(60, 120, (HEIGHT, WIDTH, 1), dtype=np.uint8), 3, axis=2)
+    ret = []
+    for i in range(num):
+        image = base.copy()
+        cx = 300 + (i * 7) % 600
+        cy = 360 + int(40 * np.sin(i / 10))
+        cv2.circle(image, (cx, cy), 30, (40, 20, 200), -1)
+        ret.append(image)
+    return ret
+
+def run(name, find, images):
+    t0 = time.perf_counter()
+    result = [find(image) for image in images]
+    t = time.perf_counter() - t0
+    print(f'{name:22s}: {len(images)/t:8.1f} frames/s')
+    return result
+
+def main(num=200):
+    images = frames(num)
+    ref = run('3 pass (former)', find_coke_3pass, images)
+    new = run('mask moments', find_coke, images)
+    tracker = ColorTracker()
+    roi = run('ROI tracker', tracker.find, images)
+    print(f'  ROI hits {tracker.roi_hits}, full scans {tracker.full_scans}')
+    half = run('ROI tracker 1/2 scale', ColorTracker(scale=0.5).find, images)
+    err = max(max(abs(a[0]-b[0]), abs(a[1]-b[1])) for a, b in zip(ref, roi))
+    err_half = max(max(abs(a[0]-b[0]), abs(a[1]-b[1])) for a, b in zip(ref, half))
+    print(f'max center difference: roi {err} px, 1/2 scale {err_half} px')
+    return ref == new and err <= 1
+
+if __name__ == '__main__':
+    ok = main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,279 @@
+#
+## micro-benchmarks of the hot paths in lib/ against a saved baseline
+##   python3 bench/bench_suite.py              compare with bench/baseline.json
+##   python3 bench/bench_suite.py --save       record the baseline of this machine
+##   python3 bench/bench_suite.py -k find_coke only the cases containing the word
+## times are normalised by a pure Python calibration loop, so a baseline taken
+## on another machine still flags regressions; exit status 1 on a regression
+#
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import timeit
+
+import numpy as np
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'cm1'))
+from lib.cameralib import pix_to_coordinate
+from lib.detectionlib import DetectionBatch
+from lib.geolib import get_approach_pose
+from lib.pointlib import PointEx, PointBag, PointCluster
+from lib.simlib import find_coke, ColorTracker
+from lib.transformlib import RigidTransform
+
+from bench_cluster import observations
+from bench_geolib import BoxRegion, transform, _Attr
+from bench_simlib import frames, WIDTH
+
+BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+THRESHOLD = 1.5  # normalised time over baseline regarded as a regression
+MIN_TIME = 0.2  # seconds of one measurement
+REPEAT = 7  # measurements per case, the fastest is kept
+
+CASES = []
+
+def case(name):
+    """
+    register setup() -> (function, calls per function run)
+    """
+    def register(setup):
+        CASES.append((name, setup))
+        return setup
+    return register
+
+#
+## fake ROS messages
+#
+def fake_transform(x, y, yaw):
+    return _Attr(translation=_Attr(x=x, y=y, z=0.0),
+                 rotation=_Attr(x=0.0, y=0.0, z=math.sin(yaw / 2), w=math.cos(yaw / 2)))
+
+class NumericRegion:
+    # BoxRegion with float segments and a plain distance query, no sympy,
+    # so the case times geolib and not the stand-in of vector_map
+    def __init__(self, region):
+        self.boundaries = []
+        for b in region.boundaries:
+            p1, p2 = b.segment.p1, b.segment.p2
+            self.boundaries.append(_Attr(segment=_Attr(
+                p1=_Attr(x=float(p1.x), y=float(p1.y)), p2=_Attr(x=float(p2.x), y=float(p2.y)))))
+
+    def get_near_boundaries(self, point, thresh=0.5):
+        px, py = float(point.x), float(point.y)
+        ret = []
+        for b in self.boundaries:
+            p1, p2 = b.segment.p1, b.segment.p2
+            dx, dy = p2.x - p1.x, p2.y - p1.y
+            t = min(1.0, max(0.0, ((px - p1.x) * dx + (py - p1.y) * dy) / (dx * dx + dy * dy)))
+            d = math.hypot(p1.x + t * dx - px, p1.y + t * dy - py)
+            if d < thresh:
+                ret.append((d, b))
+        return ret
+
+def fake_detections(num, seed=0):
+    # vision_msgs/Detection2DArray from the yolov8 node (letterbox coordinates)
+    rng = random.Random(seed)
+    dets = []
+    for _ in range(num):
+        dets.append(_Attr(
+            bbox=_Attr(center=_Attr(position=_Attr(x=rng.uniform(0, 640), y=rng.uniform(140, 500))),
+                       size_x=rng.uniform(10, 80), size_y=rng.uniform(10, 80)),
+            results=[_Attr(hypothesis=_Attr(class_id=str(rng.randrange(22)), score=rng.random()))]))
+    return _Attr(header=_Attr(stamp=_Attr(sec=1, nanosec=0)), detections=dets)
+
+#
+## cases
+#
+def calibration():
+    # pure Python reference, machine speed
+    def loop():
+        s = 0
+        for i in range(1000):
+            s += i * i
+        return s
+    return loop, 1
+
+def approach_args():
+    random.seed(0)
+    args = []
+    for i in range(10):
+        if i % 2:
+            point = _Attr(x=random.uniform(-1.8, 5.8), y=random.choice((-1.7, 3.7)))
+        else:
+            point = _Attr(x=random.uniform(-1.0, 5.0), y=random.uniform(-1.0, 3.0))
+        args.append((point, transform(random.uniform(-1.5, 5.5), random.uniform(-1.5, 3.5))))
+    return args
+
+@case('geolib.get_approach_pose')
+def approach_pose():
+    region = NumericRegion(BoxRegion())
+    args = approach_args()
+    def run():
+        for point, current in args:
+            get_approach_pose(region, point, current)
+    return run, len(args)
+
+@case('geolib.get_approach_pose sympy region')
+def approach_pose_sympy():
+    # end to end with the sympy boundary query of the vector_map stand-in
+    region = BoxRegion()
+    args = approach_args()
+    def run():
+        for point, current in args:
+            get_approach_pose(region, point, current)
+    return run, len(args)
+
+@case('PointEx.setTransform')
+def set_transform():
+    random.seed(0)
+    trans = fake_transform(1.0, 2.0, 0.3)
+    points = [PointEx(random.uniform(0, 2), random.uniform(-1, 1), 0.5) for _ in range(100)]
+    def run():
+        for p in points:
+            p.setTransform(trans)
+    return run, len(points)
+
+@case('PointEx.setTransform shared')
+def set_transform_shared():
+    random.seed(0)
+    trans = fake_transform(1.0, 2.0, 0.3)
+    points = [PointEx(random.uniform(0, 2), random.uniform(-1, 1), 0.5) for _ in range(100)]
+    def run():
+        rigid = RigidTransform.from_msg(trans)
+        for p in points:
+            p.setTransform(trans, rigid)
+    return run, len(points)
+
+@case('PointBag.append')
+def point_bag():
+    points = observations(1000, objects=1, outliers=0.0)
+    def run():
+        bag = PointBag(points[0])
+        for p in points:
+            bag.append(p)
+    return run, len(points)
+
+@case('CognitiveNetwork.register_flist')
+def register_flist():
+    # register_flist is PointCluster.append on the cluster of get_found
+    points = observations(1000)
+    def run():
+        cand_points = PointCluster(0.1)
+        for p in points:
+            cand_points.append(p)
+            cand_points.best
+    return run, len(points)
+
+@case('pix_to_coordinate')
+def pix_coordinate():
+    rng = np.random.default_rng(0)
+    columns = rng.integers(0, WIDTH, 100).tolist()
+    distances = rng.uniform(0.3, 3.0, 100).astype(np.float32).tolist()
+    def run():
+        for pix, distance in zip(columns, distances):
+            pix_to_coordinate(pix, distance, WIDTH)
+    return run, len(columns)
+
+@case('simlib.find_coke 1280x720')
+def coke():
+    images = frames(10)
+    def run():
+        for image in images:
+            find_coke(image)
+    return run, len(images)
+
+@case('simlib.ColorTracker.find 1280x720')
+def coke_tracker():
+    images = frames(10)
+    tracker = ColorTracker()
+    def run():
+        for image in images:
+            tracker.find(image)
+    return run, len(images)
+
+@case('detections_subscriber rescale')
+def rescale():
+    # DetectionBatch.from_msg as called by detections_subscriber, 20 detections
+    msg = fake_detections(20)
+    names = {i: str(i) for i in range(22)}
+    def run():
+        DetectionBatch.from_msg(msg, names, (1280, 720), (640, 640))
+    return run, 1
+
+#
+## runner
+#
+def measure(setup):
+    """
+    return: microseconds per call
+    """
+    func, calls = setup()
+    timer = timeit.Timer(func)
+    number, elapsed = timer.autorange()
+    number = max(1, int(number * MIN_TIME / max(elapsed, 1e-9)))
+    best = min(timer.repeat(REPEAT, number))
+    return best / number / calls * 1e6
+
+def load_baseline(path):
+    if not os.path.isfile(path): return None
+    with open(path) as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description='micro-benchmarks of lib/ against a baseline')
+    parser.add_argument('--save', action='store_true', help='record the results as the baseline')
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('-k', dest='keyword', help='run the cases containing the word only')
+    args = parser.parse_args()
+
+    results = {}
+    calibrations = []
+    for name, setup in CASES:
+        if args.keyword and args.keyword not in name: continue
+        # calibration around every case, the fastest one stands for the machine
+        calibrations.append(measure(calibration))
+        results[name] = measure(setup)
+    calibrations.append(measure(calibration))
+    results = {'calibration': min(calibrations), **results}
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump({'machine': platform.processor() or platform.machine(),
+                       'python': platform.python_version(),
+                       'numpy': np.__version__,
+                       'cases': {k: round(v, 4) for k, v in results.items()}}, f, indent=2)
+            f.write('\n')
+        for name, us in results.items():
+            print(f'{name:40s} {us:12.3f} us')
+        print(f'baseline saved to {args.baseline}')
+        return 0
+
+    baseline = load_baseline(args.baseline)
+    base = baseline['cases'] if baseline else {}
+    # machine speed relative to the baseline
+    scale = results['calibration'] / base['calibration'] if 'calibration' in base else 1.0
+    print(f'{"case":40s} {"us/call":>12s} {"baseline":>12s} {"ratio":>7s}')
+    regressions = []
+    for name, us in results.items():
+        if name == 'calibration' or name not in base:
+            print(f'{name:40s} {us:12.3f} {"-":>12s} {"-":>7s}')
+            continue
+        ratio = us / (base[name] * scale)
+        mark = ''
+        if ratio > args.threshold:
+            mark = ' REGRESSION'
+            regressions.append(name)
+        print(f'{name:40s} {us:12.3f} {base[name]:12.3f} {ratio:7.2f}{mark}')
+    print(f'machine speed against the baseline: {1 / scale:.2f}, threshold {args.threshold:.2f}')
+    if not baseline:
+        print(f'no baseline at {args.baseline}, record one with --save')
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
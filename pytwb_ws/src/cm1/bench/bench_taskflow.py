@@ -0,0 +1,73 @@
+#
+## TaskFlow.demo1: sequential vs resource scheduled concurrent execution
+## of the demo1 steps (lib/flowlib.py) on a stand-in robot whose actors
+## take typical durations
+##   python3 bench/bench_taskflow.py
+#
+import os
+import sys
+from time import sleep
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cm1'))
+from lib.flowlib import ACTOR_RESOURCES, demo1_steps, run_steps
+from lib.schedulelib import ResourceScheduler
+
+SCALE = 0.02  # wall seconds per simulated second
+
+# typical duration of the actors on the robot (sec)
+DURATION = {
+    'goto_pos': 20.0,
+    'match_angle_goal': 3.0,
+    'face_body_goal': 4.0,
+    'back_off': 25.0,
+    'approach_action': 10.0,
+    'home': 4.0,
+    'move_to_pose': 5.0,
+    'open': 2.5,
+    'close': 2.5,
+    'determine_target': 1.0,
+    'trans_camera_coordinates': 0.1,
+    'trans_base_coordinates': 0.05,
+    'add_scene_object': 0.1,
+    'remove_scene_object': 0.1,
+    'wait_scene_object': 0.3,
+    'wait_joints_settled': 0.2,
+}
+
+def stand_in(name, *args, **kwargs):
+    sleep(DURATION.get(name, 0.0) * SCALE)
+    if name == 'determine_target': return ('work', 0.9, 320, 240, 0)
+    if name in ('trans_camera_coordinates', 'trans_base_coordinates', 'get_goal_pos'): return (0.5, 0.0, 0.8)
+    if name == 'euler_to_quat': return [1.0, 0.0, 0.0, 0.0]
+    return True
+
+def conflicts(timeline):
+    # pairs of overlapping tasks sharing a resource
+    found = []
+    for i, (n0, r0, s0, e0) in enumerate(timeline):
+        for n1, r1, s1, e1 in timeline[i+1:]:
+            if set(r0) & set(r1) and s1 < e0 and s0 < e1:
+                found.append((n0, n1))
+    return found
+
+def main():
+    result = {}
+    for concurrent in (False, True):
+        s = ResourceScheduler(stand_in, ACTOR_RESOURCES, concurrent)
+        if not run_steps(demo1_steps, s, 'demo1'):
+            return 1
+        result[concurrent] = s.elapsed() / SCALE
+        bad = conflicts(s.timeline())
+        if bad:
+            print(f'resource conflict: {bad}')
+            return 1
+        if concurrent:
+            print(f'{"actor":>26s} {"resources":>24s} {"start":>7s} {"end":>7s}')
+            for name, res, t0, t1 in s.timeline():
+                print(f'{name:>26s} {",".join(res):>24s} {t0/SCALE:7.2f} {t1/SCALE:7.2f}')
+    print(f'sequential {result[False]:.1f}s, concurrent {result[True]:.1f}s '
+          f'(saved {result[False] - result[True]:.1f}s, {1 - result[True]/result[False]:.0%})')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
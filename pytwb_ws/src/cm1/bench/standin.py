@@ -0,0 +1,515 @@
+#
+## headless stand-in for the Isaac Sim robot: runs the application in the same process
+## with a kinematic base, NavigateToPose, camera/depth/detection streams and a
+## MoveIt2/gripper stub, on a sim clock rate times faster than real time
+## message stamps stay on the ROS wall clock and no node uses sim time: the
+## application takes ages, waits and timeouts from lib/clocklib only
+##   python3 bench/standin.py [--rate 5] [--actor demo2 | --tree task_flow] [--set plan=0.5 ...]
+##   python3 bench/standin.py --check    plants only, without ROS
+##   python3 bench/standin.py --tree task_flow --count    tree nodes only, without ROS
+#
+import argparse
+import ast
+import importlib
+import inspect
+import math
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from threading import Condition, Thread
+
+import numpy as np
+import yaml
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cm1')
+sys.path.insert(0, APP_DIR)
+from lib import clocklib
+from lib.controllib import RateLoop
+from lib.standinlib import STANDIN, StandInRobot, CAMERA_MOUNT
+
+PLANT_RATE = 50  # plant update and odom/tf/joint_states rate (sim Hz)
+CAMERA_RATE = 10  # colour/depth/detection rate (sim Hz)
+MACHINE_RATE = 1  # machine done signal rate while done (sim Hz)
+TICK = 0.1  # behaviour tree tick period (sim sec)
+
+def load_table():
+    with open(os.path.join(APP_DIR, 'lib', 'object_table.yaml')) as f:
+        source = yaml.safe_load(f)
+    return {name: type('obj', (object,), val)() for name, val in source.items()}
+
+def yaw_to_quat(yaw):
+    # (x, y, z, w)
+    return (0.0, 0.0, math.sin(yaw / 2), math.cos(yaw / 2))
+
+def quat_to_yaw(q):
+    return math.atan2(2 * (q.w * q.z + q.x * q.y), 1 - 2 * (q.y * q.y + q.z * q.z))
+
+#
+## factory.xml: composites and @behavior nodes, "[v]" attributes are literals
+#
+def attr_value(text):
+    if text.startswith('['):
+        value = ast.literal_eval(text)
+        return value[0] if len(value) == 1 else value
+    return text
+
+def behaviour_table():
+    for name in sorted(os.listdir(os.path.join(APP_DIR, 'behavior'))):
+        if name.endswith('.py'):
+            importlib.import_module('behavior.' + name[:-3])
+    from lib.tracelib import behaviour_classes
+    return {cls.__name__: cls for cls in behaviour_classes()}
+
+def build_node(elem, table):
+    import py_trees
+    attrs = {k: attr_value(v) for k, v in elem.attrib.items()}
+    name = attrs.pop('name', elem.tag)
+    if elem.tag in ('Sequence', 'Selector', 'Fallback'):
+        children = [build_node(e, table) for e in elem]
+        cls = py_trees.composites.Sequence if elem.tag == 'Sequence' else py_trees.composites.Selector
+        return cls(name, memory=True, children=children)
+    cls = table[elem.tag]
+    if 'node' in inspect.signature(cls.__init__).parameters:
+        attrs['node'] = None
+    return cls(name, **attrs)
+
+def find_tree(path, tree_id):
+    for bt in ET.parse(path).getroot().iter('BehaviorTree'):
+        if bt.get('ID') == tree_id:
+            return bt[0]
+    raise KeyError(f'no BehaviorTree {tree_id} in {path}')
+
+def load_tree(path, tree_id):
+    return build_node(find_tree(path, tree_id), behaviour_table())
+
+#
+## tree nodes without ROS: counts the nodes of the tree and checks every behaviour
+## tag against the classes defined in behavior/*.py, parsed and not imported
+#
+def count_nodes(path, tree_id):
+    defined = set()
+    for name in os.listdir(os.path.join(APP_DIR, 'behavior')):
+        if name.endswith('.py'):
+            with open(os.path.join(APP_DIR, 'behavior', name)) as f:
+                defined.update(node.name for node in ast.walk(ast.parse(f.read())) if isinstance(node, ast.ClassDef))
+    tags = [elem.tag for elem in find_tree(path, tree_id).iter()]
+    missing = sorted({tag for tag in tags if tag not in ('Sequence', 'Selector', 'Fallback') and tag not in defined})
+    print(f'tree {tree_id}: {len(tags)} nodes, {len(set(tags))} kinds')
+    if missing: print(f'no behaviour class for {", ".join(missing)}')
+    return 1 if missing else 0
+
+def run_tree(root):
+    import py_trees
+    tree = py_trees.trees.BehaviourTree(root)
+    tree.setup()
+    while True:
+        tree.tick()
+        if root.status != py_trees.common.Status.RUNNING:
+            return root.status == py_trees.common.Status.SUCCESS
+        clocklib.sleep(TICK)
+
+#
+## plants only: the motions of demo1 without ROS, to check the sim clock
+#
+def check(args, table):
+    robot = StandInRobot(table, [f'joint{i}' for i in range(1, 8)], ['finger1', 'finger2'], [0.04, 0.04], STANDIN)
+    clock = clocklib.CLOCK
+    loop = RateLoop(PLANT_RATE, clock.monotonic, clock.sleep)
+    def until(event):
+        while event not in robot.step(loop.wait()): pass
+    wall0, sim0 = time.monotonic(), clock.monotonic()
+    robot.nav.start(*table['rack_workpiece'].seeable_pos)
+    until('nav')
+    color, depth, boxes = robot.capture()
+    # approach_action stops 0.95m before the workpiece
+    wx, wy, _ = table['rack_workpiece'].pos
+    theta = table['rack_workpiece'].seeable_pos[2]
+    robot.nav.start(wx - 0.95 * math.cos(theta), wy - 0.95 * math.sin(theta), theta)
+    until('nav')
+    robot.arm_move([0.0, -0.5, 0.0, -2.0, 0.0, 1.5, 0.8])
+    until('arm')
+    robot.arm_move()
+    until('arm')
+    robot.gripper_move([0.0, 0.0])
+    until('gripper')
+    robot.nav.start(*table['machining_center'].seeable_pos)
+    until('nav')
+    sim, wall = clock.monotonic() - sim0, time.monotonic() - wall0
+    x, y, theta = robot.base.pose()
+    print(f'detections at the rack: {len(boxes)}, workpiece held: {robot.world.held}')
+    print(f'base at ({x:.2f}, {y:.2f}, {math.degrees(theta):.0f}deg), odometry {robot.base.odom:.1f}m')
+    print(f'sim {sim:.1f}s in wall {wall:.1f}s (x{sim / wall:.1f})')
+    return 0 if boxes and robot.world.held else 1
+
+#
+## ROS side of the stand-in
+#
+def make_node(robot, table):
+    import rclpy
+    from rclpy.node import Node
+    from rclpy.action import ActionServer, CancelResponse, GoalResponse
+    from rclpy.callback_groups import ReentrantCallbackGroup
+    from rclpy.qos import QoSProfile, QoSDurabilityPolicy
+    from std_msgs.msg import Bool, String
+    from geometry_msgs.msg import Twist, TransformStamped
+    from nav_msgs.msg import Odometry
+    from sensor_msgs.msg import Image, JointState
+    from tf2_msgs.msg import TFMessage
+    from vision_msgs.msg import Detection2DArray, Detection2D, ObjectHypothesisWithPose
+    from nav2_msgs.action import NavigateToPose
+    from moveit_msgs.action import MoveGroup, ExecuteTrajectory
+    from moveit_msgs.msg import CollisionObject, MoveItErrorCodes, RobotTrajectory
+    from moveit_msgs.srv import GetPlanningScene, GetMotionPlan
+    from control_msgs.action import FollowJointTrajectory, GripperCommand
+    from trajectory_msgs.msg import JointTrajectoryPoint
+    from lib.actor.system import MACHINE_DONE_TOPIC
+
+    def transform(parent, child, stamp, xyz, quat):
+        t = TransformStamped()
+        t.header.frame_id = parent
+        t.header.stamp = stamp
+        t.child_frame_id = child
+        t.transform.translation.x, t.transform.translation.y, t.transform.translation.z = map(float, xyz)
+        r = t.transform.rotation
+        r.x, r.y, r.z, r.w = map(float, quat)
+        return t
+
+    def image_msg(array, encoding, stamp):
+        msg = Image()
+        msg.header.stamp = stamp
+        msg.header.frame_id = 'camera_color_optical_frame'
+        msg.height, msg.width = array.shape[:2]
+        msg.encoding = encoding
+        msg.step = array.strides[0]
+        msg.data = array.tobytes()
+        return msg
+
+    class StandInNode(Node):
+        def __init__(self):
+            super().__init__('standin')
+            self.robot = robot
+            self.cond = Condition()  # plant state, notified every plant step
+            self.stopped = False
+            cg = ReentrantCallbackGroup()
+            self.odom_pub = self.create_publisher(Odometry, '/odom', 10)
+            self.tf_pub = self.create_publisher(TFMessage, '/tf', 10)
+            latched = QoSProfile(depth=1, durability=QoSDurabilityPolicy.TRANSIENT_LOCAL)
+            self.tf_static_pub = self.create_publisher(TFMessage, '/tf_static', latched)
+            self.joint_pub = self.create_publisher(JointState, '/joint_states', 10)
+            self.color_pub = self.create_publisher(Image, '/camera/color/image_raw', 10)
+            self.depth_pub = self.create_publisher(Image, '/camera/aligned_depth_to_color/image_raw', 10)
+            self.detection_pub = self.create_publisher(Detection2DArray, '/detections_output', 10)
+            self.done_pub = self.create_publisher(Bool, MACHINE_DONE_TOPIC, 10)
+            self.create_subscription(Twist, '/cmd_vel', self.cmd_vel, 10, callback_group=cg)
+            self.create_subscription(CollisionObject, '/collision_object', self.collision_object, 10, callback_group=cg)
+            self.create_subscription(String, '/trajectory_execution_event', self.execution_event, 10, callback_group=cg)
+            accept = dict(goal_callback=lambda _: GoalResponse.ACCEPT,
+                          cancel_callback=lambda _: CancelResponse.ACCEPT, callback_group=cg)
+            self.servers = [
+                ActionServer(self, NavigateToPose, '/navigate_to_pose', self.navigate, **accept),
+                ActionServer(self, MoveGroup, 'move_action', self.move_group, **accept),
+                ActionServer(self, ExecuteTrajectory, 'execute_trajectory', self.execute_trajectory, **accept),
+                ActionServer(self, FollowJointTrajectory, 'panda_arm_controller/follow_joint_trajectory',
+                             self.follow_joint_trajectory, **accept),
+                ActionServer(self, GripperCommand, 'hand_controller/gripper_cmd', self.gripper_command, **accept),
+            ]
+            self.create_service(GetPlanningScene, '/get_planning_scene', self.planning_scene, callback_group=cg)
+            self.create_service(GetMotionPlan, 'plan_kinematic_path', self.motion_plan, callback_group=cg)
+            mx, my, mz = CAMERA_MOUNT
+            stamp = self.get_clock().now().to_msg()
+            self.tf_static_pub.publish(TFMessage(transforms=[
+                transform('map', 'odom', stamp, (0, 0, 0), (0, 0, 0, 1)),
+                transform('base_link', 'camera_link', stamp, (mx, my, mz), (0, 0, 0, 1)),
+                transform('camera_link', 'camera_color_optical_frame', stamp, (0, 0, 0), (-0.5, 0.5, -0.5, 0.5)),
+            ]))
+
+        def start(self):
+            self.threads = [Thread(target=self.plant_loop, daemon=True), Thread(target=self.camera_loop, daemon=True)]
+            for t in self.threads: t.start()
+
+        #
+        ## streams
+        #
+        def plant_loop(self):
+            clock = clocklib.CLOCK
+            loop = RateLoop(PLANT_RATE, clock.monotonic, clock.sleep)
+            dt = loop.period
+            last_done = None
+            while not self.stopped:
+                with self.cond:
+                    robot.step(dt)
+                    x, y, theta = robot.base.pose()
+                    v, w = robot.base.v, robot.base.w
+                    joints = (robot.arm.names + robot.gripper.names,
+                              np.concatenate((robot.arm.positions, robot.gripper.positions)),
+                              np.concatenate((robot.arm.velocity, robot.gripper.velocity)))
+                    done = robot.world.machine_done(robot.now)
+                    self.cond.notify_all()
+                stamp = self.get_clock().now().to_msg()
+                odom = Odometry()
+                odom.header.stamp = stamp
+                odom.header.frame_id = 'odom'
+                odom.child_frame_id = 'base_link'
+                odom.pose.pose.position.x, odom.pose.pose.position.y = float(x), float(y)
+                o = odom.pose.pose.orientation
+                o.x, o.y, o.z, o.w = yaw_to_quat(theta)
+                odom.twist.twist.linear.x, odom.twist.twist.angular.z = float(v), float(w)
+                self.odom_pub.publish(odom)
+                self.tf_pub.publish(TFMessage(transforms=[
+                    transform('odom', 'base_link', stamp, (x, y, 0.0), yaw_to_quat(theta))]))
+                js = JointState()
+                js.header.stamp = stamp
+                js.name, js.position, js.velocity = joints[0], joints[1].tolist(), joints[2].tolist()
+                self.joint_pub.publish(js)
+                if done and (last_done is None or robot.now - last_done >= 1.0 / MACHINE_RATE):
+                    self.done_pub.publish(Bool(data=True))
+                    last_done = robot.now
+                dt = loop.wait()
+
+        def camera_loop(self):
+            clock = clocklib.CLOCK
+            loop = RateLoop(CAMERA_RATE, clock.monotonic, clock.sleep)
+            while not self.stopped:
+                with self.cond:
+                    color, depth, boxes = robot.capture()
+                stamp = self.get_clock().now().to_msg()
+                self.color_pub.publish(image_msg(color, 'bgr8', stamp))
+                self.depth_pub.publish(image_msg(depth, '32FC1', stamp))
+                clock.sleep(robot.param['detection'])
+                msg = Detection2DArray()
+                msg.header.stamp = stamp
+                msg.header.frame_id = 'camera_color_optical_frame'
+                for class_id, score, cx, cy, w, h in boxes:
+                    d = Detection2D()
+                    d.header = msg.header
+                    d.bbox.center.position.x, d.bbox.center.position.y = float(cx), float(cy)
+                    d.bbox.size_x, d.bbox.size_y = float(w), float(h)
+                    hyp = ObjectHypothesisWithPose()
+                    hyp.hypothesis.class_id = str(class_id)
+                    hyp.hypothesis.score = float(score)
+                    d.results.append(hyp)
+                    msg.detections.append(d)
+                self.detection_pub.publish(msg)
+                loop.wait()
+
+        #
+        ## topics in
+        #
+        def cmd_vel(self, msg):
+            with self.cond:
+                # a navigation goal has the base
+                if not robot.nav.active:
+                    robot.base.command(msg.linear.x, msg.angular.z)
+
+        def collision_object(self, msg):
+            with self.cond:
+                robot.scene_update(msg.id, msg.operation in (CollisionObject.ADD, CollisionObject.APPEND))
+
+        def execution_event(self, msg):
+            if msg.data == 'stop':
+                with self.cond:
+                    robot.arm.stop()
+                    robot.gripper.stop()
+
+        #
+        ## actions and services
+        #
+        def wait_motion(self, goal_handle, busy, stop):
+            # True when the motion finished, False when cancelled
+            while True:
+                with self.cond:
+                    if not busy(): return True
+                    if goal_handle.is_cancel_requested:
+                        stop()
+                        goal_handle.canceled()
+                        return False
+                    self.cond.wait(clocklib.wall(0.1))
+
+        def navigate(self, goal_handle):
+            p = goal_handle.request.pose.pose
+            with self.cond:
+                robot.nav.start(p.position.x, p.position.y, quat_to_yaw(p.orientation))
+            if self.wait_motion(goal_handle, lambda: robot.nav.active, robot.nav.cancel):
+                goal_handle.succeed()
+            return NavigateToPose.Result()
+
+        def group_of(self, names):
+            return robot.gripper if set(names) <= set(robot.gripper.names) else robot.arm
+
+        def joint_target(self, group, names, positions):
+            target = group.positions.copy()
+            index = {n: i for i, n in enumerate(group.names)}
+            for n, p in zip(names, positions):
+                if n in index: target[index[n]] = p
+            return target
+
+        def move_group(self, goal_handle):
+            request = goal_handle.request.request
+            target = None
+            names, positions = [], []
+            if request.goal_constraints:
+                jc = request.goal_constraints[0].joint_constraints
+                names = [c.joint_name for c in jc]
+                positions = [c.position for c in jc]
+            with self.cond:
+                if request.group_name == 'hand' or (names and set(names) <= set(robot.gripper.names)):
+                    group = robot.gripper
+                    robot.gripper_move(self.joint_target(group, names, positions))
+                else:
+                    group = robot.arm
+                    if names: target = self.joint_target(group, names, positions)
+                    robot.arm_move(target)
+            result = MoveGroup.Result()
+            result.planning_time = robot.param['plan']
+            if self.wait_motion(goal_handle, lambda: group.busy, group.stop):
+                goal_handle.succeed()
+                result.error_code.val = MoveItErrorCodes.SUCCESS
+            else:
+                result.error_code.val = MoveItErrorCodes.PREEMPTED
+            return result
+
+        def run_trajectory(self, goal_handle, trajectory):
+            if not trajectory.points: return True
+            last = trajectory.points[-1]
+            duration = last.time_from_start.sec + last.time_from_start.nanosec * 1e-9
+            with self.cond:
+                group = self.group_of(trajectory.joint_names)
+                target = self.joint_target(group, trajectory.joint_names, last.positions)
+                if group is robot.gripper:
+                    robot.gripper_move(target)
+                else:
+                    group.move(target, duration, robot.param['joint_speed'])
+            return self.wait_motion(goal_handle, lambda: group.busy, group.stop)
+
+        def execute_trajectory(self, goal_handle):
+            result = ExecuteTrajectory.Result()
+            if self.run_trajectory(goal_handle, goal_handle.request.trajectory.joint_trajectory):
+                goal_handle.succeed()
+                result.error_code.val = MoveItErrorCodes.SUCCESS
+            else:
+                result.error_code.val = MoveItErrorCodes.PREEMPTED
+            return result
+
+        def follow_joint_trajectory(self, goal_handle):
+            result = FollowJointTrajectory.Result()
+            if self.run_trajectory(goal_handle, goal_handle.request.trajectory):
+                goal_handle.succeed()
+            return result
+
+        def gripper_command(self, goal_handle):
+            position = goal_handle.request.command.position
+            with self.cond:
+                robot.gripper_move([position] * len(robot.gripper.names))
+            result = GripperCommand.Result()
+            if self.wait_motion(goal_handle, lambda: robot.gripper.busy, robot.gripper.stop):
+                goal_handle.succeed()
+                result.reached_goal = True
+            with self.cond:
+                result.position = float(robot.gripper.positions[0])
+            return result
+
+        def planning_scene(self, request, response):
+            with self.cond:
+                ids = robot.scene_objects()
+            for object_id in ids:
+                o = CollisionObject()
+                o.id = object_id
+                response.scene.world.collision_objects.append(o)
+            return response
+
+        def motion_plan(self, request, response):
+            # joint goals only, the trajectory runs at the joint speed after planning
+            req = request.motion_plan_request
+            clocklib.sleep(robot.param['plan'])
+            jc = req.goal_constraints[0].joint_constraints if req.goal_constraints else []
+            with self.cond:
+                group = self.group_of([c.joint_name for c in jc]) if jc else robot.arm
+                target = self.joint_target(group, [c.joint_name for c in jc], [c.position for c in jc])
+                start = group.positions.copy()
+            travel = float(np.max(np.abs(target - start))) if len(start) else 0.0
+            duration = max(travel / robot.param['joint_speed'], 0.1)
+            traj = RobotTrajectory()
+            jt = traj.joint_trajectory
+            jt.joint_names = list(group.names)
+            for t, positions in ((0.0, start), (duration, target)):
+                point = JointTrajectoryPoint()
+                point.positions = positions.tolist()
+                point.time_from_start.sec = int(t)
+                point.time_from_start.nanosec = int((t - int(t)) * 1e9)
+                jt.points.append(point)
+            response.motion_plan_response.trajectory = traj
+            response.motion_plan_response.planning_time = robot.param['plan']
+            response.motion_plan_response.group_name = req.group_name
+            response.motion_plan_response.error_code.val = MoveItErrorCodes.SUCCESS
+            return response
+
+    return StandInNode()
+
+def run_app(args, table):
+    import rclpy
+    from rclpy.executors import MultiThreadedExecutor
+    from ros_actor import register_subsystem, run_actor, init_server, init_spin, shutdown_server
+    from lib.actor.system import Melon, joint_names, gripper_joint_names, OPEN_GRIPPER_JOINT_POSITIONS
+
+    robot = StandInRobot(table, joint_names(), gripper_joint_names(), OPEN_GRIPPER_JOINT_POSITIONS, STANDIN)
+    outcome = {'code': 1}
+
+    def scenario():
+        clock = clocklib.CLOCK
+        wall0, sim0 = time.monotonic(), clock.monotonic()
+        if args.tree:
+            ok = run_tree(load_tree(args.tree_file, args.tree))
+            label = f'tree {args.tree}'
+        else:
+            ok = run_actor(args.actor, not args.sequential) is not False
+            label = f'actor {args.actor}'
+        sim, wall = clock.monotonic() - sim0, time.monotonic() - wall0
+        print(f'{label}: {"done" if ok else "failed"} in sim {sim:.1f}s, wall {wall:.1f}s (x{sim / wall:.1f})')
+        print(f'navigation goals {robot.nav.goals}, base odometry {robot.base.odom:.1f}m, '
+              f'arm motions {robot.arm.motions}, gripper motions {robot.gripper.motions}, '
+              f'camera frames {robot.camera.frames}')
+        outcome['code'] = 0 if ok else 1
+        rclpy.try_shutdown()
+
+    def harness_init(node):
+        standin = make_node(robot, table)
+        executor = MultiThreadedExecutor()
+        executor.add_node(standin)
+        Thread(target=executor.spin, daemon=True).start()
+        standin.start()
+        register_subsystem('robot', Melon)
+        init_spin(node)
+        Thread(target=scenario).start()
+
+    init_server(harness_init)
+    shutdown_server()
+    return outcome['code']
+
+def main():
+    parser = argparse.ArgumentParser(description='run the application against the stand-in robot')
+    parser.add_argument('--rate', type=float, default=5.0, help='sim seconds per wall second')
+    parser.add_argument('--actor', default='demo1', help='actor to run (demo1, demo2)')
+    parser.add_argument('--sequential', action='store_true', help='demo actors without concurrent steps')
+    parser.add_argument('--tree', help='BehaviorTree ID to run instead of an actor (task_flow)')
+    parser.add_argument('--tree-file', default=os.path.join(APP_DIR, 'trees', 'factory.xml'))
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help=f'stand-in parameter: {", ".join(STANDIN)}')
+    parser.add_argument('--check', action='store_true', help='plants only, without ROS')
+    parser.add_argument('--count', action='store_true', help='nodes of --tree only, without ROS')
+    args = parser.parse_args()
+    for item in args.set:
+        key, value = item.split('=')
+        if key not in STANDIN: parser.error(f'unknown parameter {key}')
+        STANDIN[key] = float(value)
+    if args.count:
+        if not args.tree: parser.error('--count needs --tree')
+        return count_nodes(args.tree_file, args.tree)
+    clocklib.use(clocklib.SimClock(args.rate))
+    table = load_table()
+    if args.check:
+        return check(args, table)
+    return run_app(args, table)
+
+if __name__ == '__main__':
+    sys.exit(main())
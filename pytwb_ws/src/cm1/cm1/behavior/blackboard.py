@@ -1,6 +1,9 @@
 import py_trees
 from pytwb.common import behavior
 
+from lib.boardlib import BOARD
+from lib.clocklib import monotonic
+
 @behavior
 class SetBlackboard(py_trees.behaviour.Behaviour):
     desc = 'set blackboard a value'
@@ -12,7 +15,7 @@ class SetBlackboard(py_trees.behaviour.Behaviour):
         self.value = value
     
     def initialise(self) -> None:
-        self.bb.set(self.key, self.value)
+        BOARD.set(self.key, self.value)
     
     def update(self):
         return py_trees.common.Status.SUCCESS
@@ -31,4 +34,25 @@ class ShowBlackboard(py_trees.behaviour.Behaviour):
         print(f'{self.key} = {value}')
     
     def update(self):
-        return py_trees.common.Status.SUCCESS
\ No newline at end of file
+        return py_trees.common.Status.SUCCESS
+
+@behavior
+class WaitBlackboard(py_trees.behaviour.Behaviour):
+    desc = 'wait until a value is written to blackboard'
+
+    def __init__(self, name, key, timeout=None):
+        super(WaitBlackboard, self).__init__(name)
+        self.key = key
+        self.timeout = timeout
+        self.sub = None
+
+    def initialise(self) -> None:
+        self.sub = BOARD.subscribe(self.key)
+        self.start = monotonic()
+
+    def update(self):
+        if self.sub.changed():
+            return py_trees.common.Status.SUCCESS
+        if self.timeout and monotonic() - self.start > self.timeout:
+            return py_trees.common.Status.FAILURE
+        return py_trees.common.Status.RUNNING
@@ -1,8 +1,8 @@
 import py_trees
 
 from pytwb.common import behavior
-from lib.actor_bt import ActorBT
-from ros_actor import run_actor
+from lib.actor_bt import ActorBT, Call, Parallel
+from lib.boardlib import BOARD
 
 @behavior
 class Adjust(ActorBT):
@@ -23,10 +23,10 @@ class Pick(ActorBT):
     desc = 'pick object'
 
     def __init__(self, name, node):
+        # the gripper opens while the arm moves to the pick position
         super().__init__(name, 
             (
-                ('open', None),
-                ('pick', None)
+                Parallel(Call('open'), Call('pick', cancel='cancel_arm')),
             )
         )
 
@@ -84,42 +84,32 @@ class PlaceProduct(ActorBT):
 class MoveToPose(ActorBT):
     desc = 'set arm position'
 
+    cancel = 'cancel_arm'
+
     def __init__(self, name, diff, flag):
-        super().__init__(name, diff, flag)
+        super().__init__(name, "move_to_pose", diff, flag)
         self.diff = diff
         self.flag = flag
 
-    def initialise(self):
-        bb = py_trees.blackboard.Blackboard()
-        self.bb = bb
-        base_x = self.bb.get("base_x")
-        base_y = self.bb.get("base_y")
-        base_z = self.bb.get("base_z")
+    def callee(self):
+        base_x, base_y, base_z = BOARD.get("base")
         self.quat_list = [1, 0, 0, 0]
       
         if self.flag:
-            self.quat_list = self.bb.get("quat_list")
+            self.quat_list = list(BOARD.get("quat_list"))
         
-        run_actor("move_to_pose", position=[base_x, base_y, base_z - self.diff], quat_xyzw = self.quat_list)
-
-    def update(self):
-        return py_trees.common.Status.SUCCESS
+        return [("move_to_pose", ([base_x, base_y, base_z - self.diff], self.quat_list))]
 
 @behavior 
 class EulerToQuat(ActorBT):
     desc = 'euler to quat'
 
     def __init__(self, name, roll, pitch, yaw):
-        super().__init__(name, roll, pitch, yaw)
+        super().__init__(name, "euler_to_quat", roll, pitch, yaw)
         self.roll = roll
         self.pitch = pitch
         self.yaw = yaw
     
-    def initialise(self):
-        bb = py_trees.blackboard.Blackboard()
-        self.bb = bb
-        quat_list = run_actor("euler_to_quat", self.roll, self.pitch, self.yaw)
-        bb.set("quat_list", quat_list)
- 
-    def update(self):
+    def done(self, quat_list):
+        BOARD.set("quat_list", quat_list)
         return py_trees.common.Status.SUCCESS
\ No newline at end of file
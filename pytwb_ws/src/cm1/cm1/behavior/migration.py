@@ -1,10 +1,8 @@
-import time
 
 from lib.actor_bt import ActorBT
+from lib.boardlib import BOARD
 from pytwb.common import behavior
-from ros_actor import run_actor
 
-import py_trees
 from threading import Semaphore
 
 @behavior
@@ -14,9 +12,8 @@ class Approach(ActorBT):
     def __init__(self, name, node, target=0.20):
         super().__init__(name, 'approach', target)
     
-    def initialise(self):
-        time.sleep(1)
-        super().initialise()
+    def callee(self):
+        return [('wait_base_stopped', (1,)), ('approach', self.args)]
 
 @behavior
 class Mini_Walk(ActorBT):
@@ -44,44 +41,40 @@ class Face(ActorBT):
 class MatchAngleGoal(ActorBT):
     desc = 'adjust angle to goal'
 
+    cancel = 'cancel_base'
+
     def __init__(self, name, goal="rack_workpiece"):
-        super().__init__(name, goal)
+        super().__init__(name, "match_angle_goal", goal)
         self.goal = goal
 
-    def initialise(self):
-        run_actor("match_angle_goal", self.goal)
-
-    def update(self):
-        return py_trees.common.Status.SUCCESS
-
 @behavior
 class ApproachAction(ActorBT):
     desc = 'approach action'
 
-    def __init__(self, name, flag):
-        super().__init__(name, flag)
+    cancel = 'cancel_base'
 
-    def initialise(self):
-        bb = py_trees.blackboard.Blackboard()
-        self.bb = bb
-        base_x = self.bb.get("base_x")
-        base_y = self.bb.get("base_y")
-        base_z = self.bb.get("base_z")
-        run_actor("approach_action", (base_x, base_y, base_z))
+    def __init__(self, name, flag):
+        super().__init__(name, "approach_action", flag)
 
-    def update(self):
-        return py_trees.common.Status.SUCCESS
+    def callee(self):
+        return [("approach_action", (tuple(BOARD.get("base")),))]
 
 @behavior
 class MiniWalk(ActorBT):
     desc = "mini walk"
+    cancel = 'cancel_base'
 
-    def __init__(self, name, node, time, back, high_speed):
-        super().__init__(name, "mini_walk_times", time, back, high_speed)
+    def __init__(self, name, node, back, high_speed, distance=None, time=None):
+        if distance:
+            # odometry based move by meters in one smooth command
+            super().__init__(name, "drive_distance", -distance if back else distance, high_speed)
+        else:
+            super().__init__(name, "mini_walk_times", time, back, high_speed)
 
 @behavior
 class FaceBodyGoal(ActorBT):
     desc = "Adjust the robot's angle"
+    cancel = 'cancel_base'
 
     def __init__(self, name, node, goal):
         super().__init__(name, "face_body_goal", goal)
\ No newline at end of file
@@ -2,7 +2,7 @@ import py_trees
 
 from pytwb.common import behavior
 from lib.actor_bt import ActorBT
-from ros_actor import run_actor
+from lib.boardlib import BOARD
 
 @behavior
 class GetLocation(py_trees.behaviour.Behaviour):
@@ -23,7 +23,7 @@ class GetLocation(py_trees.behaviour.Behaviour):
             if not target_pose:
                 return py_trees.common.Status.FAILURE
             self.logger.info(f"Selected location x:{target_pose[0]},x:{target_pose[1]}")
-            self.bb.set("target_pose", target_pose)
+            BOARD.set("target_pose", target_pose)
             if self.bb.exists('commander'):
                 self.bb.get('commander').report(self.name, target_pose)
             return py_trees.common.Status.SUCCESS
@@ -37,32 +37,25 @@ class GoToPose(ActorBT):
     
     def __init__(self, name, node):
         super(GoToPose, self).__init__(name, 'navigate')
-        self.bb = py_trees.blackboard.Blackboard()
     
-    def initialise(self):
-        target_pose = None
+    cancel = 'cancel_base'
+
+    def callee(self):
         # Check if there is a pose available in the blackboard
-        if self.bb.exists("target_pose"):
-            target_pose = self.bb.get("target_pose")
-        self.pose = target_pose
+        self.pose = BOARD.get("target_pose")
+        if not self.pose:
+            return []
         x, y, theta = self.pose
         self.logger.info(f"Going to [x: {x}, y: {y}, theta: {theta}] ...")
-        if not target_pose:
-            return
-        self.shared.set_callee([('goto', (x, y, theta))])
-        super().initialise()
+        return [('goto', (x, y, theta))]
     
 
 @behavior
 class GoToPosefromDict(ActorBT):
     desc = "go to pose using dict"
 
-    def __init__(self, name, pos="rack_workpiece"):
-        super().__init__(name, pos)
-        self.pos = pos
-
-    def initialise(self):
-        run_actor("goto_pos", self.pos)
+    cancel = 'cancel_base'
 
-    def update(self):
-        return py_trees.common.Status.SUCCESS
\ No newline at end of file
+    def __init__(self, name, pos="rack_workpiece"):
+        super().__init__(name, "goto_pos", pos)
+        self.pos = pos
\ No newline at end of file
@@ -4,6 +4,7 @@ from sympy import Point
 import py_trees
 from ros_actor import get_value
 from pytwb.common import behavior
+from lib.boardlib import BOARD
 from lib.geolib import get_pose, get_approach_pose
 
 #
@@ -33,15 +34,13 @@ class SetWatchLocations(py_trees.behaviour.Behaviour):
         bb.set("watch_list", pose_list)
 
         # clear glanced_point
-        self.target = None
-        if not self.bb.exists("glanced_point"): return
-        self.target = self.bb.get("glanced_point")
+        self.target = BOARD.get("glanced_point")
         if not self.target: return
-        self.bb.set("glanced_point", None)
+        BOARD.set("glanced_point", None)
         self.logger.info("SetWatchLocations")
 
         # undo target pose list to prepare in case of watch failure
-        target_pose = self.bb.get("target_pose")
+        target_pose = BOARD.get("target_pose")
         pose_list = self.bb.get("pose_list")
         pose_list.insert(0, target_pose)
 
@@ -58,8 +57,8 @@ class SetWatchLocations(py_trees.behaviour.Behaviour):
             print(f'target_pose x:{target_pose[0]}, y:{target_pose[1]}, theta:{math.degrees(target_pose[2])}')
             print(f'target_point x:{float(target_point.x)}, y:{float(target_point.y)}')
         watch_list = []
-        self.bb.set("target_pose", target_pose.copy())
-        self.bb.set("watch_origin", target_pose.copy())
+        BOARD.set("target_pose", target_pose)
+        BOARD.set("watch_origin", target_pose)
         for _ in range(3):
             target_pose[2] += math.pi / 3 * 2
             watch_list.append(target_pose.copy())
@@ -88,7 +87,7 @@ class GetWatchLocation(py_trees.behaviour.Behaviour):
         else:
             target_pose = pose_list.pop(0)
             self.logger.info(f"Selected location x:{target_pose[0]},x:{target_pose[1]}")
-            self.bb.set("target_pose", target_pose)
+            BOARD.set("target_pose", target_pose)
             return py_trees.common.Status.SUCCESS
 
 @behavior
@@ -103,16 +102,15 @@ class GetGlancedLocation(py_trees.behaviour.Behaviour):
     def initialise(self) -> None:
         # clear glanced_point
         self.target = None
-        if not self.bb.exists("glanced_point"): return
-        object_point_bag = self.bb.get("glanced_point")
+        object_point_bag = BOARD.get("glanced_point")
         if not object_point_bag: return
         self.object_point = Point(object_point_bag.x, object_point_bag.y)
-        self.bb.set("glanced_point", None)
-        self.origin = self.bb.get("watch_origin")
+        BOARD.set("glanced_point", None)
+        self.origin = BOARD.get("watch_origin")
         self.observation_point = Point(self.origin[0], self.origin[1])
 
         # undo target pose list to prepare in case of watch failure
-        target_pose = self.bb.get("target_pose")
+        target_pose = BOARD.get("target_pose")
         pose_list = self.bb.get("pose_list")
         pose_list.insert(0, target_pose)
 
@@ -122,7 +120,7 @@ class GetGlancedLocation(py_trees.behaviour.Behaviour):
 
         # calculate pose
         target_pose = get_pose(self.observation_point, self.object_point)
-        self.bb.set("target_pose", target_pose)
+        BOARD.set("target_pose", target_pose)
         return py_trees.common.Status.SUCCESS
 
 @behavior
@@ -134,7 +132,7 @@ class ScheduleDestination(py_trees.behaviour.Behaviour):
         self.bb = py_trees.blackboard.Blackboard()
     
     def update(self):
-        dest = self.bb.get('found_point')
+        dest = BOARD.get('found_point')
         if not dest:
             return py_trees.common.Status.FAILURE
         world = get_value('world')
@@ -143,7 +141,7 @@ class ScheduleDestination(py_trees.behaviour.Behaviour):
 #        dp = Point(dest.x, dest.y)
 #        pp = Point(pose[0], pose[1])
 #        print(f'final target _x:{dest.last_point._x},_y:{dest.last_point._y},dist:{float(dp.distance(pp))}')
-        self.bb.set('target_pose', pose)
+        BOARD.set('target_pose', pose)
         self.logger.info(f'selected target [x: {dest.x}, y: {dest.y}]')
         self.logger.info(f'selected pose [x: {pose[0]}, y: {pose[1]}, theta: {math.degrees(pose[2])}]')
         if self.bb.exists('commander'):
@@ -156,12 +154,11 @@ class GetFoundPoint(py_trees.behaviour.Behaviour):
 
     def __init__(self, name, distance=0.2):
         super(GetFoundPoint, self).__init__(name)
-        self.bb = py_trees.blackboard.Blackboard()
         self.rate = distance / 0.6
     
     def initialise(self) -> None:
-        xs, ys, _ = self.bb.get("target_pose")
-        pb = self.bb.get("found_point") # point_bag
+        xs, ys, _ = BOARD.get("target_pose")
+        pb = BOARD.get("found_point") # point_bag
         xt = pb.x
         yt = pb.y
         l = pb.last_point.distance
@@ -175,7 +172,7 @@ class GetFoundPoint(py_trees.behaviour.Behaviour):
         s_rate = self.rate
         t_rate = 1.0 - self.rate
         dest = (xt*t_rate+xs*s_rate, yt*t_rate+ys*s_rate, theta)
-        self.bb.set('target_pose', dest)
+        BOARD.set('target_pose', dest)
         self.logger.info(f"Selected location x:{float(dest[0])},x:{float(dest[1])},theta:{float(dest[2])}")
 
     def update(self):
@@ -1,9 +1,12 @@
+from itertools import count
+
 import py_trees
 
 from pytwb.common import behavior
 from lib.actor_bt import ActorBT
-from ros_actor import run_actor, run_actor_async
+from ros_actor import run_actor_async
 
+from lib.boardlib import BOARD
 from lib.pointlib import PointEx
 
 @behavior
@@ -49,29 +52,47 @@ class LookForCoke(py_trees.behaviour.Behaviour):
         super(LookForCoke, self).__init__(name)
         self.target = None
         self.node = node
-        self.bb = py_trees.blackboard.Blackboard()
         self.debug = debug
+        self.sub = None
+        self.runs = count(1)
+        self.run = None  # callbacks of an earlier run are ignored
 
     def initialise(self):
-        run_actor_async('object_glance', self.actor_callback)
+        self.target = None
+        # woken by the write of glanced_point instead of checking the detection on every tick
+        self.sub = BOARD.subscribe('glanced_point')
+        self.run = next(self.runs)
+        self.glance(self.run)
         self.logger.info("start looking for coke")
 
+    def glance(self, run):
+        run_actor_async('object_glance', lambda candidate: self.actor_callback(candidate, run))
+
     def update(self):
-        target = self.target
+        if not self.sub.changed():
+            return py_trees.common.Status.RUNNING
+        _, target = self.sub.take()
         if not target:
             return py_trees.common.Status.RUNNING
-        trans = run_actor('map_trans')
-        target.setTransform(trans.transform)
-        self.bb.set('glanced_point', target)
         return py_trees.common.Status.SUCCESS
     
-    def actor_callback(self, candidate):
+    def actor_callback(self, candidate, run):
+        if run != self.run: return
         if not candidate:
             print('LookForCoke call again')
-            run_actor_async('object_glance', self.actor_callback)        
-        self.target = PointEx(candidate)
+            self.glance(run)
+            return
+        target = PointEx(candidate)
+        run_actor_async('map_trans', lambda trans: self.trans_callback(target, trans, run))
+
+    def trans_callback(self, target, trans, run):
+        if run != self.run: return
+        target.setTransform(trans.transform)
+        self.target = target
+        BOARD.set('glanced_point', target)
     
     def terminate(self, new_status):
+        self.run = None
         if self.target:
             self.logger.info(f"found at x:{self.target.x} y:{self.target.y}")
         else:
@@ -89,29 +110,40 @@ class Watch(py_trees.behaviour.Behaviour):
 
     def __init__(self, name, node, debug=False):
         super(Watch, self).__init__(name)
-        self.bb = py_trees.blackboard.Blackboard()
         self.debug = debug
         self.candidate = None
+        self.sub = None
+        self.runs = count(1)
+        self.run = None  # callbacks of an earlier run are ignored
 
     def initialise(self):
         self.running = True
-        run_actor_async('get_found', self.actor_callback, 10, 10)
+        self.candidate = None
+        self.sub = BOARD.subscribe('found_point')
+        run = self.run = next(self.runs)
+        run_actor_async('get_found', lambda point_bag: self.actor_callback(point_bag, run), 10, 10)
         self.logger.info("watching target")
 
     def update(self):
-        if self.candidate:
-            self.bb.set('found_point', self.candidate)
-            return py_trees.common.Status.SUCCESS
-        if self.running:
+        running = self.running
+        if self.sub.changed():
+            _, candidate = self.sub.take()
+            if candidate:
+                return py_trees.common.Status.SUCCESS
+        if running:
             return py_trees.common.Status.RUNNING
         else:
             return py_trees.common.Status.FAILURE
 
-    def actor_callback(self, point_bag):
+    def actor_callback(self, point_bag, run):
+        if run != self.run: return
         self.candidate = point_bag
+        if point_bag:
+            BOARD.set('found_point', point_bag)
         self.running = False
     
     def terminate(self, new_status):
+        self.run = None
         if self.candidate:
             self.logger.info(f"Concluded x:{self.candidate.x}, y:{self.candidate.y}")
         else:
@@ -122,55 +154,39 @@ class DetermineTarget(ActorBT):
     desc = 'determine target'
 
     def __init__(self, name, target):
-        super().__init__(name, target)
-        self.judge = None
-
-    def initialise(self):
-        bb = py_trees.blackboard.Blackboard()
-        self.bb = bb
-        target = run_actor('determine_target')
-        if target:
-            bb.set("target", target)
-            self.judge = True
-        else:
-            self.judge = False
+        super().__init__(name, 'determine_target')
 
-    def update(self):
-        if self.judge:
-            return py_trees.common.Status.SUCCESS
-        else:
+    def done(self, target):
+        if not target:
             return py_trees.common.Status.FAILURE
+        BOARD.set("target", target)
+        return py_trees.common.Status.SUCCESS
 
 @behavior
 class TransCoordinates(ActorBT):
     desc = 'trans coordinates'
 
     def __init__(self, name, mode):
-        super().__init__(name, mode)
+        super().__init__(name, 'trans_base_coordinates', mode)
         self.mode = mode
 
-    def initialise(self):
-        bb = py_trees.blackboard.Blackboard()
-        self.bb = bb
-        target = self.bb.get("target")
-        label, score, cx, cy = target
+    def callee(self):
         if self.mode == "all":
-            camera_x, camera_y, camera_z = run_actor('trans_camera_coordinates', cx, cy)
-            base_x, base_y, base_z = run_actor('trans_base_coordinates', camera_x, camera_y, camera_z, "camera_color_optical_frame")
-            bb.set("base_x", base_x)
-            bb.set("base_y", base_y)
-            bb.set("base_z", base_z)
-
+            label, score, cx, cy, stamp = BOARD.get("target")
+            return [
+                ('trans_camera_coordinates', (cx, cy, stamp)),
+                ('trans_base_coordinates', lambda camera: (*camera, "camera_color_optical_frame")),
+            ]
         elif self.mode == "base_link":
-            map_x = self.bb.get("map_x")
-            map_y = self.bb.get("map_y")
+            map_x, map_y, _ = BOARD.get("map")
             map_z = 0.92
-            base_x, base_y, base_z = run_actor('trans_base_coordinates', map_x, map_y, map_z, "map")
-            bb.set("base_x", base_x)
-            bb.set("base_y", base_y)
-            bb.set("base_z", base_z)
+            return [('trans_base_coordinates', (map_x, map_y, map_z, "map"))]
+        return []
 
-    def update(self):
+    def done(self, base):
+        if not base:
+            return py_trees.common.Status.FAILURE
+        BOARD.set("base", base)
         return py_trees.common.Status.SUCCESS
 
 @behavior 
@@ -178,18 +194,14 @@ class GetGoalPos(ActorBT):
     desc = 'get goal position info'
 
     def __init__(self, name, goal, pos):
-        super().__init__(name, goal, pos)
+        super().__init__(name, 'get_goal_pos', goal, pos)
         self.goal = goal
         self.pos = pos
     
-    def initialise(self):
-        bb = py_trees.blackboard.Blackboard()
-        self.bb = bb
-        map_x, map_y, _ = run_actor('get_goal_pos', self.goal, self.pos)
+    def done(self, goal_pos):
+        if not goal_pos:
+            return py_trees.common.Status.FAILURE
+        map_x, map_y, _ = goal_pos
         map_z = 0.92
-        bb.set("map_x", map_x)
-        bb.set("map_y", map_y)
-        bb.set("map_z", map_z)
-
-    def update(self):
+        BOARD.set("map", (map_x, map_y, map_z))
         return py_trees.common.Status.SUCCESS
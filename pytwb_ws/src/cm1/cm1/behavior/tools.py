@@ -21,6 +21,13 @@ class Sleep(ActorBT):
 
     def __init__(self, name, node, time):
         super().__init__(name, "sleep", time)
+
+@behavior
+class WaitMachineDone(ActorBT):
+    desc = 'wait for machine done signal (timeout: former fixed sleep)'
+
+    def __init__(self, name, node, timeout):
+        super().__init__(name, "wait_machine_done", timeout)
         
 @behavior
 class Generic(ActorBT):
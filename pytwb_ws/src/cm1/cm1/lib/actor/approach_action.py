@@ -3,7 +3,13 @@ import math
 
 from ros_actor import actor, SubNet
 from ..pointlib import PointEx
+from ..transformlib import RigidTransform
+from ..clocklib import monotonic
+from ..controllib import HeadingController, RateLoop, TrapezoidProfile, wrap_angle, travelled
+from ..motionlib import MOTIONS, motion
+from ..waitlib import wait_condition, wait_entry
 from geometry_msgs.msg import Twist
+from action_msgs.srv import CancelGoal
 
 from ..print_color import cprint
 
@@ -12,6 +18,18 @@ HIGH_SPEED = 0.2
 # TURN = 0.5
 TURN = 1.0
 
+CONTROL_RATE = 20  # closed loop control rate (Hz)
+BASE_LAG = 0.1  # velocity response time of the base (sec)
+HEADING_TIMEOUT = 30.0  # give up heading control after (sec)
+APPROACH_DISTANCE = 0.95  # stop when the target is this close (m)
+APPROACH_ACCEL = 0.4  # acceleration of the approach profile (m/s^2)
+APPROACH_TIMEOUT = 60.0  # give up approaching after (sec)
+DRIVE_TIMEOUT = 120.0  # give up a distance move after (sec)
+ODOM_MAX_AGE = 0.2  # odometry older than this falls back to TF (sec)
+BASE_STOPPED = 0.01  # linear speed regarded as stopped (m/s)
+BASE_STOPPED_TURN = 0.02  # angular speed regarded as stopped (rad/s)
+BASE_SETTLE_HOLD = 0.1  # base must stay stopped for (sec)
+
 class ApproachAction(SubNet):
     ##################
     # Direct control
@@ -25,6 +43,38 @@ class ApproachAction(SubNet):
         twist.angular.y = 0.0
         twist.angular.z = TURN * turn
         self.run_actor('motor', twist)
+
+    # velocity command by m/s and rad/s
+    def drive(self, linear=0.0, angular=0.0):
+        twist = Twist()
+        twist.linear.x = float(linear)
+        twist.angular.z = float(angular)
+        self.run_actor('motor', twist)
+
+    # cancel_base requests the base motion of this thread to stop
+    def cancelled(self):
+        return MOTIONS.cancelled()
+
+    @motion
+    def turn_heading(self, goal_angle, timeout=HEADING_TIMEOUT):
+        """
+        closed loop heading control streaming Twist at CONTROL_RATE
+        arg:
+            goal_angle: function (x, y) -> goal heading in the map
+        return: True if settled within timeout
+        """
+        controller = HeadingController(max_rate=TURN)
+        loop = RateLoop(CONTROL_RATE)
+        start = monotonic()
+        dt = loop.period
+        while True:
+            now_x, now_y, now_ang = self.run_actor("get_position")
+            rate = controller.step(goal_angle(now_x, now_y) - now_ang, dt)
+            if controller.settled or self.cancelled() or monotonic() - start > timeout:
+                self.move(0, 0)
+                return controller.settled
+            self.drive(0.0, rate)
+            dt = loop.wait()
     
     # direct command to motor
     @actor    
@@ -41,13 +91,102 @@ class ApproachAction(SubNet):
         self.move(0, 0)
     
     @actor
+    @motion
     def mini_walk_times(self, times=5, back=False, high_speed = False):
         for _ in range(times):
+            if self.cancelled(): return False
             if back:
                 self.run_actor('mini_walk', -5, high_speed=high_speed)
             else:
                 self.run_actor('mini_walk', high_speed=high_speed)
     
+    # pose source for a distance move: odometry while it is published, TF otherwise
+    #   the source is kept for the whole move so the frames are never mixed,
+    #   the odometry source returns None as soon as odometry stops coming in
+    def pose_source(self):
+        odom_cache = self.get_value('odom_cache')
+        if odom_cache.latest(ODOM_MAX_AGE):
+            return lambda: odom_cache.latest(ODOM_MAX_AGE)
+        return lambda: self.run_actor('get_position')
+
+    @actor
+    @motion
+    def drive_distance(self, distance, high_speed=False, timeout=DRIVE_TIMEOUT):
+        """
+        Drive straight by the given distance in one smooth command
+        arg:
+            distance: meters, negative to move backward
+            high_speed: cruise at HIGH_SPEED instead of SPEED
+        return: True when the distance is reached
+        """
+        sign = 1.0 if distance >= 0 else -1.0
+        profile = TrapezoidProfile(HIGH_SPEED if high_speed else SPEED,
+                                   APPROACH_ACCEL, APPROACH_ACCEL, lag=1.0/CONTROL_RATE + BASE_LAG)
+        loop = RateLoop(CONTROL_RATE)
+        get_pose = self.pose_source()
+        start_pose = get_pose()
+        start = monotonic()
+        dt = loop.period
+        moved = 0.0
+        while True:
+            pose = get_pose()
+            if start_pose is None or pose is None:
+                # never drive on a frozen pose
+                self.drive(0.0)
+                cprint(f"drive_distance stopped, odometry lost at {moved:.3f}m of {abs(distance):.3f}m", "red")
+                return False
+            moved = travelled(start_pose, pose) * sign
+            speed = profile.step(abs(distance) - moved, dt)
+            if speed == 0.0:
+                self.drive(0.0)
+                return True
+            if self.cancelled():
+                self.drive(0.0)
+                return False
+            if monotonic() - start > timeout:
+                self.drive(0.0)
+                cprint(f"drive_distance timed out at {moved:.3f}m of {abs(distance):.3f}m", "red")
+                return False
+            self.drive(speed * sign)
+            dt = loop.wait()
+
+    @actor
+    def cancel_base(self, *tokens):
+        """
+        stop base motions: navigation goal and direct control loops
+        arg:
+            tokens: motions to stop (motionlib), every motion so far if none
+        """
+        if not MOTIONS.cancel(*tokens) and tokens:
+            # not begun yet or over, a motion begun later stops by itself
+            return True
+        client = self.get_value('nav_cancel_client')
+        if client.service_is_ready():
+            # zero goal id and stamp cancel every goal of the action
+            client.call_async(CancelGoal.Request())
+        self.drive(0.0)
+        return True
+
+    @actor
+    def back_off(self, distance, high_speed=False):
+        return self.run_actor('drive_distance', -abs(distance), high_speed)
+
+    @actor
+    def wait_base_stopped(self, timeout=1.0, required=False):
+        """
+        wait until odometry reports the base at rest
+        arg:
+            timeout: the former fixed sleep (sec)
+        """
+        odom_cache = self.get_value('odom_cache')
+        def stopped():
+            if not odom_cache.latest(ODOM_MAX_AGE): return False
+            v, w = odom_cache.twist
+            return abs(v) <= BASE_STOPPED and abs(w) <= BASE_STOPPED_TURN
+        met, waited = wait_condition(stopped, timeout, BASE_SETTLE_HOLD)
+        self.get_value('wait_log').append(wait_entry('base_stopped', met, waited, timeout))
+        return met or not required
+
     @actor    
     def mini_turn(self, len=5):
         if len == 0:
@@ -74,7 +213,7 @@ class ApproachAction(SubNet):
         """
         cprint(f"Go to {pos}!", "green")
         x, y, ang = self.run_actor("get_goal_pos", pos)
-        self.run_actor("goto", x, y, ang)
+        return self.run_actor("goto", x, y, ang)
 
     @actor
     def match_angle_goal(self, goal="rack_workpiece"):
@@ -85,53 +224,77 @@ class ApproachAction(SubNet):
         return:
         """
         _, _, goal_ang = self.run_actor("get_goal_pos", goal)
-        goal_ang = (goal_ang + math.pi) % (2 * math.pi) - math.pi
-
-        # for _ in range(5):
-        while True:
-            _, _, now_ang = self.run_actor("get_position")
-            now_ang = (now_ang + math.pi) % (2 * math.pi) - math.pi
+        goal_ang = wrap_angle(goal_ang)
 
-            rad = (goal_ang - now_ang + math.pi) % (2 * math.pi) - math.pi
-
-            # cprint(f"Now angle: {now_ang:.3f}, Goal angle: {goal_ang:.3f}, Diff angle: {rad:.3f}", "yellow")
-
-            if abs(rad) < 0.02:  # ≈1°
-                self.move(0, 0) 
-                cprint(f"Angle adjustment complete!", "green")
-                return
-
-            if rad > 0:
-                self.run_actor('mini_turn', 5)
-            else:
-                self.run_actor('mini_turn', -5)
+        if self.turn_heading(lambda x, y: goal_ang):
+            cprint(f"Angle adjustment complete!", "green")
+            return True
+        cprint(f"Angle adjustment timed out", "red")
+        return False
 
     @actor
-    def approach_action(self, target_base_coords: tuple):
+    @motion
+    def approach_action(self, target_base_coords: tuple, continuous=True, high_speed=False):
         """
         Approach the target using base coordinates
         arg:
             target_base_coords: (x, y, z) coordinates in the base frame
+            continuous: True for a velocity profiled approach, False for mini_walk steps
+            high_speed: move at HIGH_SPEED instead of SPEED
         return:
         """
         base_x, base_y, base_z = target_base_coords
         map_x, map_y, map_z = self.run_actor('trans_map_coordinates', base_x, base_y, base_z, 'base_link')  # Change to map coordinates
+        # the image shifts while approaching, the target track is selected afresh
+        self.run_actor('release_target')
+
+        if continuous:
+            return self.approach_continuous((map_x, map_y, map_z), high_speed)
 
         target_distance = base_x
         while True:
+            if self.cancelled(): return False
             # if target_distance < base_x / 2 + 0.3:
-            if target_distance < 0.95:
+            if target_distance < APPROACH_DISTANCE:
                 cprint(f"Close to target complete! target distance: {target_distance:.3f}m", "green")
                 return True
 
-            self.run_actor('mini_walk')
+            self.run_actor('mini_walk', high_speed=high_speed)
 
-            point = PointEx(map_x, map_y, map_z)
             trans = self.run_actor('base_trans', 'map')
-            point.setTransform(trans.transform)
-            target_distance, base_y, base_z = point.x, point.y, point.z
+            target_distance, base_y, base_z = RigidTransform.from_msg(trans).apply_point(map_x, map_y, map_z)
             cprint(f"Distance to target: {target_distance:.3f}m", "yellow")
 
+    @motion
+    def approach_continuous(self, target_map_coords, high_speed=False, distance=APPROACH_DISTANCE, timeout=APPROACH_TIMEOUT):
+        """
+        drive straight with a trapezoidal velocity profile until the target is
+        at distance ahead, updating the remaining distance from TF every cycle
+        """
+        map_x, map_y, map_z = target_map_coords
+        profile = TrapezoidProfile(HIGH_SPEED if high_speed else SPEED,
+                                   APPROACH_ACCEL, APPROACH_ACCEL, lag=1.0/CONTROL_RATE + BASE_LAG)
+        loop = RateLoop(CONTROL_RATE)
+        start = monotonic()
+        dt = loop.period
+        while True:
+            trans = self.run_actor('base_trans', 'map')
+            target_distance, _, _ = RigidTransform.from_msg(trans).apply_point(map_x, map_y, map_z)
+            if self.cancelled():
+                self.drive(0.0)
+                return False
+            speed = profile.step(target_distance - distance, dt)
+            if speed == 0.0:
+                self.drive(0.0)
+                cprint(f"Close to target complete! target distance: {target_distance:.3f}m", "green")
+                return True
+            if monotonic() - start > timeout:
+                self.drive(0.0)
+                cprint(f"Approach timed out, target distance: {target_distance:.3f}m", "red")
+                return False
+            self.drive(speed)
+            dt = loop.wait()
+
     @actor
     def face_body_goal(self, goal="rack_workpiece"):
         """
@@ -143,27 +306,11 @@ class ApproachAction(SubNet):
         cprint(f"Face to {goal}!", "green")
         goal_x, goal_y, _ = self.run_actor("get_goal_pos", goal)
 
-        while True:
-            now_x, now_y, now_ang = self.run_actor("get_position")
-            dx = goal_x - now_x
-            dy = goal_y - now_y
-            goal_ang = atan2(dy, dx)
-            goal_ang = (goal_ang + math.pi) % (2 * math.pi) - math.pi
-            now_ang = (now_ang + math.pi) % (2 * math.pi) - math.pi
-
-            rad = (goal_ang - now_ang + math.pi) % (2 * math.pi) - math.pi
-
-            # cprint(f"Now angle: {now_ang:.3f}, Goal angle: {goal_ang:.3f}, Diff angle: {rad:.3f}", "yellow")
-
-            if abs(rad) < 0.02:  # ≈1°
-                self.move(0, 0) 
-                cprint(f"Angle adjustment complete!", "green")
-                return
-
-            if rad > 0:
-                self.run_actor('mini_turn', 5)
-            else:
-                self.run_actor('mini_turn', -5)
+        if self.turn_heading(lambda x, y: atan2(goal_y - y, goal_x - x)):
+            cprint(f"Angle adjustment complete!", "green")
+            return True
+        cprint(f"Angle adjustment timed out", "red")
+        return False
 
     ####################################################################    
     
@@ -174,10 +321,11 @@ class ApproachAction(SubNet):
         len = distance - target
         if len < 0.005: return True
         trans = self.run_actor('map_trans')
+        rigid = RigidTransform.from_msg(trans)
         start = PointEx(0.0, 0.0)
-        start.setTransform(trans.transform)
+        start.setTransform(trans.transform, rigid)
         dest = PointEx(len, 0.0)
-        dest.setTransform(trans.transform)
+        dest.setTransform(trans.transform, rigid)
         self.run_actor('mini_walk', len*164)
         self.run_actor('sleep', 3)
         trans = self.run_actor('map_trans')
@@ -217,10 +365,11 @@ class ApproachAction(SubNet):
         if not trans:
             print('trans error')
             return False
-        root.setTransform(trans.transform)
+        rigid = RigidTransform.from_msg(trans)
+        root.setTransform(trans.transform, rigid)
         x, y, rel_angle = self.run_actor('object_loc', 'base_link')
         target = PointEx(x, y)
-        target.setTransform(trans.transform)
+        target.setTransform(trans.transform, rigid)
         dx = target.x - root.x
         dy = target.y - root.y
         abs_angle = atan2(dy, dx)
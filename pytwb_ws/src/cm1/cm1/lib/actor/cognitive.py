@@ -1,69 +1,113 @@
-from math import radians, atan2, degrees, sqrt, isinf
+from math import radians, atan2, degrees, isinf
 
 from ros_actor import actor, SubNet
-from lib.pointlib import PointEx, PointBag
+from lib.pointlib import PointEx, PointCluster
+from lib.transformlib import RigidTransform
 from lib.simlib import find_coke
+from lib.imagelib import decode_image, decode_depth
+from lib.cameralib import deproject_pixels, pix_to_coordinate, DEPROJECT_WINDOW
+from lib.detectionlib import Target
 
 from ..print_color import cprint
+from .perception import DETECTION_MAX_AGE, SYNC_SLOP, show_detections
+
+TARGET_MIN_SCORE = 0.4  # detection score to be a target candidate
+DEPTH_WAIT = 1.0  # deadline of a single wait for a depth frame (sec)
+DEPTH_MAX_AGE = 0.1  # oldest cached depth frame used as the latest one (sec)
 
 class CognitiveNetwork(SubNet):
     # == Get Images ==
     # get depth image with same size as RGB image
     @actor
-    def get_depth_image(self):
-        data = self.run_actor('depth')
-        cv_bridge = self.get_value('cv_bridge')
-        depth_image = cv_bridge.imgmsg_to_cv2(data)
-        return depth_image
+    def get_depth_image(self, stamp=None):
+        frame = self.run_actor('depth_frame', stamp)
+        return frame.image if frame else None
+
+    # decoded depth frame from the shared cache (image is shared, do not modify)
+    #   stamp: nanoseconds, None for the latest frame
+    #   max_age: the latest frame is not older than this, otherwise a new one is waited for
+    @actor
+    def depth_frame(self, stamp=None, max_age=DEPTH_MAX_AGE):
+        depth_cache = self.get_value('depth_cache')
+        if stamp is not None:
+            slop = int(SYNC_SLOP * 1e9)
+            frame = depth_cache.nearest(stamp)
+            if not frame or frame.stamp < stamp - slop:
+                # the frame taken with the stamp may still be on the way
+                frame = depth_cache.newer(stamp - slop, DEPTH_WAIT)
+            if frame and abs(frame.stamp - stamp) <= slop: return frame
+        while True:
+            frame = depth_cache.latest(DEPTH_WAIT, max_age)
+            if frame: return frame
 
     # == Use Yolo Detections ==
     # determine target object from detected objects
+    #   a query of the tracker fed by the detection subscription, the latest
+    #   detections are looked at only while no track is confirmed
     @actor
-    def determine_target(self):
-        results = self.run_actor('detections_visualizer')
-        if not results:
-            cprint("No target found", "red")
-            return False
-
+    def determine_target(self, max_age=DETECTION_MAX_AGE, label='work'):
         camera_info = self.get_value('camera_info')
         camera_width, camera_height = camera_info["realsense_rgb"]["width"], camera_info["realsense_rgb"]["height"]
         center_x, center_y = camera_width / 2, camera_height / 2
-        
-        target = None
-        min_distance = float('inf')  # set value to infinity initially
-
-        for label, score, cx, cy in results:
-            if score < 0.4 or label != 'work': continue
 
-            distance = ((cx - center_x) ** 2 + (cy - center_y) ** 2) ** 0.5
-            if distance < min_distance:
-                min_distance = distance
-                target = (label, score, cx, cy)
+        tracker = self.get_value('target_tracker')
+        track = tracker.select(center_x, center_y, tracker.class_ids(label), TARGET_MIN_SCORE)
+        if track:
+            track_id, (cx, cy), score, stamp = track
+            target = Target(label, score, int(cx), int(cy), stamp)
+            cprint(f"Target selected: {target[0]} ({target[1]:.2f}) at ({int(target[2])}, {int(target[3])}) track {track_id}", "green")
+            return target
 
-        if target:
+        # tracker not settled: nearest to the center in the latest frame
+        results = self.run_actor('detections_subscriber', max_age)
+        if len(results) == 0:
+            cprint("No target found", "red")
+            return False
+        show_detections(results)
+        cand = results.select(TARGET_MIN_SCORE, label)
+        index = cand.nearest(center_x, center_y)
+        if index is not None:
+            target = Target(*cand.take([index]).tuples()[0], results.stamp)
             cprint(f"Target selected: {target[0]} ({target[1]:.2f}) at ({int(target[2])}, {int(target[3])})", "green")
             return target
         else:
             cprint("No suitable target found", "red")
             return False
 
+    # the base moves: the next determine_target selects afresh instead of keeping the track
+    @actor
+    def release_target(self):
+        self.get_value('target_tracker').release()
+        return True
+
+    @actor
+    def reset_tracker(self):
+        self.get_value('target_tracker').reset()
+        return True
+
     # == Change coordinates ==
     @actor
-    def trans_camera_coordinates(self, img_x, img_y):
+    def trans_camera_coordinates(self, img_x, img_y, stamp=None):
         """
         Transform pixel coordinates to camera coordinates
         arg:
             img_x: pixel x coordinate
             img_y: pixel y coordinate
+            stamp: stamp of the detections (nanoseconds), deprojected on the depth
+                frame paired with it, None for the latest
         return: 
             camera_x, camera_y, camera_z
         """
         camera_info = self.get_value('camera_info')
-        camera_width, camera_height = camera_info["realsense_rgb"]["width"], camera_info["realsense_rgb"]["height"]
         f_x, f_y = camera_info["realsense_rgb"]["focal_len"]
         c_x, c_y = camera_info["realsense_rgb"]["optical_cen"]
 
-        depth_image = self.run_actor('get_depth_image')
+        depth_image = self.run_actor('get_depth_image', stamp)
+        points, valid = deproject_pixels(depth_image, [img_x], [img_y], (f_x, f_y), (c_x, c_y))
+        if valid[0]:
+            return tuple(points[0].tolist())
+
+        # no valid depth around the pixel, report the raw value as before
         distace = depth_image[img_y][img_x]
 
         camera_x = ((img_x - c_x) * distace) / f_x
@@ -72,6 +116,24 @@ class CognitiveNetwork(SubNet):
 
         return camera_x, camera_y, camera_z
 
+    @actor
+    def trans_camera_points(self, img_xs, img_ys, stamp=None, window=DEPROJECT_WINDOW):
+        """
+        Transform many pixel coordinates to camera coordinates with one depth frame
+        arg:
+            img_xs: pixel x coordinates
+            img_ys: pixel y coordinates
+            stamp: depth frame stamp (nanoseconds), None for the latest
+            window: side of the pixel window for the depth median
+        return:
+            (N, 3) camera coordinates, (N,) validity mask
+        """
+        camera_info = self.get_value('camera_info')
+        f_x, f_y = camera_info["realsense_rgb"]["focal_len"]
+        c_x, c_y = camera_info["realsense_rgb"]["optical_cen"]
+        depth_image = self.run_actor('get_depth_image', stamp)
+        return deproject_pixels(depth_image, img_xs, img_ys, (f_x, f_y), (c_x, c_y), window)
+
     @actor
     def trans_base_coordinates(self, x, y, z, frame_name = "camera_color_optical_frame"):
         """
@@ -84,10 +146,8 @@ class CognitiveNetwork(SubNet):
         return: 
             base_x, base_y, base_z
         """
-        point = PointEx(x, y, z)
         trans = self.run_actor("base_trans", frame_name)
-        point.setTransform(trans.transform)
-        base_x, base_y, base_z = point.x, point.y, point.z
+        base_x, base_y, base_z = RigidTransform.from_msg(trans).apply_point(x, y, z)
         return base_x, base_y, base_z
 
     @actor
@@ -102,12 +162,34 @@ class CognitiveNetwork(SubNet):
         return:
             map_x, map_y, map_z
         """
-        point = PointEx(x, y, z)
         trans = self.run_actor("map_trans", frame_name)
-        point.setTransform(trans.transform)
-        map_x, map_y, map_z = point.x, point.y, point.z
+        map_x, map_y, map_z = RigidTransform.from_msg(trans).apply_point(x, y, z)
         return map_x, map_y, map_z
 
+    @actor
+    def trans_base_points(self, points, frame_name = "camera_color_optical_frame"):
+        """
+        Transform many points to base coordinates with a single TF lookup
+        arg:
+            points: (N, 3) coordinates in frame_name
+        return:
+            (N, 3) numpy array of base coordinates
+        """
+        trans = self.run_actor("base_trans", frame_name)
+        return RigidTransform.from_msg(trans).apply(points)
+
+    @actor
+    def trans_map_points(self, points, frame_name = "base_link"):
+        """
+        Transform many points to map coordinates with a single TF lookup
+        arg:
+            points: (N, 3) coordinates in frame_name
+        return:
+            (N, 3) numpy array of map coordinates
+        """
+        trans = self.run_actor("map_trans", frame_name)
+        return RigidTransform.from_msg(trans).apply(points)
+
     ####################################################################
     # from Turtlebot3 Lime    
     # get target location by arm coordinate
@@ -133,24 +215,13 @@ class CognitiveNetwork(SubNet):
         return point.x, point.y
     
     def register_flist(self, cand_points, point):
-        cand = None
-        min_d = 0.01
-        for found in cand_points:
-            d = (found.x-point.x)**2 + (found.y-point.y)**2 + (found.z-point.z)**2
-            if d >= min_d: continue
-            cand = found
-            min_d = d
-        if not cand:
-            cand = PointBag(point)
-#            cand.type = point.type
-            cand_points.append(cand)
-        else:
-            cand.append(point)
+        # cand_points: PointCluster
+        return cand_points.append(point)
 
     # accumulate detected object locations to get more accurate value
     @actor
-    def get_found(self, max_time=10, min_count=10):
-        cand_points = []
+    def get_found(self, max_time=10, min_count=10, radius=0.1):
+        cand_points = PointCluster(radius)
         while True:
             point = self.run_actor('find_object')
             if not point: return None
@@ -158,21 +229,15 @@ class CognitiveNetwork(SubNet):
             point.setTransform(trans.transform)
             if point.valid:
                 self.register_flist(cand_points, point)
-            max_count = 0
-            target = None
-            for c in cand_points:
-                if c.count > max_count:
-                    target = c
-                    max_count = c.count
-            if max_count >= min_count:
+            target = cand_points.best
+            if target and target.count >= min_count:
                 return target
             
     # realtime object detection for visual feedback
     @actor('measure_distance', 'multi')
     def measure_distance(self, callback, target):
-        bridge = self.get_value('cv_bridge')
         def stub(data):
-            depth_image = bridge.imgmsg_to_cv2(data)
+            depth_image = decode_depth(data)
             mid_line = depth_image[len(depth_image)//2]
             return callback(min(mid_line))
             
@@ -182,9 +247,7 @@ class CognitiveNetwork(SubNet):
     # detect can center
     @actor
     def measure_center(self, target='link1'):
-        data = self.run_actor('depth')
-        cv_bridge = self.get_value('cv_bridge')
-        depth_image = cv_bridge.imgmsg_to_cv2(data)
+        depth_image = self.run_actor('get_depth_image')
         det_line = depth_image[-5]
         index = det_line.argmin()
         distance = det_line[index]
@@ -198,21 +261,14 @@ class CognitiveNetwork(SubNet):
     def pix_to_coordinate(self, pix, distance, depth_image):
         # get horizontal coordinate (y) from camera data
         # coke can position by camera coordinate target_x: depth, target_y: horizontal pos
-        pix = depth_image.shape[1] / 2 - pix # Pixel value in the horizontal direction with the center at 0
-        lp = 500 # base line length by pixel
-        mag = distance / sqrt(pix**2 + lp**2)
-        y = pix * mag * 2
-        x = lp * mag
-        return x, y
+        return pix_to_coordinate(pix, distance, depth_image.shape[1])
 
     # find single object
     @actor
     def find_object(self):
         center = self.run_actor('pic_find')
         if not center: return None
-        data = self.run_actor('depth')
-        cv_bridge = self.get_value('cv_bridge')
-        depth_image = cv_bridge.imgmsg_to_cv2(data)
+        depth_image = self.run_actor('get_depth_image')
         yp = center[0] # by pic cell
         zp = center[1] # by pic cell
         distance = depth_image[zp][yp]
@@ -232,9 +288,10 @@ class CognitiveNetwork(SubNet):
     @actor
     def pic_find(self):
         ret = None
+        tracker = self.get_value('color_tracker')
         with self.run_actor_mode('pic_receiver', 'timed_iterator', 10) as pic_iter:
             for cv_image in pic_iter:
-                ret = find_coke(cv_image)
+                ret = tracker.find(cv_image)
                 if ret: break
         return ret
         
@@ -243,10 +300,9 @@ class CognitiveNetwork(SubNet):
     def pic_receiver(self, callback):
         def stub(data):
             cv_image = None
-            cv_bridge = self.get_value('cv_bridge')
             try:
-                cv_image = cv_bridge.imgmsg_to_cv2(data, "bgr8")
-            except CvBridgeError as e:
+                cv_image = decode_image(data, "bgr8")
+            except ValueError as e:
                 print(e)
             return callback(cv_image)
         pic_tran = self.run_actor_mode('pic', 'multi', stub)
@@ -1,23 +1,94 @@
 import array
 import operator
 from math import radians, atan2, degrees
-from time import sleep
+from threading import Event
 
 from ros_actor import actor, SubNet
+from ..print_color import cprint
 
 from pymoveit2 import MoveIt2, MoveIt2State
+from moveit_msgs.msg import PlanningSceneComponents
+from moveit_msgs.srv import GetPlanningScene
 
 from scipy.spatial.transform import Rotation as R
 
+from ..clocklib import monotonic, sleep, wall
+from ..motionlib import MOTIONS
+from ..trajectorylib import joint_positions as joint_state_positions
+from ..waitlib import JointMotion, wait_condition, wait_entry
+
 
 adjust_plus = 1.1  
 adjust_minus = 0.9
 
-def wait_until_executed(arm):
-    while(arm.query_state() != MoveIt2State.IDLE):
-        sleep(0.5)
+STATE_POLL = 0.01  # state check interval while no result future is available (sec)
+FUTURE_CHECK = 0.1  # guard for a done callback that is never dispatched (sec)
+JOINT_SETTLED = 0.01  # joint speed regarded as stopped (rad/s)
+SETTLE_HOLD = 0.1  # joints must stay stopped for (sec)
+SCENE_QUERY_TIMEOUT = 0.5  # deadline of a single planning scene query (sec)
+MOTION_TIMEOUT = 60.0  # longest arm or gripper motion including planning (sec)
+
+def wait_until_executed(arm, timeout=None):
+    """
+    wait for the motion requested to arm (MoveIt2 or gripper) to finish
+    the result future of the action wakes the caller, state polling is
+    used only until the goal is accepted
+    return: telemetry dict
+        plan: planning time reported by move_group
+        execute: time from goal acceptance to result, minus planning
+        idle_lag: time from result until query_state() reports IDLE
+        ok: finished in time and succeeded (motion_suceeded of pymoveit2)
+    """
+    start = monotonic()
+    def expired():
+        return timeout is not None and monotonic() - start > timeout
+    get_future = getattr(arm, 'get_execution_future', None)
+    future = None
+    while arm.query_state() != MoveIt2State.IDLE:
+        future = get_future() if get_future else None
+        if future: break
+        if expired(): break
+        sleep(STATE_POLL)
+    accepted = monotonic()
+    if future:
+        done = Event()
+        future.add_done_callback(lambda _: done.set())
+        while not done.wait(FUTURE_CHECK):
+            if future.done(): break
+            if expired(): break
+    finished = monotonic()
+    while arm.query_state() != MoveIt2State.IDLE:
+        if expired(): break
+        sleep(STATE_POLL)
+    idle = monotonic()
+    # a timeout leaves the result pending or the arm busy
+    ok = arm.query_state() == MoveIt2State.IDLE and (future is None or future.done())
+    ok = ok and bool(getattr(arm, 'motion_suceeded', True))
+    plan = 0.0
+    if future and future.done():
+        try:
+            plan = float(getattr(future.result().result, 'planning_time', 0.0))
+        except Exception:
+            plan = 0.0
+    return {
+        'plan': plan,
+        'execute': max(finished - accepted - plan, 0.0),
+        'idle_lag': idle - finished,
+        'total': idle - start,
+        'ok': ok,
+    }
   
 class ManipulatorNetwork(SubNet):
+    def wait_motion(self, arm, name, plan=None, timeout=MOTION_TIMEOUT):
+        stat = wait_until_executed(arm, timeout)
+        stat['motion'] = name
+        if plan is not None:
+            # planned separately from the execution
+            stat['plan'] = plan
+            stat['total'] += plan
+        self.get_value('motion_log').append(stat)
+        return stat['ok']
+
     # == ARM ACTORs ==
     # set to home position
     @actor
@@ -46,13 +117,38 @@ class ManipulatorNetwork(SubNet):
         return res
 
     # move arm and wait until done
+    #   trajectories are cached by start state and goal and replayed without planning
     @actor
     def move_to_configuration(self, joint_positions):
         arm = self.get_value('arm')
-        arm.move_to_configuration(joint_positions, joint_names=arm.joint_names)
-        wait_until_executed(arm)
-        return True         
+        cache = self.get_value('trajectory_cache')
+        start = joint_state_positions(arm.joint_state, arm.joint_names)
+        if start is None:
+            # no joint state yet, plan and execute by move_group
+            arm.move_to_configuration(joint_positions, joint_names=arm.joint_names)
+            return self.wait_motion(arm, 'move_to_configuration')
 #        return arm.wait_until_executed() # Never use this
+
+        trajectory = cache.get(start, joint_positions)
+        if trajectory:
+            arm.execute(trajectory)
+            if self.wait_motion(arm, 'replay_configuration', 0.0):
+                return True
+            cprint('trajectory replay failed, replanning', 'yellow')
+            cache.drop(start, joint_positions)
+            start = joint_state_positions(arm.joint_state, arm.joint_names)
+
+        t = monotonic()
+        trajectory = arm.plan(joint_positions=list(joint_positions), joint_names=arm.joint_names)
+        plan_time = monotonic() - t
+        if trajectory is None:
+            cprint('planning failed', 'red')
+            return False
+        arm.execute(trajectory)
+        ok = self.wait_motion(arm, 'move_to_configuration', plan_time)
+        if ok:
+            cache.put(start, joint_positions, trajectory, plan_time)
+        return ok
     
     # joint angle in degree units
     @actor
@@ -114,10 +210,17 @@ class ManipulatorNetwork(SubNet):
             cartesian_max_step=cartesian_max_step,
             cartesian_fraction_threshold=cartesian_fraction_threshold,
             )
-        wait_until_executed(arm)
-        return True
+        return self.wait_motion(arm, 'move_to_pose')
         # return arm.wait_until_executed()  # Never use this
 
+    # stop the arm motions of the tokens (motionlib), the running one if none
+    #   a motion not begun yet stops by itself
+    @actor
+    def cancel_arm(self, *tokens):
+        if MOTIONS.cancel(*tokens) or not tokens:
+            self.get_value('arm').cancel_execution()
+        return True
+
     # == Scene Object ACTORs ==
     @actor
     def add_scene_object(self, position, quat_xyzw=[0.0, 0.0, 0.0, 1.0]):
@@ -129,6 +232,7 @@ class ManipulatorNetwork(SubNet):
             quat_xyzw=quat_xyzw,
             size=[0.05, 0.05, 0.05],
         )
+        self.get_value('trajectory_cache').invalidate()
         return True
 
     @actor
@@ -138,36 +242,84 @@ class ManipulatorNetwork(SubNet):
         arm.remove_collision_object(
             id=object_id
         )
+        self.get_value('trajectory_cache').invalidate()
+        return True
+
+    # collision scene changed outside of the actors above
+    @actor
+    def invalidate_trajectories(self):
+        self.get_value('trajectory_cache').invalidate()
         return True
     
+    # ids of the collision objects known to move_group, None when unavailable
+    def scene_objects(self, timeout=SCENE_QUERY_TIMEOUT):
+        client = self.get_value('scene_client')
+        if not client.service_is_ready(): return None
+        request = GetPlanningScene.Request()
+        request.components.components = PlanningSceneComponents.WORLD_OBJECT_NAMES
+        future = client.call_async(request)
+        done = Event()
+        future.add_done_callback(lambda _: done.set())
+        if not done.wait(wall(timeout)):
+            future.cancel()
+            return None
+        return {o.id for o in future.result().scene.world.collision_objects}
+
+    # == Wait ACTORs ==
+    @actor
+    def wait_scene_object(self, object_id="box", present=True, timeout=5.0, required=False):
+        """
+        wait until move_group has applied a collision object change
+        arg:
+            present: True after adding, False after removing
+            timeout: the former fixed sleep (sec)
+        """
+        def applied():
+            ids = self.scene_objects()
+            return ids is not None and (object_id in ids) == present
+        met, waited = wait_condition(applied, timeout)
+        self.get_value('wait_log').append(wait_entry('scene_object', met, waited, timeout))
+        return met or not required
+
+    @actor
+    def wait_joints_settled(self, device='arm', timeout=1.0, velocity=JOINT_SETTLED, required=False):
+        """
+        wait until the joints of device ('arm' or 'gripper') stop moving
+        arg:
+            timeout: the former fixed sleep (sec)
+        """
+        dev = self.get_value(device)
+        motion = JointMotion(lambda: dev.joint_state, dev.joint_names)
+        met, waited = wait_condition(lambda: motion.settled(velocity), timeout, SETTLE_HOLD)
+        self.get_value('wait_log').append(wait_entry(f'{device}_settled', met, waited, timeout))
+        return met or not required
+
     # == Gripper ACTORs ==
     # open gripper
     @actor
     def open(self):
         self.run_actor('open_gripper')
-        self.run_actor('sleep', 2)
+        self.run_actor('wait_joints_settled', 'gripper', 2)
         return True
 
     # close gripper
     @actor
     def close(self):
         self.run_actor('close_gripper')
-        self.run_actor('sleep', 2)
+        self.run_actor('wait_joints_settled', 'gripper', 2)
         return True
 
     @actor
     def open_gripper(self):
         gripper = self.get_value('gripper')
         gripper.open()
-        wait_until_executed(gripper)
-        return True
+        return self.wait_motion(gripper, 'open_gripper')
    
     @actor
     def close_gripper(self):
         gripper = self.get_value('gripper')
         gripper.close()
-        wait_until_executed(gripper)
-        return True
+        return self.wait_motion(gripper, 'close_gripper')
 
     # == STATUS ACTORs ==
     @actor
@@ -175,6 +327,55 @@ class ManipulatorNetwork(SubNet):
         return {
             'joint': self.get_value('joint_stat')
         }
+
+    # per motion telemetry of wait_until_executed
+    @actor
+    def motion_log(self, last=0):
+        log = list(self.get_value('motion_log'))
+        return log[-last:] if last else log
+
+    @actor
+    def motion_stats(self, show=True):
+        """
+        summary of recorded motions by motion name
+        return: {name: {'count', 'plan', 'execute', 'idle_lag'}} (mean seconds)
+        """
+        table = {}
+        for stat in self.get_value('motion_log'):
+            entry = table.setdefault(stat['motion'], {'count': 0, 'plan': 0.0, 'execute': 0.0, 'idle_lag': 0.0})
+            entry['count'] += 1
+            for k in ('plan', 'execute', 'idle_lag'):
+                entry[k] += stat[k]
+        for entry in table.values():
+            for k in ('plan', 'execute', 'idle_lag'):
+                entry[k] /= entry['count']
+        if show:
+            for name, e in table.items():
+                print(f"{name}: count {e['count']}, plan {e['plan']:.3f}s, execute {e['execute']:.3f}s, idle lag {e['idle_lag']:.3f}s")
+        return table
+
+    @actor
+    def clear_motion_log(self):
+        self.get_value('motion_log').clear()
+        return True
+
+    @actor
+    def trajectory_cache_stats(self, show=True, reset=False):
+        """
+        hit rate and planning time saved by cached trajectories
+        arg:
+            reset: start counting a new cycle
+        return: {'hits', 'misses', 'hit_rate', 'saved', 'planning', 'invalidations', 'entries'}
+        """
+        cache = self.get_value('trajectory_cache')
+        stats = cache.stats()
+        if show:
+            print(f"trajectory cache: hit rate {stats['hit_rate']:.0%} ({stats['hits']}/{stats['hits'] + stats['misses']}), "
+                  f"planning saved {stats['saved']:.2f}s, spent {stats['planning']:.2f}s, "
+                  f"scene changes {stats['invalidations']}")
+        if reset:
+            cache.reset_stats()
+        return stats
     
     '''
 def get_joint_state(*args):
@@ -204,7 +405,7 @@ def get_joint_state(*args):
         cur = list(self.get_value('joint_stat'))
         cur[0] = angle
         self.run_actor('move_joint', *cur)
-        self.run_actor('sleep', 1)
+        self.run_actor('wait_joints_settled', 'arm', 1)
         return True
     
     # adjust arm direction to the center of coke can
@@ -216,7 +417,7 @@ def get_joint_state(*args):
         cur = list(self.get_value('joint_stat'))
         cur[0] = angle
         self.run_actor('move_joint', *cur)
-        self.run_actor('sleep', 1)
+        self.run_actor('wait_joints_settled', 'arm', 1)
         return True
 
     # set arm to pick position
@@ -238,7 +439,7 @@ def get_joint_state(*args):
         r_angle = list(map(radians, angle))
         r_angle[0] = value[0]
         self.run_actor('move_joint', *r_angle)
-        self.run_actor('sleep', 3.0)
+        self.run_actor('wait_joints_settled', 'arm', 3.0)
         return True
     
     # set arm to place position
@@ -1,6 +1,18 @@
 from ros_actor import actor, SubNet
 
 from ..print_color import cprint
+from ..detectionlib import DetectionBatch
+
+DETECTION_MAX_AGE = 0.5  # oldest detections accepted without waiting (sec)
+DETECTION_WAIT = 2.0  # wait for fresh detections when cached ones are too old (sec)
+SYNC_SLOP = 0.05  # max stamp difference of detections and paired depth frame (sec)
+MODEL_SIZE = (640, 640)  # yolov8 model input size
+
+def show_detections(batch):
+    cprint(f"==Yolo Detections==", "blue")
+    for label, score, cx, cy in batch.tuples():
+        print(f"{label} ({score:.2f}) at ({cx}, {cy})")
+    cprint(f"===================", "blue")
 
 class PerceptionNetwork(SubNet):
     """
@@ -13,65 +25,35 @@ class PerceptionNetwork(SubNet):
     ###################
     # Isaac ROS YOLOv8
     ###################
+    # latest detections from the persistent subscription
+    #   the depth frame is paired by stamp where it is used (trans_camera_coordinates)
     @actor
-    def detections_subscriber(self):
-        # get images dimensions
-        img_msg = self.run_actor('pic')
-        org_w, org_h = img_msg.width, img_msg.height  # original image size
-        model_w, model_h = 640, 640  # model input size
+    def detection_frame(self, max_age=DETECTION_MAX_AGE, after=None):
+        return self.get_value('detection_cache').latest(max_age, DETECTION_WAIT, after)
 
-        # for adjust ratios
-        aspect_ratio = org_w / org_h  
-        model_h = model_w / aspect_ratio
-        width_ratio = org_w / model_w
-        height_ratio = org_h / model_h
-        padding_ofs = (org_w - org_h)//2
-
-        # get yolov8 detection message
-        detections_msg = self.run_actor('sub_from_yolov8')
+    @actor
+    def detections_subscriber(self, max_age=DETECTION_MAX_AGE, after=None):
+        """
+        latest yolov8 detections rescaled to the original image
+        arg:
+            after: stamp (nanoseconds) the detections must be newer than
+        return: DetectionBatch (empty when no fresh detections)
+        """
         names = self.get_value('work_class_names')
-
-        # summarizing the detection results
-        outputs = []
-        def __str__func(self):
-            return vars(self)  # return as dict
-        Detection_class = type('detection_class', (object,), dict())
-        setattr(Detection_class,"__str__",__str__func)
-
-        for detection in detections_msg.detections:
-            # Coordinates of the detected object
-            output = Detection_class()
-            output.center_x = detection.bbox.center.position.x * width_ratio
-            output.center_y = detection.bbox.center.position.y  * height_ratio - padding_ofs
-            output.width = detection.bbox.size_x * width_ratio
-            output.height = detection.bbox.size_y * height_ratio
-
-            # Name and confidence
-            output.label = names[int(detection.results[0].hypothesis.class_id)]
-            output.conf_score = detection.results[0].hypothesis.score
-
-            outputs.append(output)
-        
-        return outputs
+        # get yolov8 detection message
+        frame = self.run_actor('detection_frame', max_age, after)
+        if not frame:
+            return DetectionBatch((), (), (), (), names)
+        return DetectionBatch.from_msg(frame.msg, names, self.get_value('image_size'), MODEL_SIZE)
 
     @actor
-    def detections_visualizer(self):
-        detections_info = []
-
-        results = self.run_actor('detections_subscriber')
+    def detections_visualizer(self, max_age=DETECTION_MAX_AGE):
+        results = self.run_actor('detections_subscriber', max_age)
         if len(results) == 0:
             print("No detections")
             return False
-        
-        cprint(f"==Yolo Detections==", "blue")
-        for r in results:
-            cx, cy = int(r.center_x), int(r.center_y)
-            label = r.label
-            score = r.conf_score
-            print(f"{label} ({score:.2f}) at ({cx}, {cy})")
-            detections_info.append((label, score, cx, cy))
-        cprint(f"===================", "blue")
-        return detections_info
+        show_detections(results)
+        return results.tuples()
         
 
     @actor
@@ -1,7 +1,7 @@
 from typing import List
+from collections import deque
 from math import radians
 import numpy as np
-import time
 import os
 from operator import add
 import yaml
@@ -20,8 +20,11 @@ from nav2_msgs.action import NavigateToPose
 from sensor_msgs.msg import Image
 from geometry_msgs.msg import Twist
 from action_msgs.msg import GoalStatus
-from nav_msgs.msg import OccupancyGrid
+from action_msgs.srv import CancelGoal
+from nav_msgs.msg import OccupancyGrid, Odometry
 from vision_msgs.msg import Detection2DArray ,Detection3DArray
+from std_msgs.msg import Bool
+from moveit_msgs.srv import GetPlanningScene
 
 import transforms3d
 from pymoveit2 import MoveIt2, GripperInterface
@@ -32,9 +35,21 @@ from ros_actor import actor, SubSystem
 from .approach_action import ApproachAction
 from .cognitive import CognitiveNetwork
 from .manipulator import ManipulatorNetwork
-from .perception import PerceptionNetwork
+from .perception import PerceptionNetwork, MODEL_SIZE
 from .task_flow import TaskFlow
 from .tools import Tools
+from .wait_condition import WaitNetwork
+from ..clocklib import sleep
+from ..tflib import TransformCache
+from ..framelib import FrameCache
+from ..imagelib import decode_depth
+from ..simlib import ColorTracker
+from ..detectionlib import DetectionCache, DetectionBatch
+from ..trackerlib import DetectionTracker
+from ..controllib import OdomCache
+from ..motionlib import MOTIONS, motion
+from ..trajectorylib import TrajectoryCache
+from ..waitlib import TopicSignal
 
 #######################################################
 #
@@ -48,6 +63,13 @@ MOVE_GROUP_GRIPPER: str = "hand"
 OPEN_GRIPPER_JOINT_POSITIONS: List[float] = [0.04, 0.04]
 CLOSED_GRIPPER_JOINT_POSITIONS: List[float] = [0.0, 0.0]
 
+TF_WAIT = 1.0  # deadline of a single TF wait (sec)
+MOTION_LOG_SIZE = 200  # motion telemetry entries kept
+DEPTH_CACHE_SIZE = 5  # depth frames kept for stamp lookup
+WAIT_LOG_SIZE = 200  # condition wait entries kept
+MACHINE_DONE_TOPIC = "/machining_center/done"  # std_msgs/Bool, true at the end of machining
+IMAGE_SIZE = (1280, 720)  # colour image of the realsense (pixels)
+
 def joint_names() -> List[str]:
     return [
         "fr3_joint1",
@@ -75,6 +97,9 @@ def gripper_joint_names() -> List[str]:
 class Melon(SubSystem):
     def __init__(self, name, parent):
         super().__init__(name, parent)
+        self.set_value('wait_log', deque(maxlen=WAIT_LOG_SIZE))
+        # detections associated across frames, fed by perception, queried by target selection
+        self.set_value('target_tracker', DetectionTracker())
         self.add_subsystem('navigation', MelonNavigationSystem)
         self.add_subsystem('camera', MelonCameraSystem)
         self.add_subsystem('perception', MelonPerceptionSystem)
@@ -82,66 +107,57 @@ class Melon(SubSystem):
         self.add_subsystem('ot', FactoryObjectTableSystem)
         self.add_network(TaskFlow)
         self.add_network(Tools)
+        self.add_network(WaitNetwork)
         node = self.get_value('node')
+        machine_done = TopicSignal()
+        self.machine_done_sub = node.create_subscription(
+            Bool, MACHINE_DONE_TOPIC, machine_done.push, 10,
+            callback_group=self.get_value('callback_group'))
+        self.set_value('machine_done', machine_done)
         tf_buffer = Buffer()
         tf_listener = TransformListener(tf_buffer, node)
         self.set_value('tf_buffer', tf_buffer)
+        self.set_value('tf_cache', TransformCache(tf_buffer))
     
-    def get_trans(self, from_frame, to_frame):
-        tf_buffer = self.get_value('tf_buffer')
-        if not tf_buffer.can_transform(
-                to_frame,
-                from_frame,
-                rclpy.time.Time()):
-            return None
-        tf = None
-        try:
-            tf = tf_buffer.lookup_transform(
-                to_frame,
-                from_frame,
-                rclpy.time.Time())
-        except TransformException as ex:
-            print(ex)
-        return tf
+    def get_trans(self, from_frame, to_frame, timeout=0.0):
+        tf_cache = self.get_value('tf_cache')
+        return tf_cache.lookup(to_frame, from_frame, timeout)
 
-    @actor
-    def map_trans(self, src="camera_link"):
+    def wait_trans(self, from_frame, to_frame):
         while True:
-            ret = self.get_trans(src, "map")
+            ret = self.get_trans(from_frame, to_frame, TF_WAIT)
             if ret: return ret
-            self.run_actor('sleep', 1)
+
+    @actor
+    def map_trans(self, src="camera_link"):
+        return self.wait_trans(src, "map")
     
     @actor
     def var_trans(self, target="link1"):
-        while True:
-            ret = self.get_trans("camera_link", target)
-            if ret: return ret
-            self.run_actor('sleep', 1)
+        return self.wait_trans("camera_link", target)
     
     @actor
     def uni_trans(self, src="camera_link", target="map"):
-        while True:
-            ret = self.get_trans(src, target)
-            if ret: return ret
-            self.run_actor('sleep', 1)
+        return self.wait_trans(src, target)
     
     @actor
     def base_trans(self, src="camera_color_optical_frame"):
-        while True:
-            ret = self.get_trans(src, "base_link")
-            if ret: return ret
-            self.run_actor('sleep', 1)
+        return self.wait_trans(src, "base_link")
     
     @actor
     def gripper_trans(self):
-        while True:
-            ret = self.get_trans("link5", "base_link")
-            if ret: return ret
-            self.run_actor('sleep', 1)
+        return self.wait_trans("link5", "base_link")
     
     @actor
     def sleep(self, st):
-        time.sleep(st)
+        sleep(st)
+
+    # ActorBT: run an actor as the motion of the token its cancel actor targets
+    @actor
+    def with_token(self, token, type, *args):
+        with MOTIONS.motion(token):
+            if MOTIONS.cancelled(): return False
+            return self.run_actor(type, *args)
     
 class MelonNavigationSystem(SubSystem):
     def __init__(self, name, parent):
@@ -150,6 +166,15 @@ class MelonNavigationSystem(SubSystem):
         self.register_publisher('motor', Twist, '/cmd_vel', 10)
         self.add_network(ApproachAction)
         self.set_value('current_pose', (0.0, 0.0, 0.0))
+        self.set_value('nav_cancel_client', self.get_value('node').create_client(
+            CancelGoal, "/navigate_to_pose/_action/cancel_goal",
+            callback_group=self.get_value('callback_group')))
+
+        # latest odometry for distance moves (TF is used while it is not published)
+        self.register_subscriber('odom', Odometry, "/odom", 10)
+        odom_cache = OdomCache()
+        self.set_value('odom_cache', odom_cache)
+        self.odom_feed = self.run_actor_mode('odom', 'multi', odom_cache.push)
     
     def create_move_base_goal(self, x, y, theta):
         """ Creates a MoveBaseGoal message from a 2D navigation pose """
@@ -181,9 +206,13 @@ class MelonNavigationSystem(SubSystem):
 
 
     @actor
+    @motion
     def goto(self, x, y, theta):
         goal = self.create_move_base_goal(x, y, theta)
+        if MOTIONS.cancelled(): return False
         result = self.run_actor('navigate', goal)
+        if MOTIONS.cancelled():
+            return False
         self.set_value('current_pose', (x, y, theta))
 #        return (result.status == GoalStatus.STATUS_SUCCEEDED)
         return True
@@ -202,9 +231,17 @@ class MelonCameraSystem(SubSystem):
         self.register_subscriber('pic',Image,"/camera/color/image_raw",10)
         self.register_subscriber('depth',Image,"/camera/aligned_depth_to_color/image_raw",10)
 
+        # latest depth frames shared by all consumers, decoded at most once
+        # (fed by the 'depth' subscriber, no second subscription on the topic)
+        depth_cache = FrameCache(decode_depth, DEPTH_CACHE_SIZE)
+        self.set_value('depth_cache', depth_cache)
+        self.depth_feed = self.run_actor_mode('depth', 'multi', depth_cache.push)
+        # colour segmentation keeps the last hit across pic_find calls
+        self.set_value('color_tracker', ColorTracker())
+
         camera_info = dict()
         camera_info['realsense_rgb'] = {
-            "width": 1280, "height": 720,
+            "width": IMAGE_SIZE[0], "height": IMAGE_SIZE[1],
             "frame_name": "camera_color_optical_frame",
             "focal_len": (640.8300702045303, 476.05344464216915),  # 焦点距離(x, y)
             "optical_cen": (640.0, 360.0),  # 光学中心(x, y)
@@ -256,6 +293,19 @@ class MelonPerceptionSystem(SubSystem):
         self.set_value('work_class_names', work_class_names)
         
         self.register_subscriber('sub_from_yolov8', Detection2DArray, "/detections_output", 10)
+
+        # latest detections kept for immediate use and the target tracker,
+        # both fed by 'sub_from_yolov8'
+        detection_cache = DetectionCache()
+        self.set_value('detection_cache', detection_cache)
+        self.set_value('image_size', IMAGE_SIZE)
+        tracker = self.get_value('target_tracker')
+
+        def detections_received(msg):
+            detection_cache.push(msg)
+            batch = DetectionBatch.from_msg(msg, work_class_names, IMAGE_SIZE, MODEL_SIZE)
+            tracker.update(batch, batch.stamp)
+        self.detection_feed = self.run_actor_mode('sub_from_yolov8', 'multi', detections_received)
         self.register_subscriber('sub_from_foundationpose', Detection3DArray, "/pose_estimation/output", 10)
 
 class MelonManipulatorSystem(SubSystem):
@@ -294,6 +344,9 @@ class MelonManipulatorSystem(SubSystem):
         self.set_value('arm', arm)
         self.set_value('gripper', gripper) 
         self.set_value('joint_stat', [0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0])  # changed
+        self.set_value('motion_log', deque(maxlen=MOTION_LOG_SIZE))
+        self.set_value('trajectory_cache', TrajectoryCache())
+        self.set_value('scene_client', node.create_client(GetPlanningScene, "/get_planning_scene", callback_group=cg))
 
 class FactoryObjectTableSystem(SubSystem):
     def __init__(self, name, parent) -> None:
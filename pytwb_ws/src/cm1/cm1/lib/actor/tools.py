@@ -6,6 +6,8 @@ from pyquaternion import Quaternion
 from pytwb import lib_main
 from ros_actor import SubNet, actor, register_bt
 from ..pointlib import PointEx
+from ..transformlib import RigidTransform
+from ..tracelib import TRACER
 
 class Tools(SubNet):
     # command version
@@ -75,10 +77,41 @@ class Tools(SubNet):
         ref = PointEx(1.0, 0.0)
         trans = self.run_actor('map_trans')
         if not trans: return
-        root.setTransform(trans.transform)
-        ref.setTransform(trans.transform)
+        rigid = RigidTransform.from_msg(trans)
+        root.setTransform(trans.transform, rigid)
+        ref.setTransform(trans.transform, rigid)
         print(f'x:{root.x}, y:{root.y}, z:{degrees(root.z)}')
         rx = ref.x - root.x
         ry = ref.y - root.y
         robot_angle = atan2(ry, rx)
         print(f'robot angle to X axis: {degrees(robot_angle)}')
+
+    # == BT timing trace ==
+    @actor
+    def bt_trace_start(self):
+        """
+        record node spans of the behaviour trees run from now on
+        """
+        TRACER.instrument()
+        TRACER.start()
+        return True
+
+    @actor
+    def bt_trace_stop(self, path='bt_trace.json', show=True):
+        """
+        stop recording and save chrome trace event json
+        (chrome://tracing or https://ui.perfetto.dev)
+        """
+        TRACER.stop()
+        TRACER.save(path)
+        if show:
+            print(TRACER.format_summary())
+            print(f'trace saved to {os.path.abspath(path)}')
+        return path
+
+    @actor
+    def bt_trace_summary(self, show=True):
+        table = TRACER.summary()
+        if show:
+            print(TRACER.format_summary(table))
+        return table
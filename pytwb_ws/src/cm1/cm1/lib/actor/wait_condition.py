@@ -0,0 +1,52 @@
+from ros_actor import SubNet, actor
+
+from ..clocklib import monotonic
+from ..waitlib import wait_entry
+from ..print_color import cprint
+
+class WaitNetwork(SubNet):
+    # machining center reports the end of the machining
+    @actor
+    def wait_machine_done(self, timeout=20.0, required=False):
+        """
+        wait for the machine done signal instead of a fixed sleep
+        arg:
+            timeout: the former fixed sleep (sec)
+            required: fail when the signal does not come
+        """
+        start = monotonic()
+        met = self.get_value('machine_done').wait_after(start, timeout)
+        self.get_value('wait_log').append(wait_entry('machine_done', met, monotonic() - start, timeout))
+        if not met:
+            cprint(f'machine done not signalled in {timeout}s', 'yellow')
+        return met or not required
+
+    # == STATUS ACTORs ==
+    @actor
+    def wait_log(self, last=0):
+        log = list(self.get_value('wait_log'))
+        return log[-last:] if last else log
+
+    @actor
+    def wait_stats(self, show=True):
+        """
+        condition waits against the fixed sleeps they replace
+        return: {name: {'count', 'met', 'waited', 'replaces'}} (total seconds)
+        """
+        table = {}
+        for entry in self.get_value('wait_log'):
+            stat = table.setdefault(entry['wait'], {'count': 0, 'met': 0, 'waited': 0.0, 'replaces': 0.0})
+            stat['count'] += 1
+            stat['met'] += 1 if entry['met'] else 0
+            stat['waited'] += entry['waited']
+            stat['replaces'] += entry['replaces']
+        if show:
+            for name, s in table.items():
+                print(f"{name}: count {s['count']}, met {s['met']}, waited {s['waited']:.2f}s "
+                      f"instead of {s['replaces']:.2f}s (saved {s['replaces'] - s['waited']:.2f}s)")
+        return table
+
+    @actor
+    def clear_wait_log(self):
+        self.get_value('wait_log').clear()
+        return True
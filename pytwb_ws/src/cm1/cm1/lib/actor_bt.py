@@ -3,72 +3,64 @@ import py_trees
 from pytwb.common import behavior
 from ros_actor import run_actor_async
 
-from threading import Semaphore
+from lib.boardlib import BOARD
+from lib.calleelib import CalleeSequence, Call, Parallel
 
-class SharedData:
-    def __init__(self) -> None:
-        self.sem = Semaphore()
-        self.callee = []
-        self.status = py_trees.common.Status.INVALID
-    
-    def set_callee(self, callee):
-        with self.sem:
-            self.callee = callee
-
-    def execute(self):
-        type, args = self.callee.pop(0)
-        if not args: args = ()
-        run_actor_async(type, self.actor_callback, *args)
-        
-    def actor_callback(self, result):
-        has_next = False
-        with self.sem:
-            if len(self.callee) == 0:
-                if result == False:
-                    self.status = py_trees.common.Status.FAILURE
-                else:
-                    self.status = py_trees.common.Status.SUCCESS
-            else:
-                has_next = True
-        if has_next:
-            self.execute()
-    
-    def get_status(self):
-        with self.sem:
-            ret = self.status
-        return ret
-
-    def initialise(self):
-        with self.sem:
-            self.status = py_trees.common.Status.RUNNING
-        self.execute()
+class SharedData(CalleeSequence):
+    def __init__(self, node=None) -> None:
+        super().__init__(run_actor_async, node)
 
+#
+## behaviour running actors without blocking the tick
+##   callee() gives the steps: (actor name, args), Call or Parallel of them,
+##   done() checks the result in the tick thread,
+##   cancel names the actor stopping the motion when the node is preempted
+#
 class ActorBT(py_trees.behaviour.Behaviour):
+    cancel = None
+
     def __init__(self, name, type, *args):
         super().__init__(name)
         self.args = args
         self.type = type
-    
+        self.shared = None
+
+    def callee(self):
+        """
+        return: [(actor name, args or function(previous result) -> args) | Call | Parallel, ...]
+        """
+        if isinstance(self.type, tuple):
+            return list(self.type)
+        return [(self.type, self.args)]
+
     def initialise(self):
-        type = self.type
-        self.shared = SharedData()
-        if isinstance(type, tuple):
-            callee = list(type)
-        else:
-            callee = [(type, self.args)]
+        self.shared = SharedData(self)
+        callee = self.callee()
         self.shared.set_callee(callee)
-        # self.type = type
-    
-    # def initialise(self):
-        self.logger.info(f'start {type}')
+        self.logger.info(f'start {[[c.type for c in s] for s in self.shared.steps]}')
         self.shared.initialise()
 
     def update(self):
-        return self.shared.get_status()          
+        # results of Call(key=...) to the blackboard
+        for key, value in self.shared.take_results().items():
+            BOARD.set(key, value)
+        status = self.shared.get_status()
+        if status == py_trees.common.Status.SUCCESS:
+            return self.done(self.shared.get_result())
+        return status
+
+    def done(self, result):
+        """
+        called in the tick thread when every actor has succeeded
+        return: status of the node
+        """
+        return py_trees.common.Status.SUCCESS
 
     def terminate(self, new_status):
-        return
+        # preempted while actors are running, SharedData starts the cancel actors
+        if new_status == py_trees.common.Status.INVALID and self.shared and self.shared.cancel():
+            self.logger.info('cancelled')
 #        self.logger.info(f"Terminated with status {new_status}")
 
     def set_callee(self, callee):
-        self.shared.set_callee(callee)
\ No newline at end of file
+        self.shared.set_callee(callee)
@@ -0,0 +1,88 @@
+from collections import namedtuple
+from threading import Lock
+
+import py_trees
+
+Point3 = namedtuple('Point3', 'x y z')
+Pose2D = namedtuple('Pose2D', 'x y theta')
+Quat = namedtuple('Quat', 'x y z w')
+
+# typed entries: key -> (type, flat keys also written for untyped readers)
+#   type None: any object, stored as is
+ENTRIES = {
+    'base': (Point3, ('base_x', 'base_y', 'base_z')),  # target in base_link (m)
+    'map': (Point3, ('map_x', 'map_y', 'map_z')),  # target in map (m)
+    'quat_list': (Quat, ()),  # gripper orientation
+    'target_pose': (Pose2D, ()),  # next robot pose (m, rad)
+    'watch_origin': (Pose2D, ()),
+    'target': (None, ()),  # detectionlib.Target (label, score, cx, cy, stamp)
+    'glanced_point': (None, ()),  # PointEx
+    'found_point': (None, ()),  # PointBag
+}
+
+def coerce(key, value):
+    type = ENTRIES.get(key, (None,))[0]
+    if type is None or value is None or isinstance(value, type):
+        return value
+    if len(value) != len(type._fields):
+        raise TypeError(f'{key}: {type.__name__} needs {len(type._fields)} values, got {value!r}')
+    return type(*(float(v) for v in value))
+
+#
+## key change subscription: the version seen, polled by changed()/take() in the tick thread
+#
+class Subscription:
+    def __init__(self, board, key):
+        self.board = board
+        self.key = key
+        self.seen = board.version(key)
+
+    def changed(self):
+        # written since subscribe or the last take
+        return self.board.version(self.key) != self.seen
+
+    def take(self):
+        """
+        return: (changed, value)
+        """
+        with self.board.lock:
+            version = self.board.versions.get(self.key, 0)
+            changed = version != self.seen
+            self.seen = version
+            return changed, self.board.get(self.key)
+
+#
+## typed entries on the py_trees blackboard, written atomically with a version per key
+#
+class PoseBoard:
+    def __init__(self):
+        self.lock = Lock()
+        self.versions = {}
+
+    def set(self, key, value):
+        """
+        write a value, typed entries are converted to their type
+            (TypeError if the value does not fit)
+        """
+        value = coerce(key, value)
+        flat = ENTRIES.get(key, (None, ()))[1]
+        with self.lock:
+            py_trees.blackboard.Blackboard.set(key, value)
+            if flat:
+                for k, v in zip(flat, value if value is not None else [None] * len(flat)):
+                    py_trees.blackboard.Blackboard.set(k, v)
+            self.versions[key] = self.versions.get(key, 0) + 1
+        return value
+
+    def get(self, key, default=None):
+        return py_trees.blackboard.Blackboard.storage.get('/' + key.lstrip('/'), default)
+
+    def version(self, key):
+        # number of writes so far
+        return self.versions.get(key, 0)
+
+    def subscribe(self, key):
+        # writes after this call are seen as changes
+        return Subscription(self, key)
+
+BOARD = PoseBoard()
@@ -0,0 +1,229 @@
+from itertools import count
+from threading import Lock, Timer
+
+import py_trees
+
+from .clocklib import wall
+from .motionlib import MOTIONS, TOKEN_ACTOR
+from .tracelib import TRACER
+
+Status = py_trees.common.Status
+
+class Call:
+    """
+    one actor of a callee sequence
+    arg:
+        args: tuple, or function(previous result) -> tuple
+        timeout: deadline of the actor (sec), the node fails when it expires
+        key: blackboard key the result is written to
+        cancel: actor stopping this one when it is abandoned (node default if None),
+            started with the token of the motion to stop (motionlib)
+    """
+    __slots__ = ('type', 'args', 'timeout', 'key', 'cancel')
+
+    def __init__(self, type, args=(), timeout=None, key=None, cancel=None):
+        self.type = type
+        self.args = args
+        self.timeout = timeout
+        self.key = key
+        self.cancel = cancel
+
+class Parallel:
+    """
+    actors started together, the next step waits for all of them
+    the result passed on is the list of their results
+    """
+    __slots__ = ('calls',)
+
+    def __init__(self, *calls):
+        self.calls = [as_call(c) for c in calls]
+
+def as_call(c):
+    if isinstance(c, Call): return c
+    type, args = c
+    return Call(type, args if args else ())
+
+def as_step(c):
+    if isinstance(c, Parallel): return c.calls
+    return [as_call(c)]
+
+#
+## runs a callee sequence through an asynchronous actor runner
+##   steps run one after another, the calls of a step run concurrently
+#
+class CalleeSequence:
+    def __init__(self, runner, node=None):
+        """
+        arg:
+            runner: runner(type, callback, *args) starting an actor (run_actor_async)
+            node: behaviour running the actors, for tracing, logging and cancel
+        """
+        self.runner = runner
+        self.node = node
+        self.sem = Lock()
+        self.steps = []
+        self.index = 0
+        self.status = Status.INVALID
+        self.result = None  # result of the last step
+        self.results = {}  # keyed results not yet written to the blackboard
+        self.running = {}  # slot -> (Call, timer, trace, motion token) of the current step
+        self.group = []
+        self.pending = 0
+        self.gens = count(1)
+        self.gen = 0  # callbacks of an abandoned step are ignored
+        self.cancelled = False
+
+    def set_callee(self, callee):
+        with self.sem:
+            self.steps = [as_step(c) for c in callee]
+            self.index = 0
+
+    def initialise(self):
+        with self.sem:
+            if not self.steps:
+                # nothing to run, e.g. inputs missing on the blackboard
+                self.status = Status.FAILURE
+                return
+            self.status = Status.RUNNING
+        self.execute()
+
+    def execute(self):
+        with self.sem:
+            if self.cancelled or self.status != Status.RUNNING: return
+            calls = self.steps[self.index]
+            prev = self.result
+            gen = self.gen = next(self.gens)
+            self.group = [None] * len(calls)
+            self.pending = len(calls)
+        arg_list = []
+        for call in calls:
+            args = call.args
+            # args may be computed from the result of the previous step
+            if callable(args):
+                try:
+                    args = args(prev)
+                except Exception as ex:
+                    self.log(f'{call.type}: {ex}')
+                    self.abort(self.fail(gen))
+                    return
+            arg_list.append(args if args else ())
+        default = getattr(self.node, 'cancel', None)
+        with self.sem:
+            if gen != self.gen: return
+            for slot, call in enumerate(calls):
+                timer = None
+                if call.timeout:
+                    timer = Timer(wall(call.timeout), self.expire, (slot, gen))
+                    timer.daemon = True
+                trace = None
+                if self.node:
+                    trace = TRACER.begin_async(
+                        call.type, 'actor', {'node': self.node.name, 'class': self.node.__class__.__name__})
+                # the cancel actor targets the token of the motion it stops
+                token = MOTIONS.issue() if call.cancel or default else None
+                self.running[slot] = (call, timer, trace, token)
+            started = list(self.running.items())
+        for slot, (call, timer, trace, token) in started:
+            if timer: timer.start()
+            callback = lambda result, slot=slot, gen=gen: self.actor_callback(result, slot, gen)
+            if token:
+                self.runner(TOKEN_ACTOR, callback, token, call.type, *arg_list[slot])
+            else:
+                self.runner(call.type, callback, *arg_list[slot])
+
+    def actor_callback(self, result, slot=0, gen=None):
+        has_next = False
+        abandoned = []
+        with self.sem:
+            if self.cancelled or gen != self.gen or slot not in self.running: return
+            call, timer, trace, _ = self.running.pop(slot)
+            if timer: timer.cancel()
+            TRACER.end_async(trace, {'result': repr(result)[:80]})
+            if call.key:
+                self.results[call.key] = result
+            self.group[slot] = result
+            if result == False:
+                # a failed actor ends the sequence
+                abandoned = self.fail_locked()
+            else:
+                self.pending -= 1
+                if self.pending == 0:
+                    self.result = self.group[0] if len(self.group) == 1 else list(self.group)
+                    self.index += 1
+                    if self.index == len(self.steps):
+                        self.status = Status.SUCCESS
+                    else:
+                        has_next = True
+        self.abort(abandoned)
+        if has_next:
+            self.execute()
+
+    def expire(self, slot, gen):
+        with self.sem:
+            if self.cancelled or gen != self.gen or slot not in self.running: return
+            call = self.running[slot][0]
+            abandoned = self.fail_locked()
+        self.log(f'{call.type}: no result in {call.timeout}s')
+        self.abort(abandoned)
+
+    def fail(self, gen):
+        with self.sem:
+            if gen != self.gen: return []
+            return self.fail_locked()
+
+    def fail_locked(self):
+        # end the sequence, return the calls still in flight with their motion tokens
+        abandoned = self.take_running()
+        self.status = Status.FAILURE
+        self.gen = next(self.gens)
+        return abandoned
+
+    def take_running(self):
+        abandoned = []
+        for call, timer, trace, token in self.running.values():
+            if timer: timer.cancel()
+            TRACER.end_async(trace, {'result': 'abandoned'})
+            abandoned.append((call, token))
+        self.running = {}
+        return abandoned
+
+    def abort(self, calls):
+        # stop abandoned actors through their cancel actors, given the tokens of their motions
+        default = getattr(self.node, 'cancel', None)
+        tokens = {}
+        for call, token in calls:
+            type = call.cancel or default
+            if type:
+                tokens.setdefault(type, []).append(token)
+        for type, targets in tokens.items():
+            self.runner(type, lambda _: None, *targets)
+
+    def cancel(self):
+        """
+        preempted: drop the results of the running actors and the rest of the sequence
+        return: True if an actor was running
+        """
+        with self.sem:
+            running = self.status == Status.RUNNING
+            self.cancelled = True
+            self.status = Status.INVALID
+            abandoned = self.take_running()
+        self.abort(abandoned)
+        return running
+
+    def log(self, text):
+        if self.node: self.node.logger.warning(text)
+
+    def get_status(self):
+        with self.sem:
+            return self.status
+
+    def get_result(self):
+        with self.sem:
+            return self.result
+
+    def take_results(self):
+        # keyed results arrived since the last call
+        with self.sem:
+            results, self.results = self.results, {}
+        return results
@@ -0,0 +1,57 @@
+import math
+
+import numpy as np
+
+DEPROJECT_WINDOW = 5  # side of the pixel window for the depth median
+PIX_BASELINE = 500  # base line length of the horizontal position estimate (pixel)
+
+def window_depths(depth_image, xs, ys, window=DEPROJECT_WINDOW):
+    """
+    robust depth at many pixels from a single frame
+    arg:
+        xs, ys: (N,) pixel coordinates
+        window: odd window side, invalid (0, inf, nan) depths are ignored
+    return: (N,) median depth, nan where the window has no valid depth
+    """
+    h, w = depth_image.shape[:2]
+    xs = np.clip(np.asarray(xs, dtype=int).reshape(-1), 0, w - 1)
+    ys = np.clip(np.asarray(ys, dtype=int).reshape(-1), 0, h - 1)
+    r = window // 2
+    off = np.arange(-r, r + 1)
+    px = np.clip(xs[:, None, None] + off[None, None, :], 0, w - 1)
+    py = np.clip(ys[:, None, None] + off[None, :, None], 0, h - 1)
+    patch = np.asarray(depth_image[py, px], dtype=float).reshape(len(xs), -1)
+    patch[~(np.isfinite(patch) & (patch > 0.0))] = np.nan
+    # median over valid values; rows without any are left as nan
+    valid = ~np.all(np.isnan(patch), axis=1)
+    depth = np.full(len(xs), np.nan)
+    if np.any(valid):
+        depth[valid] = np.nanmedian(patch[valid], axis=1)
+    return depth
+
+def deproject_pixels(depth_image, xs, ys, focal_len, optical_cen, window=DEPROJECT_WINDOW):
+    """
+    pixel coordinates to camera (optical frame) coordinates
+    arg:
+        focal_len: (f_x, f_y)
+        optical_cen: (c_x, c_y)
+    return: (N, 3) coordinates, (N,) validity mask
+    """
+    xs = np.asarray(xs, dtype=float).reshape(-1)
+    ys = np.asarray(ys, dtype=float).reshape(-1)
+    f_x, f_y = focal_len
+    c_x, c_y = optical_cen
+    z = window_depths(depth_image, xs, ys, window)
+    points = np.column_stack(((xs - c_x) * z / f_x, (ys - c_y) * z / f_y, z))
+    return points, ~np.isnan(z)
+
+def pix_to_coordinate(pix, distance, width, lp=PIX_BASELINE):
+    """
+    horizontal position from a depth image column
+    arg:
+        pix: column (pixel), distance: depth at the column (m), width: image width (pixel)
+    return: x (depth direction), y (horizontal, left positive)
+    """
+    pix = width / 2 - pix  # Pixel value in the horizontal direction with the center at 0
+    mag = distance / math.sqrt(pix**2 + lp**2)
+    return lp * mag, pix * mag * 2
@@ -0,0 +1,54 @@
+import time
+
+#
+## process wide clock of control loops, waits and timeouts
+##   the wall clock by default, a faster sim clock under a stand-in harness
+#
+class WallClock:
+    rate = 1.0
+
+    def monotonic(self):
+        return time.monotonic()
+
+    def sleep(self, sec):
+        if sec > 0: time.sleep(sec)
+
+#
+## clock running rate times faster than the wall clock
+##   continues from the wall clock value at creation, so times taken before stay comparable
+#
+class SimClock:
+    def __init__(self, rate=1.0):
+        self.rate = rate
+        self.origin = time.monotonic()
+
+    def monotonic(self):
+        return self.origin + (time.monotonic() - self.origin) * self.rate
+
+    def sleep(self, sec):
+        if sec > 0: time.sleep(sec / self.rate)
+
+    def elapsed(self):
+        # sim seconds since creation
+        return self.monotonic() - self.origin
+
+CLOCK = WallClock()
+
+def use(clock):
+    """
+    switch the clock, call before the subsystems start
+    return: the clock
+    """
+    global CLOCK
+    CLOCK = clock
+    return clock
+
+def monotonic():
+    return CLOCK.monotonic()
+
+def sleep(sec):
+    CLOCK.sleep(sec)
+
+def wall(sec):
+    # wall seconds for sec of the clock, for timeouts of threading waits
+    return sec / CLOCK.rate
@@ -0,0 +1,164 @@
+import math
+from .clocklib import monotonic, sleep
+
+def wrap_angle(a):
+    return (a + math.pi) % (2 * math.pi) - math.pi
+
+#
+## fixed rate loop (absolute deadlines, no drift)
+#
+class RateLoop:
+    def __init__(self, rate, clock=monotonic, sleeper=sleep):
+        self.period = 1.0 / rate
+        self.clock = clock
+        self.sleeper = sleeper
+        self.next = None
+
+    def wait(self):
+        now = self.clock()
+        if self.next is None:
+            self.next = now
+        self.next += self.period
+        if self.next > now:
+            self.sleeper(self.next - now)
+        else:
+            self.next = now  # overrun, restart the schedule
+        return self.period
+
+#
+## PI heading controller with saturation, anti-windup and settle criterion
+#
+class HeadingController:
+    def __init__(self, kp=2.0, ki=0.2, max_rate=1.0, min_rate=0.05,
+                 tolerance=0.02, settle_time=0.2):
+        self.kp = kp
+        self.ki = ki
+        self.max_rate = max_rate  # rad/s
+        self.min_rate = min_rate  # below this the base does not turn
+        self.tolerance = tolerance  # rad
+        self.settle_time = settle_time  # sec within tolerance to finish
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self.in_tolerance = 0.0
+
+    def step(self, error, dt):
+        """
+        error: goal - current heading (rad), dt: period (sec)
+        return: angular rate command (rad/s)
+        """
+        error = wrap_angle(error)
+        if abs(error) < self.tolerance:
+            self.in_tolerance += dt
+            self.integral = 0.0
+            return 0.0
+        self.in_tolerance = 0.0
+        rate = self.kp * error + self.ki * (self.integral + error * dt)
+        if abs(rate) < self.max_rate:
+            # integrate only while not saturated
+            self.integral += error * dt
+        else:
+            rate = math.copysign(self.max_rate, rate)
+        if abs(rate) < self.min_rate:
+            rate = math.copysign(self.min_rate, rate)
+        return rate
+
+    @property
+    def settled(self):
+        return self.in_tolerance >= self.settle_time
+
+#
+## kinematic unicycle with first order velocity response, stand-in for the base
+#
+class UnicyclePlant:
+    def __init__(self, x=0.0, y=0.0, theta=0.0, tau=0.1):
+        self.x = x
+        self.y = y
+        self.theta = theta
+        self.tau = tau  # time constant of the velocity response (sec)
+        self.v = 0.0
+        self.w = 0.0
+        self.cmd_v = 0.0
+        self.cmd_w = 0.0
+        self.time = 0.0
+        self.odom = 0.0  # travelled distance along the heading
+
+    def command(self, v, w):
+        self.cmd_v = v
+        self.cmd_w = w
+
+    def step(self, dt, substep=0.005):
+        while dt > 1e-12:
+            h = min(dt, substep)
+            k = h / self.tau if self.tau > 0.0 else 1.0
+            k = min(k, 1.0)
+            self.v += (self.cmd_v - self.v) * k
+            self.w += (self.cmd_w - self.w) * k
+            self.x += self.v * math.cos(self.theta) * h
+            self.y += self.v * math.sin(self.theta) * h
+            self.odom += self.v * h
+            self.theta = wrap_angle(self.theta + self.w * h)
+            self.time += h
+            dt -= h
+
+    def pose(self):
+        return self.x, self.y, self.theta
+
+#
+## trapezoidal velocity profile to stop at a given remaining distance
+#
+class TrapezoidProfile:
+    def __init__(self, max_speed=0.2, accel=0.4, decel=0.4, min_speed=0.02, lag=0.1):
+        self.max_speed = max_speed  # m/s
+        self.accel = accel  # m/s^2
+        self.decel = decel  # m/s^2
+        self.min_speed = min_speed  # creep speed near the goal
+        self.lag = lag  # velocity response delay compensated when braking (sec)
+        self.speed = 0.0
+
+    def step(self, remaining, dt):
+        """
+        remaining: distance to go (m, negative when passed), dt: period (sec)
+        return: speed command (m/s), 0 when arrived
+        """
+        # distance covered before the command takes effect
+        remaining -= self.speed * self.lag
+        if remaining <= 0.0:
+            self.speed = 0.0
+            return 0.0
+        braking = (2.0 * self.decel * remaining) ** 0.5
+        speed = min(self.max_speed, self.speed + self.accel * dt, braking)
+        self.speed = max(speed, min(self.min_speed, braking))
+        return self.speed
+
+#
+## latest base pose from nav_msgs/Odometry
+#
+class OdomCache:
+    def __init__(self):
+        self.pose = None  # (x, y, yaw) in the odometry frame
+        self.twist = None  # (linear x, angular z) by m/s and rad/s
+        self.received = None
+
+    # subscription callback
+    def push(self, msg):
+        p = msg.pose.pose.position
+        q = msg.pose.pose.orientation
+        yaw = math.atan2(2 * (q.w * q.z + q.x * q.y), 1 - 2 * (q.y * q.y + q.z * q.z))
+        t = msg.twist.twist
+        self.pose = (p.x, p.y, yaw)
+        self.twist = (t.linear.x, t.angular.z)
+        self.received = monotonic()
+
+    def latest(self, max_age=0.2):
+        # pose, or None when odometry is not coming in
+        pose, received = self.pose, self.received
+        if pose is None or monotonic() - received > max_age:
+            return None
+        return pose
+
+def travelled(start, pose):
+    # signed distance moved along the start heading
+    x0, y0, yaw0 = start
+    return (pose[0] - x0) * math.cos(yaw0) + (pose[1] - y0) * math.sin(yaw0)
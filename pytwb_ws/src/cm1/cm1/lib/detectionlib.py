@@ -0,0 +1,129 @@
+from collections import namedtuple
+from threading import Condition
+from .clocklib import monotonic, wall
+
+import numpy as np
+
+from .framelib import msg_stamp_ns
+
+# selected detection, stamp (nanoseconds) of its frame pairs it with the depth frame
+Target = namedtuple('Target', 'label score cx cy stamp')
+
+class DetectionFrame:
+    __slots__ = ('msg', 'stamp', 'received')
+
+    def __init__(self, msg, received):
+        self.msg = msg
+        self.stamp = msg_stamp_ns(msg)
+        self.received = received
+
+    def age(self):
+        return monotonic() - self.received
+
+#
+## latest detection message kept by a persistent subscription
+#
+class DetectionCache:
+    def __init__(self):
+        self.frame = None
+        self.cond = Condition()
+
+    # subscription callback
+    def push(self, msg):
+        frame = DetectionFrame(msg, monotonic())
+        with self.cond:
+            self.frame = frame
+            self.cond.notify_all()
+
+    def latest(self, max_age=0.5, timeout=1.0, after=None):
+        """
+        latest detections not older than max_age (sec)
+        waits up to timeout for a newer message when the cached one is stale
+        arg:
+            after: stamp (nanoseconds) the detections must be newer than
+        return: DetectionFrame or None
+        """
+        def fresh():
+            frame = self.frame
+            return frame and frame.age() <= max_age and (after is None or frame.stamp > after)
+        with self.cond:
+            ok = self.cond.wait_for(fresh, wall(timeout))
+            frame = self.frame
+        return frame if ok else None
+
+#
+## columnar batch of 2D detections
+#
+class DetectionBatch:
+    __slots__ = ('centers', 'sizes', 'scores', 'class_ids', 'names', 'stamp')
+
+    def __init__(self, centers, sizes, scores, class_ids, names, stamp=None):
+        self.centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+        self.sizes = np.asarray(sizes, dtype=float).reshape(-1, 2)
+        self.scores = np.asarray(scores, dtype=float).reshape(-1)
+        self.class_ids = np.asarray(class_ids, dtype=int).reshape(-1)
+        self.names = names
+        self.stamp = stamp  # frame stamp (nanoseconds)
+
+    @classmethod
+    def from_msg(cls, msg, names, image_size, model_size=(640, 640)):
+        """
+        build from Detection2DArray, rescaling model (letterbox) coordinates
+        to the original image
+        arg:
+            names: {class_id: label}
+            image_size: (width, height) of the original image
+        """
+        dets = msg.detections
+        n = len(dets)
+        raw = np.empty((n, 4))
+        scores = np.empty(n)
+        class_ids = np.empty(n, dtype=int)
+        for i, d in enumerate(dets):
+            bbox = d.bbox
+            hyp = d.results[0].hypothesis
+            raw[i] = (bbox.center.position.x, bbox.center.position.y, bbox.size_x, bbox.size_y)
+            scores[i] = hyp.score
+            class_ids[i] = int(hyp.class_id)
+        org_w, org_h = image_size
+        model_w = model_size[0]
+        # for adjust ratios
+        model_h = model_w / (org_w / org_h)
+        ratio = np.array((org_w / model_w, org_h / model_h))
+        padding_ofs = np.array((0, (org_w - org_h)//2))
+        return cls(raw[:, :2] * ratio - padding_ofs, raw[:, 2:] * ratio, scores, class_ids, names,
+                   msg_stamp_ns(msg))
+
+    def __len__(self):
+        return len(self.scores)
+
+    @property
+    def labels(self):
+        return [self.names[i] for i in self.class_ids.tolist()]
+
+    def class_id(self, label):
+        return [k for k, v in self.names.items() if v == label]
+
+    def take(self, index):
+        return DetectionBatch(
+            self.centers[index], self.sizes[index], self.scores[index], self.class_ids[index],
+            self.names, self.stamp)
+
+    def select(self, min_score=0.0, label=None):
+        mask = self.scores >= min_score
+        if label is not None:
+            mask &= np.isin(self.class_ids, self.class_id(label))
+        return self.take(mask)
+
+    def nearest(self, x, y):
+        """
+        index of the detection nearest to (x, y), None if empty
+        """
+        if len(self) == 0: return None
+        d = np.hypot(self.centers[:, 0] - x, self.centers[:, 1] - y)
+        return int(np.argmin(d))
+
+    def tuples(self):
+        # [(label, score, cx, cy)] by integer pixels
+        c = self.centers.astype(int).tolist()
+        return [(l, s, x, y) for l, s, (x, y) in zip(self.labels, self.scores.tolist(), c)]
@@ -0,0 +1,134 @@
+from .print_color import cprint
+
+#
+## steps of the TaskFlow demos on a ResourceScheduler
+##   kept free of ROS so the same steps run against a stand-in runner
+#
+
+# resources used by the actors of the task flow
+#   actors sharing a resource run one after another in the order started,
+#   perception and coordinate transforms need the robot at rest
+ACTOR_RESOURCES = {
+    'goto_pos': ('base',),
+    'match_angle_goal': ('base',),
+    'face_body_goal': ('base',),
+    'mini_walk_times': ('base',),
+    'drive_distance': ('base',),
+    'back_off': ('base',),
+    'approach_action': ('base', 'camera'),
+    'home': ('arm',),
+    'move_joint': ('arm',),
+    'move_to_pose': ('arm',),
+    'place_product': ('arm',),
+    'add_scene_object': ('arm',),
+    'remove_scene_object': ('arm',),
+    'open': ('gripper',),
+    'close': ('gripper',),
+    'determine_target': ('camera', 'base', 'arm'),
+    'trans_camera_coordinates': ('camera', 'base', 'arm'),
+    'trans_base_coordinates': ('base', 'arm'),
+    'wait_scene_object': ('arm',),
+    'wait_joints_settled': ('arm',),
+    'wait_base_stopped': ('base',),
+}
+
+def demo1_steps(s):
+    """
+    workpiece from the rack to the machining center
+    return: False when no target is found
+    """
+    # 1. Move to workpiece rack, the arm gets ready on the way
+    s.start('goto_pos', 'rack_workpiece')
+    s.start('home', 130)
+    s.start('open')
+    s.start('match_angle_goal', 'rack_workpiece')
+
+    # 2. target determination
+    target = s.run('determine_target')
+    if not target:
+        cprint('No target found', 'red')
+        return False
+    label, score, cx, cy, stamp = target
+    #  target coordinates change
+    camera_x, camera_y, camera_z = s.run('trans_camera_coordinates', cx, cy, stamp)
+    base_x, base_y, base_z = s.run('trans_base_coordinates', camera_x, camera_y, camera_z, "camera_color_optical_frame")
+    cprint(f"Target base coordinates: ({base_x:.3f}, {base_y:.3f}, {base_z:.3f})", 'green')
+
+    # 3. Approach the target
+    s.start("approach_action", (base_x, base_y, base_z))  # close to the target
+    s.start('home', 110)
+
+    # 4. Fine tuning
+    target = s.run('determine_target')
+    if not target:
+        cprint('No target found', 'red')
+        return False
+    label, score, cx, cy, stamp = target
+    camera_x, camera_y, camera_z = s.run('trans_camera_coordinates', cx, cy, stamp)
+    base_x, base_y, base_z = s.run('trans_base_coordinates', camera_x, camera_y, camera_z, "camera_color_optical_frame")
+
+    # 5. Pick up the target
+    s.run("add_scene_object", position=[base_x, base_y, base_z-0.02])  # add object to planning scene
+    s.run('wait_scene_object', 'box', True, 5)  # until move_group has the object
+    s.run("move_to_pose", position=[base_x, base_y, base_z], quat_xyzw=[1, 0, 0, 0])  # move to the target
+    s.run('wait_joints_settled', 'arm', 1)
+    s.run('close')
+    s.run("remove_scene_object")  # remove object from planning scene
+    s.run('wait_scene_object', 'box', False, 1)
+
+    # 6. Move to Machining Center, the arm goes home while backing up
+    s.start('home', 90)
+    s.start('back_off', 5.0, True)  # move backward (formerly mini_walk_times 50, 0.1m each)
+    s.start("face_body_goal", 'machining_center')
+    s.start('goto_pos', 'machining_center')
+    s.start('match_angle_goal', 'machining_center')
+
+    # 7. Place the target
+    map_x, map_y, _ = s.run('get_goal_pos', 'machining_center', True)  # return machining center position on map
+    map_z = 0.89  # height of machining center's chuck
+    base_x, base_y, base_z = s.run('trans_base_coordinates', map_x, map_y, map_z, "map")
+    s.run('approach_action', (base_x, base_y, base_z))
+    s.run('match_angle_goal', 'machining_center')
+    # s.run('move_joint', radians(0), radians(0), radians(0), radians(-135), radians(0), radians(132), radians(45))  # move to place position
+    map_x, map_y, _ = s.run('get_goal_pos', 'machining_center', True)
+    map_z = 0.92  # height of machining center's chuck
+    base_x, base_y, base_z = s.run('trans_base_coordinates', map_x, map_y, map_z, "map")
+    quat_list = s.run('euler_to_quat', roll=0, pitch=180, yaw=-90)
+    s.run('move_to_pose', position=[base_x, base_y, base_z], quat_xyzw=quat_list)
+
+def demo2_steps(s):
+    # product from the machining center to the product rack
+    #2. Move to rack product, the arm goes home while backing up
+    s.start('home', 90)
+    s.start('back_off', 16.0, True)  # formerly mini_walk_times 160, 0.1m each
+    s.start('face_body_goal', 'rack_product')
+    s.start('goto_pos', 'rack_product')
+    s.start('match_angle_goal', 'rack_product')
+    #3.
+    map_x, map_y, _ = s.run('get_goal_pos', 'rack_product', True)
+    map_z = 0.92
+    base_x, base_y, base_z = s.run('trans_base_coordinates', map_x, map_y, map_z, "map")
+    s.run('approach_action', (base_x, base_y, base_z))
+    s.run('place_product')
+    # s.run('move_to_pose', position=[], quat_xyzw=[1, 0, 0, 0])
+    s.run('open')
+    s.run('home', 90)
+
+def run_steps(steps, s, name):
+    """
+    run the steps on the scheduler, every task they started is waited for
+    before returning, also when a step fails
+    return: True when all steps succeeded
+    """
+    try:
+        ok = steps(s) is not False
+        s.join()
+    except Exception as ex:
+        cprint(f'{name} stopped: {ex}', 'red')
+        ok = False
+    failed = s.settle()
+    for task in failed:
+        cprint(f'{task.name} failed: {task.error}', 'red')
+    ok = ok and not failed
+    cprint(f"{name} ({'concurrent' if s.concurrent else 'sequential'}): {s.elapsed():.1f}s", 'green' if ok else 'red')
+    return ok
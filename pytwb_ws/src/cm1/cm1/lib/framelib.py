@@ -0,0 +1,86 @@
+from bisect import bisect_left
+from collections import deque
+from threading import Condition
+
+from .clocklib import monotonic, wall
+
+def msg_stamp_ns(msg):
+    stamp = msg.header.stamp
+    return stamp.sec * 1000000000 + stamp.nanosec
+
+class Frame:
+    __slots__ = ('stamp', 'msg', '_image', 'decoder', 'received')
+
+    def __init__(self, stamp, msg, decoder, received=None):
+        self.stamp = stamp
+        self.msg = msg
+        self.decoder = decoder
+        self._image = None
+        self.received = received
+
+    def age(self):
+        return monotonic() - self.received
+
+    # decoded on first use and shared by all consumers
+    @property
+    def image(self):
+        if self._image is None:
+            self._image = self.decoder(self.msg)
+        return self._image
+
+#
+## ring buffer of recent image frames shared by all consumers
+#
+class FrameCache:
+    def __init__(self, decoder, size=5):
+        self.decoder = decoder
+        self.frames = deque(maxlen=size)
+        self.cond = Condition()
+
+    # subscription callback
+    def push(self, msg):
+        frame = Frame(msg_stamp_ns(msg), msg, self.decoder, monotonic())
+        with self.cond:
+            # keep the buffer ordered even if a stale frame arrives
+            if self.frames and frame.stamp < self.frames[-1].stamp:
+                return
+            self.frames.append(frame)
+            self.cond.notify_all()
+
+    def latest(self, timeout=0.0, max_age=None):
+        """
+        newest frame, waiting up to timeout if the buffer is empty
+        arg:
+            max_age: oldest frame accepted (sec), waits for a newer one otherwise
+        return: Frame or None
+        """
+        def ready():
+            return self.frames and (max_age is None or self.frames[-1].age() <= max_age)
+        with self.cond:
+            if not ready() and timeout > 0.0:
+                self.cond.wait_for(ready, wall(timeout))
+            return self.frames[-1] if ready() else None
+
+    def newer(self, stamp, timeout=0.0):
+        # first frame with stamp after the given one, waiting up to timeout
+        with self.cond:
+            self.cond.wait_for(lambda: self.frames and self.frames[-1].stamp > stamp, wall(timeout))
+            for frame in self.frames:
+                if frame.stamp > stamp: return frame
+            return None
+
+    def nearest(self, stamp):
+        """
+        frame whose stamp is nearest to stamp (nanoseconds)
+        return: Frame or None
+        """
+        with self.cond:
+            frames = list(self.frames)
+        if not frames: return None
+        i = bisect_left([f.stamp for f in frames], stamp)
+        cand = frames[max(i-1, 0):i+1]
+        return min(cand, key=lambda f: abs(f.stamp - stamp))
+
+    def clear(self):
+        with self.cond:
+            self.frames.clear()
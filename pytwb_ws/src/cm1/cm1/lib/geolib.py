@@ -1,43 +1,119 @@
 import math
-from sympy import Point, Circle, Line, Symbol, solve
+import numpy as np
+from sympy import Point
+
+APPROACH_DISTANCE = 0.6
+BOUNDARY_RADIUS = 1.0
+BOUNDARY_THRESH = 0.5
+
+#
+## closed-form geometry on numpy arrays
+#
+def segment_circle_intersections(p1, p2, center, r):
+    """
+    intersections of segments with a circle
+    arg:
+        p1, p2: (N, 2) segment end points
+        center: (2,) circle center
+        r: circle radius
+    return: (M, 2) intersection points lying on the segments
+    """
+    p1 = np.asarray(p1, dtype=float).reshape(-1, 2)
+    p2 = np.asarray(p2, dtype=float).reshape(-1, 2)
+    d = p2 - p1
+    f = p1 - np.asarray(center, dtype=float)
+    a = np.einsum('ij,ij->i', d, d)
+    b = 2.0 * np.einsum('ij,ij->i', f, d)
+    c = np.einsum('ij,ij->i', f, f) - r * r
+    disc = b * b - 4.0 * a * c
+    ok = (a > 0.0) & (disc >= 0.0)
+    a, b, d, p1 = a[ok], b[ok], d[ok], p1[ok]
+    sq = np.sqrt(disc[ok])
+    t = np.stack(((-b - sq) / (2.0 * a), (-b + sq) / (2.0 * a)), axis=1)
+    # a tangent segment touches the circle once
+    t[sq == 0.0, 1] = np.nan
+    on_seg = (t >= 0.0) & (t <= 1.0)
+    pts = p1[:, None, :] + t[:, :, None] * d[:, None, :]
+    return pts[on_seg]
+
+def point_at_distance(origin, toward, current, distance=APPROACH_DISTANCE):
+    """
+    points at distance from origin on the line origin-toward,
+    the one nearer to current is selected (vectorized over rows)
+    arg:
+        origin, toward, current: (N, 2)
+    return: (N, 2) points, (N,) distances from current
+    """
+    origin = np.asarray(origin, dtype=float).reshape(-1, 2)
+    toward = np.asarray(toward, dtype=float).reshape(-1, 2)
+    current = np.asarray(current, dtype=float).reshape(-1, 2)
+    v = toward - origin
+    norm = np.hypot(v[:, 0], v[:, 1])
+    if np.any(norm == 0.0):
+        raise ValueError('line needs two distinct points')
+    step = v * (distance / norm)[:, None]
+    cand = np.stack((origin + step, origin - step), axis=1)
+    dist = np.linalg.norm(cand - current[:, None, :], axis=2)
+    sel = np.argmin(dist, axis=1)
+    rows = np.arange(len(origin))
+    return cand[rows, sel], dist[rows, sel]
+
+def approach_poses(targets, currents, hints=None, distance=APPROACH_DISTANCE):
+    """
+    approach poses for many target/current pairs in one call
+    arg:
+        targets: (N, 2) object positions
+        currents: (N, 2) robot positions
+        hints: (N, 2) approach direction points, NaN rows fall back to currents
+    return: (N, 3) poses [x, y, theta], (N,) travel distance as score
+    """
+    targets = np.asarray(targets, dtype=float).reshape(-1, 2)
+    currents = np.asarray(currents, dtype=float).reshape(-1, 2)
+    toward = currents
+    if hints is not None:
+        hints = np.asarray(hints, dtype=float).reshape(-1, 2)
+        toward = np.where(np.isnan(hints), currents, hints)
+    pos, score = point_at_distance(targets, toward, currents, distance)
+    d = targets - pos
+    rot = np.arctan2(d[:, 1], d[:, 0])
+    return np.column_stack((pos, rot)), score
+
+#
+## vector map interface
+#
+def approach_hint(region, point):
+    # mean of crossings between near boundaries and a circle around point
+    #   unevaluated, sympy would rationalise every float coordinate
+    near_boundaries = region.get_near_boundaries(Point(point[0], point[1], evaluate=False), thresh=BOUNDARY_THRESH)
+    if not near_boundaries:
+        return (math.nan, math.nan)
+    segs = np.array([
+        (float(s.p1.x), float(s.p1.y), float(s.p2.x), float(s.p2.y))
+        for s in (b[1].segment for b in near_boundaries)])
+    ips = segment_circle_intersections(segs[:, :2], segs[:, 2:], point, BOUNDARY_RADIUS)
+    if len(ips) == 0:
+        return (math.nan, math.nan)
+    return tuple(ips.mean(axis=0))
+
+def get_approach_poses(region, points, currents):
+    """
+    batch version of get_approach_pose
+    arg:
+        points: objects having x, y
+        currents: transforms having translation
+    return: (N, 3) poses, (N,) travel distances
+    """
+    targets = [(float(p.x), float(p.y)) for p in points]
+    cur = [(float(c.translation.x), float(c.translation.y)) for c in currents]
+    hints = [approach_hint(region, t) for t in targets]
+    return approach_poses(targets, cur, hints)
 
 def get_approach_pose(region, point, current):
-    if not isinstance(point, Point):
-        point = Point(float(point.x), float(point.y))
-    current_point = Point(float(current.translation.x), float(current.translation.y))
-    near_boundaries = region.get_near_boundaries(point, thresh=0.5)
-    points = 0
-    i_x = 0.0
-    i_y = 0.0
-    if near_boundaries:
-        for b in near_boundaries:
-            for ip in b[1].segment.intersect(Circle(point, 1)):
-                i_x += ip.x
-                i_y += ip.y
-                points += 1
-        i_x /= points
-        i_y /= points
-    if points <= 0:
-        approach_line = Line(point, current_point)
-    else:
-        approach_line = Line(point, Point(i_x, i_y))
-    t = Symbol("t")
-    px = approach_line.arbitrary_point(parameter=t)
-    f = solve(approach_line.p1.distance(px)-0.6, t)
-    first = True
-    for cand_t in f:
-        cand = px.subs(t, cand_t).evalf()
-        d = float(current_point.distance(cand))
-        if first:
-            first = False
-            min_distance = d
-            pos = cand
-        elif d < min_distance:
-            min_distance = d
-            pos = cand
-    if pos.x > 6 or pos.x < -2 or pos.y > 4 or pos.y < -2:
+    poses, _ = get_approach_poses(region, [point], [current])
+    x, y, rot = poses[0]
+    if x > 6 or x < -2 or y > 4 or y < -2:
         print('illegal position')
-    return get_pose(pos, point)
+    return (float(x), float(y), float(rot))
 
 def get_pose(p1, p2):
     rot = math.atan2(p2.y-p1.y, p2.x-p1.x)
@@ -0,0 +1,73 @@
+import cv2
+import numpy as np
+
+#
+## sensor_msgs/Image decoding without copy
+##   the returned array is a read-only view on msg.data
+#
+ENCODINGS = {
+    'bgr8': (np.uint8, 3),
+    'rgb8': (np.uint8, 3),
+    'bgra8': (np.uint8, 4),
+    'rgba8': (np.uint8, 4),
+    'mono8': (np.uint8, 1),
+    '8UC1': (np.uint8, 1),
+    '32FC1': (np.float32, 1),
+    '16UC1': (np.uint16, 1),
+    'mono16': (np.uint16, 1),
+}
+
+COLOR_CONVERSIONS = {
+    ('rgb8', 'bgr8'): cv2.COLOR_RGB2BGR,
+    ('bgra8', 'bgr8'): cv2.COLOR_BGRA2BGR,
+    ('rgba8', 'bgr8'): cv2.COLOR_RGBA2BGR,
+    ('mono8', 'bgr8'): cv2.COLOR_GRAY2BGR,
+}
+
+DEPTH_SCALE = 0.001  # 16UC1 depth unit (mm) to meters
+
+def image_view(msg):
+    """
+    wrap msg.data as an array without copying
+    return: read-only ndarray of shape (h, w) or (h, w, c)
+    """
+    try:
+        dtype, channels = ENCODINGS[msg.encoding]
+    except KeyError:
+        raise ValueError(f'unsupported encoding: {msg.encoding}')
+    dtype = np.dtype(dtype).newbyteorder('>' if msg.is_bigendian else '<')
+    h, w = msg.height, msg.width
+    buf = np.frombuffer(msg.data, dtype=np.uint8)
+    # rows may be padded beyond width * pixel size
+    rows = buf[:h * msg.step].reshape(h, msg.step)[:, :w * channels * dtype.itemsize]
+    image = rows.view(dtype)
+    if channels > 1:
+        image = image.reshape(h, w, channels)
+    image.flags.writeable = False
+    return image
+
+def decode_image(msg, desired=None, writable=False):
+    """
+    decode Image message
+    arg:
+        desired: target encoding (e.g. 'bgr8'), None to keep msg.encoding
+        writable: True when the caller modifies the image (copies the data)
+    """
+    image = image_view(msg)
+    if desired and desired != msg.encoding:
+        code = COLOR_CONVERSIONS.get((msg.encoding, desired))
+        if code is None:
+            raise ValueError(f'unsupported conversion: {msg.encoding} to {desired}')
+        return cv2.cvtColor(image, code)
+    if writable or not image.dtype.isnative:
+        image = image.astype(image.dtype.newbyteorder('='))
+    return image
+
+def decode_depth(msg, scale=DEPTH_SCALE, writable=False):
+    """
+    decode depth Image message in meters
+    32FC1 is returned as a view, 16UC1 is scaled to float32 (copy)
+    """
+    if msg.encoding in ('16UC1', 'mono16'):
+        return image_view(msg).astype(np.float32) * np.float32(scale)
+    return decode_image(msg, writable=writable)
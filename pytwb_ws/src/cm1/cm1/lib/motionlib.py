@@ -0,0 +1,88 @@
+import functools
+from contextlib import contextmanager
+from itertools import count
+from threading import Lock, local
+
+TOKEN_ACTOR = 'with_token'  # actor running another one as the motion of a token
+
+#
+## cancel tokens of robot motions
+##   a token is issued when a motion is requested and cancel targets that token,
+##   so a cancel arriving before the motion begins still stops it, and a late
+##   cancel never stops the motion requested after it
+##   actors called by run_actor inside a motion run in its thread and share its token
+#
+class MotionTokens:
+    def __init__(self):
+        self.lock = Lock()
+        self.tokens = count(1)
+        self.last = 0  # last token issued
+        self.floor = 0  # tokens up to this are cancelled
+        self.cancelled_tokens = set()
+        self.active = {}  # token -> number of motions running under it
+        self.local = local()
+
+    def issue(self):
+        """
+        token of a motion requested now
+        """
+        with self.lock:
+            self.last = next(self.tokens)
+            return self.last
+
+    @contextmanager
+    def motion(self, token=None):
+        """
+        run a motion under the token
+        arg:
+            token: issued token, None for the token of the outer motion of this thread or a new one
+        yields: token
+        """
+        outer = getattr(self.local, 'token', None)
+        if token is None:
+            token = outer or self.issue()
+        with self.lock:
+            self.active[token] = self.active.get(token, 0) + 1
+        self.local.token = token
+        try:
+            yield token
+        finally:
+            self.local.token = outer
+            with self.lock:
+                running = self.active.pop(token) - 1
+                if running:
+                    self.active[token] = running
+                else:
+                    self.cancelled_tokens.discard(token)
+
+    def cancelled(self):
+        # cancel requested for the motion of this thread
+        token = getattr(self.local, 'token', None)
+        if token is None: return False
+        with self.lock:
+            return self.is_cancelled(token)
+
+    def is_cancelled(self, token):
+        return token <= self.floor or token in self.cancelled_tokens
+
+    def cancel(self, *tokens):
+        """
+        cancel the motions of the tokens, every motion requested so far if none given
+        return: True if one of them is running, the device has to be stopped
+        """
+        with self.lock:
+            if tokens:
+                self.cancelled_tokens.update(tokens)
+                return any(token in self.active for token in tokens)
+            self.floor = self.last
+            return any(token <= self.floor for token in self.active)
+
+MOTIONS = MotionTokens()
+
+def motion(func):
+    # run the method as a motion, cancelled() tells when it has to stop
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with MOTIONS.motion():
+            return func(*args, **kwargs)
+    return wrapper
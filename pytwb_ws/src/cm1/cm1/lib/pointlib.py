@@ -1,14 +1,12 @@
-import rclpy
-from geometry_msgs.msg import Point, PointStamped
-from tf2_ros.transform_listener import TransformListener
-from tf2_ros.buffer import Buffer
-from tf2_ros import TransformException
-from pyquaternion import Quaternion
+from .transformlib import RigidTransform
 
 class PointEx:
+    __slots__ = ('_x', '_y', '_z', 'x', 'y', 'z', 'valid', 'transform',
+                 'v_x', 'distance', '_time', '_offset')
+
     def __init__(self, *val):
-        self.time = rclpy.time.Time()
-        self.offset = Point()
+        self._time = None
+        self._offset = None
         num_arg = len(val)
         self.valid = False
         if num_arg == 1:
@@ -49,63 +47,162 @@ class PointEx:
         else:
             self._z = float(0)
     
+    # stamp and offset message are created on first use,
+    # ROS modules are imported there so the geometry runs without ROS
+    @property
+    def time(self):
+        if self._time is None:
+            from rclpy.time import Time
+            self._time = Time()
+        return self._time
+
+    @time.setter
+    def time(self, value):
+        self._time = value
+
+    @property
+    def offset(self):
+        if self._offset is None:
+            from geometry_msgs.msg import Point
+            self._offset = Point()
+        return self._offset
+
+    @offset.setter
+    def offset(self, value):
+        self._offset = value
+
     def getPointStamped(self):
+        from geometry_msgs.msg import PointStamped
         ret = PointStamped()
-        ret.header.stamp = self.time
+        ret.header.stamp = self.time.to_msg()
         ret.point.x = self.x
         ret.point.y = self.y
         ret.point.z = self.z
         return ret
     
     def getPoint(self):
+        from geometry_msgs.msg import Point
         ret = Point()
         ret.x = self.x
         ret.y = self.y
         ret.z = self.z
         return ret
     
-    def setTransform(self, trans):
+    def setTransform(self, trans, rigid=None):
+        # rigid: RigidTransform already built from trans, shared among points
         self.transform = trans
-        offset = trans.translation
-        rot = trans.rotation
-        point = (self._x, self._y, self._z)
-        q_rot = Quaternion(rot.w, rot.x, rot.y, rot.z)
-        rot_point = q_rot.rotate(point)
-#        print(f'angle:{q_rot.radians} rot_point{rot_point}')
-        self.x = rot_point[0] + offset.x
-        self.y = rot_point[1] + offset.y
-        self.z = rot_point[2] + offset.z
+        if rigid is None:
+            rigid = RigidTransform.from_msg(trans)
+        self.x, self.y, self.z = rigid.apply_point(self._x, self._y, self._z)
         self.valid = True
 
+#
+## streaming accumulator of observations of one object
+## (running mean/variance, fixed memory)
+#
 class PointBag:
+    __slots__ = ('count', 'x', 'y', 'z', 'm2', 'location', 'last_point')
+
     def __init__(self, first) -> None:
-        self.points = set()
-        self.points.add(first)
         self.count = 1
-        self.x_sum = first.x
-        self.y_sum = first.y
-        self.z_sum = first.z
         self.x = first.x
         self.y = first.y
         self.z = first.z
+        self.m2 = [0.0, 0.0, 0.0]  # sum of squared deviations (Welford)
         self.location = first.transform
         self.last_point = first
     
     def append(self, point):
-        self.points.add(point)
-        
+        if point is self.last_point: return
         self.last_point = point
         self.location = point.transform
-        new_count = len(self.points)
-        if new_count != self.count:
-            self.x_sum += point.x
-            self.y_sum += point.y
-            self.z_sum += point.z
-            self.x = self.x_sum / new_count
-            self.y = self.y_sum / new_count
-            self.z = self.z_sum / new_count
-            self.count = new_count
+        self.count += 1
+        n = self.count
+        m2 = self.m2
+        dx = point.x - self.x
+        self.x += dx / n
+        m2[0] += dx * (point.x - self.x)
+        dy = point.y - self.y
+        self.y += dy / n
+        m2[1] += dy * (point.y - self.y)
+        dz = point.z - self.z
+        self.z += dz / n
+        m2[2] += dz * (point.z - self.z)
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return (0.0, 0.0, 0.0)
+        n = self.count - 1
+        return tuple(v / n for v in self.m2)
 
     def clear(self):
-        self.points.clear()
+        self.count = 0
+        self.m2 = [0.0, 0.0, 0.0]
+
+#
+## incremental clustering of observations on a voxel hash
+##   a point joins the nearest PointBag within radius, otherwise starts a new one
+#
+class PointCluster:
+    def __init__(self, radius=0.1):
+        self.radius = radius
+        self.r2 = radius * radius
+        self.grid = {}  # voxel key -> list of PointBag
+        self.keys = {}  # id(PointBag) -> voxel key
+        self.bags = []
+        self.best = None
 
+    def key(self, x, y, z):
+        r = self.radius
+        return (int(x // r), int(y // r), int(z // r))
+
+    def nearest(self, point):
+        kx, ky, kz = self.key(point.x, point.y, point.z)
+        grid = self.grid
+        cand = None
+        min_d = self.r2
+        for ix in (kx-1, kx, kx+1):
+            for iy in (ky-1, ky, ky+1):
+                for iz in (kz-1, kz, kz+1):
+                    for bag in grid.get((ix, iy, iz), ()):
+                        d = (bag.x-point.x)**2 + (bag.y-point.y)**2 + (bag.z-point.z)**2
+                        if d >= min_d: continue
+                        cand = bag
+                        min_d = d
+        return cand
+
+    def append(self, point):
+        bag = self.nearest(point)
+        if bag is None:
+            bag = PointBag(point)
+            self.bags.append(bag)
+            key = self.key(bag.x, bag.y, bag.z)
+            self.grid.setdefault(key, []).append(bag)
+            self.keys[id(bag)] = key
+        else:
+            bag.append(point)
+            # the running mean may move the bag into another voxel
+            key = self.key(bag.x, bag.y, bag.z)
+            old = self.keys[id(bag)]
+            if key != old:
+                cell = self.grid[old]
+                cell.remove(bag)
+                if not cell: del self.grid[old]
+                self.grid.setdefault(key, []).append(bag)
+                self.keys[id(bag)] = key
+        if self.best is None or bag.count > self.best.count:
+            self.best = bag
+        return bag
+
+    def __len__(self):
+        return len(self.bags)
+
+    def __iter__(self):
+        return iter(self.bags)
+
+    def clear(self):
+        self.grid.clear()
+        self.keys.clear()
+        self.bags.clear()
+        self.best = None
@@ -0,0 +1,134 @@
+from threading import Condition, Event, Thread
+from .clocklib import monotonic, wall
+
+class TaskFailed(Exception):
+    # an actor nobody waits for returned False
+    pass
+
+class Task:
+    def __init__(self, name, resources, checked=False):
+        self.name = name
+        self.resources = resources
+        self.checked = checked  # the caller reads the result (run)
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+        self.done = Event()
+
+    def wait(self, timeout=None):
+        """
+        result of the actor, exception raised by the actor is re-raised
+        """
+        if not self.done.wait(None if timeout is None else wall(timeout)):
+            raise TimeoutError(f'{self.name} not finished in {timeout}s')
+        if self.error:
+            raise self.error
+        return self.result
+
+#
+## runs actors concurrently unless they share a resource
+##   start() blocks while a resource of the actor is in use, so actors
+##   sharing a resource keep the order they were started in
+##   a failed task (exception, or False from a started actor) makes every later
+##   start on one of its resources raise its error instead of running
+#
+class ResourceScheduler:
+    def __init__(self, runner, resources=None, concurrent=True):
+        """
+        arg:
+            runner: runner(name, *args, **kwargs) executes an actor (run_actor)
+            resources: {actor name: (resource, ...)}
+            concurrent: False to run every actor to completion in start()
+        """
+        self.runner = runner
+        self.table = resources or {}
+        self.concurrent = concurrent
+        self.cond = Condition()
+        self.busy = set()
+        self.tasks = []
+        self.origin = monotonic()
+
+    def resources(self, name, uses=None):
+        return frozenset(self.table.get(name, ()) if uses is None else uses)
+
+    def start(self, name, *args, uses=None, **kwargs):
+        """
+        start an actor as soon as its resources are free
+        arg:
+            uses: resources overriding the table
+        return: Task
+        """
+        return self.submit(Task(name, self.resources(name, uses)), args, kwargs)
+
+    def submit(self, task, args, kwargs):
+        with self.cond:
+            self.cond.wait_for(lambda: not task.resources & self.busy)
+            failed = self.failure(task.resources)
+            if not failed:
+                self.busy |= task.resources
+                self.tasks.append(task)
+        if failed:
+            raise failed.error
+        task.started = monotonic()
+        if self.concurrent:
+            Thread(target=self.execute, args=(task, args, kwargs), daemon=True).start()
+        else:
+            self.execute(task, args, kwargs)
+        return task
+
+    def failure(self, resources):
+        # first failed task on one of the resources (call with cond held)
+        for task in self.tasks:
+            if task.error and task.resources & resources:
+                return task
+        return None
+
+    def execute(self, task, args, kwargs):
+        try:
+            task.result = self.runner(task.name, *args, **kwargs)
+            if task.result is False and not task.checked:
+                task.error = TaskFailed(f'{task.name} returned False')
+        except Exception as ex:
+            task.error = ex
+        finally:
+            task.finished = monotonic()
+            with self.cond:
+                self.busy -= task.resources
+                self.cond.notify_all()
+            task.done.set()
+
+    def run(self, name, *args, uses=None, **kwargs):
+        # start and wait for the result
+        task = Task(name, self.resources(name, uses), checked=True)
+        return self.submit(task, args, kwargs).wait()
+
+    def join(self, *tasks):
+        """
+        join point, waits for the given tasks or every task started so far
+        return: list of results
+        """
+        if not tasks:
+            with self.cond:
+                tasks = list(self.tasks)
+        return [task.wait() for task in tasks]
+
+    def settle(self):
+        """
+        wait for every task started so far without raising
+        return: list of failed tasks
+        """
+        with self.cond:
+            tasks = list(self.tasks)
+        for task in tasks:
+            task.done.wait()
+        return [task for task in tasks if task.error]
+
+    def elapsed(self):
+        return monotonic() - self.origin
+
+    def timeline(self):
+        # [(name, resources, start, end)] by seconds from the creation
+        return [(t.name, tuple(sorted(t.resources)), t.started - self.origin,
+                 (t.finished if t.finished else monotonic()) - self.origin)
+                for t in self.tasks]
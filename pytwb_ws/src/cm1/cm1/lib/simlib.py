@@ -1,32 +1,87 @@
 import cv2
 import numpy as np
 
+# しきい値の設定（ここでは赤を抽出）
+COLOR_MIN = np.array([150,100, 50])
+COLOR_MAX = np.array([180,255,255])
+
 #
 ## find_coke is derived from
 ##  lecture page https://demura.net/education/22777.html
 ##  by Demura Kosei
 #
 def find_coke(image):
+  ret = mask_moments(image)
+  if not ret:
+    return None
+  cx, cy, _ = ret
+  return (int(cx), int(cy))
+
+# マスク画像から直接重心を求める
+#   return: (cx, cy, area) or None
+def mask_moments(image, color_min=COLOR_MIN, color_max=COLOR_MAX):
   # RGB表色系からHSV表色系に変換
   hsv_image = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-
-  # しきい値の設定（ここでは赤を抽出）
-  color_min = np.array([150,100, 50])
-  color_max = np.array([180,255,255])
-
   # マスク画像を生成
-  color_mask = cv2.inRange(hsv_image, color_min, color_max);
-  # 画像配列のビット毎の倫理積席。マスク画像だけが抽出される。
-  cv_image2  = cv2.bitwise_and(image, image, mask = color_mask)
-
-  # 重心を求める。moments関数を使うためグレースケール画像へ変換。
-  gray_image2 = cv2.cvtColor(cv_image2, cv2.COLOR_BGR2GRAY)
-  mu = cv2.moments(gray_image2, True)
+  color_mask = cv2.inRange(hsv_image, color_min, color_max)
+  mu = cv2.moments(color_mask, True)
   if mu["m00"] == 0: # マスクをかけた画像がない場合(ここでは赤）の処理
     return None
-  else:
-    return (
-      int(mu["m10"]/mu["m00"]),
-      int(mu["m01"]/mu["m00"])
-    )
+  return (mu["m10"]/mu["m00"], mu["m01"]/mu["m00"], mu["m00"])
+
+#
+## colour segmentation tracking the last hit
+##   scale: downscale factor applied before segmentation (1.0 for full size)
+##   margin: ROI margin around the last hit by original pixels
+#
+class ColorTracker:
+  def __init__(self, scale=1.0, margin=80, color_min=COLOR_MIN, color_max=COLOR_MAX):
+    self.scale = scale
+    self.margin = margin
+    self.color_min = color_min
+    self.color_max = color_max
+    self.last = None  # (cx, cy, half size of ROI)
+    self.roi_hits = 0
+    self.full_scans = 0
+
+  def segment(self, image):
+    # (cx, cy, area) by original pixel units
+    s = self.scale
+    if s != 1.0:
+      image = cv2.resize(image, None, fx=s, fy=s, interpolation=cv2.INTER_NEAREST)
+    ret = mask_moments(image, self.color_min, self.color_max)
+    if not ret:
+      return None
+    cx, cy, area = ret
+    return (cx / s, cy / s, area / (s * s))
+
+  def search_roi(self, image):
+    cx, cy, half = self.last
+    h, w = image.shape[:2]
+    x0, x1 = max(int(cx - half), 0), min(int(cx + half), w)
+    y0, y1 = max(int(cy - half), 0), min(int(cy + half), h)
+    if x1 <= x0 or y1 <= y0:
+      return None
+    ret = self.segment(image[y0:y1, x0:x1])
+    if not ret:
+      return None
+    return (ret[0] + x0, ret[1] + y0, ret[2])
+
+  def find(self, image):
+    ret = None
+    if self.last:
+      ret = self.search_roi(image)
+      if ret: self.roi_hits += 1
+    if not ret:
+      ret = self.segment(image)
+      self.full_scans += 1
+    if not ret:
+      self.last = None
+      return None
+    cx, cy, area = ret
+    # ROI covers the blob (area taken as a disc) and the margin
+    self.last = (cx, cy, 2.0 * np.sqrt(area / np.pi) + self.margin)
+    return (int(cx), int(cy))
 
+  def reset(self):
+    self.last = None
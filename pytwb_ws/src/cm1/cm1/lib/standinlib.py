@@ -0,0 +1,335 @@
+import math
+
+import cv2
+import numpy as np
+
+from .controllib import UnicyclePlant, TrapezoidProfile, wrap_angle
+
+# behaviour of the stand-in robot, every entry can be changed per run
+STANDIN = {
+    'base_lag': 0.1,  # velocity response of the base (sec)
+    'nav_plan': 0.5,  # NavigateToPose planning before the base moves (sec)
+    'nav_speed': 0.4,  # NavigateToPose cruise speed (m/s)
+    'nav_accel': 0.5,  # NavigateToPose acceleration (m/s^2)
+    'nav_turn': 1.0,  # NavigateToPose turn rate (rad/s)
+    'plan': 0.3,  # arm motion planning (sec)
+    'joint_speed': 0.8,  # arm joint speed (rad/s)
+    'pose_move': 2.0,  # arm motion to a pose goal (sec)
+    'gripper': 1.0,  # gripper open or close (sec)
+    'scene': 0.05,  # planning scene update after a collision object message (sec)
+    'detection': 0.05,  # detector output after the colour frame (sec)
+    'machining': 10.0,  # machining cycle after the workpiece is placed (sec)
+}
+
+CAMERA_MOUNT = (0.1, 0.0, 1.0)  # camera_link in base_link (m)
+WORKPIECE_Z = 0.8  # height of the workpiece on the rack (m)
+WORKPIECE_RADIUS = 0.03  # m
+BACKGROUND_DEPTH = 6.0  # depth of the empty view (m)
+BACKGROUND = 110  # grey level of the empty view
+GRASP_REACH = 1.0  # workpiece closer than this to the base is grasped on close (m)
+MACHINE_RANGE = 1.6  # base closer than this to the machining center places the workpiece (m)
+
+def hsv_to_bgr(h, s, v):
+    pixel = cv2.cvtColor(np.uint8([[[h, s, v]]]), cv2.COLOR_HSV2BGR)[0, 0]
+    return tuple(int(c) for c in pixel)
+
+WORKPIECE_COLOR = hsv_to_bgr(170, 230, 200)  # within simlib.COLOR_MIN..COLOR_MAX
+
+#
+## NavigateToPose stand-in: turn to the goal, drive, turn to the goal heading
+#
+class NavigatePlant:
+    def __init__(self, base, param=STANDIN):
+        self.base = base
+        self.param = param
+        self.goal = None
+        self.phase = None
+        self.wait = 0.0
+        self.profile = None
+        self.goals = 0
+
+    @property
+    def active(self):
+        return self.goal is not None
+
+    def start(self, x, y, theta):
+        self.goal = (x, y, theta)
+        self.phase = 'plan'
+        self.wait = self.param['nav_plan']
+        self.profile = TrapezoidProfile(self.param['nav_speed'], self.param['nav_accel'],
+                                        self.param['nav_accel'], lag=self.param['base_lag'])
+        self.goals += 1
+
+    def cancel(self):
+        self.goal = None
+        self.base.command(0.0, 0.0)
+
+    def turn(self, error):
+        rate = max(-self.param['nav_turn'], min(self.param['nav_turn'], 2.0 * error))
+        self.base.command(0.0, rate)
+        return abs(error) < 0.01 and abs(self.base.w) < 0.05
+
+    def step(self, dt):
+        """
+        command the base toward the goal
+        return: True when the goal is reached in this step
+        """
+        if self.goal is None: return False
+        gx, gy, gtheta = self.goal
+        x, y, theta = self.base.pose()
+        dx, dy = gx - x, gy - y
+        distance = math.hypot(dx, dy)
+        if self.phase == 'plan':
+            self.wait -= dt
+            if self.wait <= 0.0:
+                self.phase = 'heading' if distance > 0.02 else 'align'
+        elif self.phase == 'heading':
+            if self.turn(wrap_angle(math.atan2(dy, dx) - theta)):
+                self.phase = 'drive'
+        elif self.phase == 'drive':
+            # along the heading, with a small correction toward the goal
+            along = dx * math.cos(theta) + dy * math.sin(theta)
+            speed = self.profile.step(along, dt)
+            rate = 0.0
+            if distance > 0.05:
+                rate = max(-0.5, min(0.5, 2.0 * wrap_angle(math.atan2(dy, dx) - theta)))
+            self.base.command(speed, rate)
+            if speed == 0.0:
+                self.phase = 'align'
+        elif self.phase == 'align':
+            if self.turn(wrap_angle(gtheta - theta)):
+                self.cancel()
+                return True
+        return False
+
+#
+## joint group (arm or gripper) moving to joint targets in a given time
+#
+class JointGroup:
+    def __init__(self, names, positions):
+        self.names = list(names)
+        self.positions = np.array(positions, dtype=float)
+        self.velocity = np.zeros(len(self.names))
+        self.motion = None  # (start, target, duration, elapsed, nominal speed)
+        self.motions = 0
+
+    @property
+    def busy(self):
+        return self.motion is not None
+
+    def move(self, target, duration, speed=0.0):
+        """
+        arg:
+            target: joint positions, None to stay (pose goals)
+            speed: joint speed reported while staying
+        """
+        target = self.positions.copy() if target is None else np.array(target, dtype=float)
+        self.motion = (self.positions.copy(), target, max(duration, 1e-3), 0.0, speed)
+        self.motions += 1
+
+    def stop(self):
+        self.motion = None
+        self.velocity[:] = 0.0
+
+    def step(self, dt):
+        """
+        return: True when the motion finishes in this step
+        """
+        if self.motion is None: return False
+        start, target, duration, elapsed, speed = self.motion
+        elapsed = min(elapsed + dt, duration)
+        # smoothstep from start to target
+        s = elapsed / duration
+        k = s * s * (3.0 - 2.0 * s)
+        positions = start + (target - start) * k
+        if np.allclose(start, target):
+            self.velocity[:] = speed if elapsed < duration else 0.0
+        else:
+            self.velocity = (positions - self.positions) / dt
+        self.positions = positions
+        if elapsed >= duration:
+            self.stop()
+            return True
+        self.motion = (start, target, duration, elapsed, speed)
+        return False
+
+    def duration(self, target, param=STANDIN):
+        # planning plus the largest joint travel at the joint speed
+        if target is None:
+            return param['plan'] + param['pose_move']
+        travel = np.max(np.abs(np.array(target, dtype=float) - self.positions))
+        return param['plan'] + travel / param['joint_speed']
+
+#
+## colour camera with aligned depth looking forward from the base
+##   renders the workpieces as discs, and detections as the yolov8 node reports them
+#
+class CameraStub:
+    def __init__(self, width=1280, height=720, focal=(640.8300702045303, 476.05344464216915),
+                 center=(640.0, 360.0), mount=CAMERA_MOUNT, model_size=(640, 640)):
+        self.width = width
+        self.height = height
+        self.focal = focal
+        self.center = center
+        self.mount = mount
+        self.model_size = model_size
+        self.color_base = np.full((height, width, 3), BACKGROUND, dtype=np.uint8)
+        self.depth_base = np.full((height, width), BACKGROUND_DEPTH, dtype=np.float32)
+        self.frames = 0
+
+    def view(self, base_pose, objects):
+        """
+        objects in the image
+        arg:
+            objects: [(class id, x, y, z, radius)] in the map
+        return: [(class id, u, v, depth, pixel radius)]
+        """
+        bx, by, btheta = base_pose
+        c, s = math.cos(btheta), math.sin(btheta)
+        f_x, f_y = self.focal
+        c_x, c_y = self.center
+        mx, my, mz = self.mount
+        seen = []
+        for class_id, x, y, z, radius in objects:
+            # map -> base_link -> camera_link -> optical (x right, y down, z forward)
+            lx = c * (x - bx) + s * (y - by) - mx
+            ly = -s * (x - bx) + c * (y - by) - my
+            lz = z - mz
+            depth = lx
+            if depth < 0.1: continue
+            u = c_x + f_x * -ly / depth
+            v = c_y + f_y * -lz / depth
+            r = f_x * radius / depth
+            if -r <= u < self.width + r and -r <= v < self.height + r:
+                seen.append((class_id, u, v, depth, r))
+        return seen
+
+    def render(self, seen):
+        """
+        return: bgr8 colour image, 32FC1 depth image (m)
+        """
+        color = self.color_base.copy()
+        depth = self.depth_base.copy()
+        for _, u, v, d, r in sorted(seen, key=lambda o: -o[3]):
+            center = (int(round(u)), int(round(v)))
+            radius = max(int(round(r)), 1)
+            cv2.circle(color, center, radius, WORKPIECE_COLOR, -1)
+            cv2.circle(depth, center, radius, float(d), -1)
+        self.frames += 1
+        return color, depth
+
+    def detections(self, seen, score=0.9):
+        """
+        boxes in the model input (letterbox) coordinates
+        return: [(class id, score, cx, cy, width, height)]
+        """
+        model_w = self.model_size[0]
+        ratio = self.width / model_w
+        padding = (self.width - self.height) // 2
+        boxes = []
+        for class_id, u, v, _, r in seen:
+            boxes.append((class_id, score, u / ratio, (v + padding) / ratio, 2 * r / ratio, 2 * r / ratio))
+        return boxes
+
+#
+## the factory around the robot: workpiece, grasp and machining cycle
+#
+class FactoryWorld:
+    def __init__(self, table, param=STANDIN):
+        """
+        arg:
+            table: object table {name: object with pos}, as loaded from object_table.yaml
+        """
+        self.param = param
+        x, y, _ = table['rack_workpiece'].pos
+        self.workpiece = [0, x, y, WORKPIECE_Z, WORKPIECE_RADIUS]
+        self.machine = table['machining_center'].pos[:2]
+        self.held = False
+        self.machine_start = None
+
+    def objects(self):
+        return [] if self.held else [tuple(self.workpiece)]
+
+    def grasp(self, base_pose):
+        # gripper closed: the workpiece in reach is taken
+        _, x, y, _, _ = self.workpiece
+        if not self.held and math.hypot(x - base_pose[0], y - base_pose[1]) < GRASP_REACH:
+            self.held = True
+        return self.held
+
+    def release(self, base_pose):
+        # gripper opened: the workpiece stays in front of the base
+        if self.held:
+            bx, by, btheta = base_pose
+            self.workpiece[1:3] = [bx + 0.5 * math.cos(btheta), by + 0.5 * math.sin(btheta)]
+            self.held = False
+
+    def arm_arrived(self, base_pose, now):
+        # an arm motion at the machining center holding the workpiece places it
+        mx, my = self.machine
+        if self.held and self.machine_start is None and \
+                math.hypot(mx - base_pose[0], my - base_pose[1]) < MACHINE_RANGE:
+            self.machine_start = now
+
+    def machine_done(self, now):
+        return self.machine_start is not None and now - self.machine_start >= self.param['machining']
+
+#
+## stand-in robot: plants advanced by the sim clock, ROS bindings stay outside
+#
+class StandInRobot:
+    def __init__(self, table, arm_joints, gripper_joints, gripper_open, param=STANDIN, pose=None):
+        self.param = param
+        if pose is None: pose = table['_origin'].pos
+        self.base = UnicyclePlant(*pose, tau=param['base_lag'])
+        self.nav = NavigatePlant(self.base, param)
+        self.arm = JointGroup(arm_joints, [0.0] * len(arm_joints))
+        self.gripper = JointGroup(gripper_joints, gripper_open)
+        self.camera = CameraStub()
+        self.world = FactoryWorld(table, param)
+        self.scene = {}  # collision object id -> time it becomes visible
+        self.now = 0.0
+
+    def step(self, dt):
+        """
+        advance by dt sim seconds
+        return: [events] of 'nav', 'arm', 'gripper' motions finished
+        """
+        events = []
+        self.now += dt
+        if self.nav.step(dt): events.append('nav')
+        self.base.step(dt)
+        if self.arm.step(dt):
+            events.append('arm')
+            self.world.arm_arrived(self.base.pose(), self.now)
+        if self.gripper.step(dt): events.append('gripper')
+        return events
+
+    def gripper_move(self, target):
+        # closing grasps the workpiece in reach, opening releases it
+        target = np.array(target, dtype=float)
+        if np.all(target < self.gripper.positions):
+            self.world.grasp(self.base.pose())
+        elif np.all(target > self.gripper.positions):
+            self.world.release(self.base.pose())
+        self.gripper.move(target, self.param['gripper'])
+
+    def arm_move(self, target=None):
+        self.arm.move(target, self.arm.duration(target, self.param), self.param['joint_speed'])
+
+    def scene_update(self, object_id, add):
+        if add:
+            self.scene[object_id] = self.now + self.param['scene']
+        else:
+            self.scene.pop(object_id, None)
+
+    def scene_objects(self):
+        return [k for k, t in self.scene.items() if t <= self.now]
+
+    def capture(self):
+        """
+        return: colour image, depth image, detections
+        """
+        seen = self.camera.view(self.base.pose(), self.world.objects())
+        color, depth = self.camera.render(seen)
+        return color, depth, self.camera.detections(seen)
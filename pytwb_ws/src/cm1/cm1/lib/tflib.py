@@ -0,0 +1,82 @@
+from collections import OrderedDict
+from threading import Event, Lock
+
+import rclpy
+from tf2_ros import TransformException
+
+from .clocklib import wall
+
+def stamp_ns(t):
+    if hasattr(t, 'nanoseconds'):
+        return t.nanoseconds
+    return t.sec * 1000000000 + t.nanosec
+
+#
+## TF access with deadline based waiting and a per frame pair cache
+#
+class TransformCache:
+    def __init__(self, tf_buffer, size=16):
+        self.tf_buffer = tf_buffer
+        self.size = size
+        self.lock = Lock()
+        self.table = OrderedDict()  # (to_frame, from_frame) -> (stamp, transform)
+        self.hits = 0
+        self.misses = 0
+
+    def cached(self, to_frame, from_frame):
+        # return cached transform when no newer one has arrived
+        key = (to_frame, from_frame)
+        with self.lock:
+            entry = self.table.get(key)
+        if not entry: return None
+        try:
+            latest = self.tf_buffer.get_latest_common_time(to_frame, from_frame)
+        except TransformException:
+            return None
+        if stamp_ns(latest) != entry[0]: return None
+        with self.lock:
+            self.table.move_to_end(key)
+            self.hits += 1
+        return entry[1]
+
+    def store(self, to_frame, from_frame, tf):
+        with self.lock:
+            self.table[(to_frame, from_frame)] = (stamp_ns(tf.header.stamp), tf)
+            self.table.move_to_end((to_frame, from_frame))
+            while len(self.table) > self.size:
+                self.table.popitem(last=False)
+            self.misses += 1
+
+    def wait(self, to_frame, from_frame, timeout):
+        # block until the transform becomes available or timeout expires
+        done = Event()
+        future = self.tf_buffer.wait_for_transform_async(to_frame, from_frame, rclpy.time.Time())
+        future.add_done_callback(lambda _: done.set())
+        if not done.wait(wall(timeout)):
+            future.cancel()
+            return False
+        return True
+
+    def lookup(self, to_frame, from_frame, timeout=0.0):
+        """
+        latest transform from from_frame to to_frame
+        arg:
+            timeout: seconds to wait for the transform, 0 for no wait
+        return: TransformStamped or None
+        """
+        tf = self.cached(to_frame, from_frame)
+        if tf: return tf
+        if not self.tf_buffer.can_transform(to_frame, from_frame, rclpy.time.Time()):
+            if timeout <= 0.0 or not self.wait(to_frame, from_frame, timeout):
+                return None
+        try:
+            tf = self.tf_buffer.lookup_transform(to_frame, from_frame, rclpy.time.Time())
+        except TransformException as ex:
+            print(ex)
+            return None
+        self.store(to_frame, from_frame, tf)
+        return tf
+
+    def clear(self):
+        with self.lock:
+            self.table.clear()
@@ -0,0 +1,181 @@
+import functools
+import json
+import os
+import threading
+from itertools import count
+from time import perf_counter_ns
+
+import py_trees
+
+PHASES = ('initialise', 'update', 'terminate')
+
+def behaviour_classes(base=py_trees.behaviour.Behaviour):
+    # base and every subclass loaded so far
+    found = [base]
+    for cls in base.__subclasses__():
+        found.extend(behaviour_classes(cls))
+    return found
+
+#
+## timing trace of behaviour tree runs in chrome trace event format
+##   ticks and initialise/update/terminate are complete events of the tick thread,
+##   actors started by ActorBT are async events spanning the RUNNING ticks
+#
+class Tracer:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.ids = count(1)
+        self.enabled = False
+        self.events = []
+        self.origin = perf_counter_ns()
+
+    def start(self):
+        with self.lock:
+            self.events = []
+            self.origin = perf_counter_ns()
+            self.enabled = True
+
+    def stop(self):
+        self.enabled = False
+
+    def ts(self, ns):
+        # microseconds from the start of the trace
+        return (ns - self.origin) / 1000.0
+
+    def complete(self, name, cat, start, end, args=None):
+        event = {'name': name, 'cat': cat, 'ph': 'X', 'ts': self.ts(start),
+                 'dur': (end - start) / 1000.0, 'pid': os.getpid(), 'tid': threading.get_ident()}
+        if args: event['args'] = args
+        with self.lock:
+            self.events.append(event)
+
+    def begin_async(self, name, cat, args=None):
+        """
+        start of an activity ending in another thread
+        return: handle for end_async, None while disabled
+        """
+        if not self.enabled: return None
+        handle = (next(self.ids), name, cat)
+        event = {'name': name, 'cat': cat, 'ph': 'b', 'id': handle[0],
+                 'ts': self.ts(perf_counter_ns()), 'pid': os.getpid(), 'tid': threading.get_ident()}
+        if args: event['args'] = args
+        with self.lock:
+            self.events.append(event)
+        return handle
+
+    def end_async(self, handle, args=None):
+        if handle is None: return
+        event = {'name': handle[1], 'cat': handle[2], 'ph': 'e', 'id': handle[0],
+                 'ts': self.ts(perf_counter_ns()), 'pid': os.getpid(), 'tid': threading.get_ident()}
+        if args: event['args'] = args
+        with self.lock:
+            self.events.append(event)
+
+    #
+    ## behaviour instrumentation
+    #
+    def wrap_phase(self, func, phase):
+        tracer = self
+        @functools.wraps(func)
+        def traced(node, *args, **kwargs):
+            stack = getattr(tracer.local, 'stack', None)
+            if stack is None:
+                stack = tracer.local.stack = []
+            key = (id(node), phase)
+            # super() calls of the same phase are part of the outer span
+            if not tracer.enabled or (stack and stack[-1] == key):
+                return func(node, *args, **kwargs)
+            stack.append(key)
+            start = perf_counter_ns()
+            try:
+                return func(node, *args, **kwargs)
+            finally:
+                stack.pop()
+                tracer.complete(node.name, phase, start, perf_counter_ns(),
+                                {'class': type(node).__name__})
+        traced._traced = True
+        return traced
+
+    def wrap_tick(self, func):
+        tracer = self
+        @functools.wraps(func)
+        def traced(node):
+            start = perf_counter_ns()
+            for n in func(node):
+                # a node yields itself last, after its children
+                if n is node and tracer.enabled:
+                    tracer.complete(node.name, 'tick', start, perf_counter_ns(),
+                                    {'class': type(node).__name__, 'status': node.status.name})
+                yield n
+        traced._traced = True
+        return traced
+
+    def instrument(self):
+        """
+        wrap tick/initialise/update/terminate of every behaviour class loaded,
+        call again after loading more behaviours (already wrapped ones are kept)
+        """
+        for cls in behaviour_classes():
+            for phase in PHASES:
+                func = cls.__dict__.get(phase)
+                if func and not getattr(func, '_traced', False):
+                    setattr(cls, phase, self.wrap_phase(func, phase))
+            func = cls.__dict__.get('tick')
+            if func and not getattr(func, '_traced', False):
+                setattr(cls, 'tick', self.wrap_tick(func))
+
+    #
+    ## export
+    #
+    def chrome(self):
+        with self.lock:
+            events = list(self.events)
+        return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.chrome(), f)
+        return path
+
+    def summary(self):
+        """
+        per node totals
+        return: {(node name, class): {phase: [count, total ms, max ms]}}
+            phases: tick, initialise, update, terminate, actor
+        """
+        with self.lock:
+            events = list(self.events)
+        table = {}
+        def add(key, phase, dur):
+            stat = table.setdefault(key, {}).setdefault(phase, [0, 0.0, 0.0])
+            stat[0] += 1
+            stat[1] += dur
+            stat[2] = max(stat[2], dur)
+        begins = {}
+        for e in events:
+            if e['ph'] == 'X':
+                add((e['name'], e['args']['class']), e['cat'], e['dur'] / 1000.0)
+            elif e['ph'] == 'b':
+                begins[e['id']] = e
+            elif e['ph'] == 'e' and e['id'] in begins:
+                b = begins.pop(e['id'])
+                add((b['args']['node'], b['args']['class']), 'actor', (e['ts'] - b['ts']) / 1000.0)
+        return table
+
+    def format_summary(self, table=None):
+        table = self.summary() if table is None else table
+        phases = ('tick', 'initialise', 'update', 'terminate', 'actor')
+        lines = [f'{"node":>32s} ' + ' '.join(f'{p:>22s}' for p in phases),
+                 f'{"":>32s} ' + ' '.join(f'{"count  total(ms)  max":>22s}' for _ in phases)]
+        def total(item):
+            return sum(s[1] for p, s in item[1].items() if p != 'tick')
+        for (name, cls), stats in sorted(table.items(), key=total, reverse=True):
+            cols = []
+            for p in phases:
+                s = stats.get(p)
+                cols.append(f'{s[0]:5d} {s[1]:10.1f} {s[2]:5.0f}' if s else f'{"-":>22s}')
+            lines.append(f'{name + " (" + cls + ")":>32s} ' + ' '.join(f'{c:>22s}' for c in cols))
+        return '\n'.join(lines)
+
+TRACER = Tracer()
@@ -0,0 +1,171 @@
+from itertools import count
+from threading import Lock
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+def iou_matrix(centers_a, sizes_a, centers_b, sizes_b):
+    """
+    IoU of every box pair
+    arg:
+        centers_*, sizes_*: (N, 2) box centers and (width, height)
+    return: (Na, Nb) IoU
+    """
+    a0 = centers_a - sizes_a / 2
+    a1 = centers_a + sizes_a / 2
+    b0 = centers_b - sizes_b / 2
+    b1 = centers_b + sizes_b / 2
+    lo = np.maximum(a0[:, None, :], b0[None, :, :])
+    hi = np.minimum(a1[:, None, :], b1[None, :, :])
+    inter = np.prod(np.clip(hi - lo, 0.0, None), axis=2)
+    area_a = np.prod(sizes_a, axis=1)
+    area_b = np.prod(sizes_b, axis=1)
+    union = area_a[:, None] + area_b[None, :] - inter
+    return np.where(union > 0.0, inter / np.where(union > 0.0, union, 1.0), 0.0)
+
+#
+## constant velocity Kalman filter on the box center
+##   state: [cx, cy, vx, vy] by pixels and pixels/sec
+#
+class Track:
+    H = np.array(((1.0, 0.0, 0.0, 0.0), (0.0, 1.0, 0.0, 0.0)))
+
+    def __init__(self, track_id, center, size, score, class_id, stamp, pos_var=25.0, vel_var=1e4):
+        self.id = track_id
+        self.stamp = stamp  # frame of the last matched detection (nanoseconds)
+        self.x = np.array((center[0], center[1], 0.0, 0.0))
+        self.P = np.diag((pos_var, pos_var, vel_var, vel_var))
+        self.size = np.array(size, dtype=float)
+        self.score = float(score)
+        self.class_id = int(class_id)
+        self.hits = 1
+        self.misses = 0
+
+    def predict(self, dt, q):
+        F = np.eye(4)
+        F[0, 2] = F[1, 3] = dt
+        # white acceleration noise
+        g = np.array((0.5*dt*dt, 0.5*dt*dt, dt, dt))
+        Q = np.diag(g * g) * q
+        self.x = F @ self.x
+        self.P = F @ self.P @ F.T + Q
+
+    def update(self, center, size, score, stamp, r, alpha):
+        H = self.H
+        y = np.asarray(center, dtype=float) - H @ self.x
+        S = H @ self.P @ H.T + np.eye(2) * r
+        K = self.P @ H.T @ np.linalg.inv(S)
+        self.x = self.x + K @ y
+        self.P = (np.eye(4) - K @ H) @ self.P
+        self.size += alpha * (np.asarray(size, dtype=float) - self.size)
+        self.score += alpha * (float(score) - self.score)
+        self.hits += 1
+        self.misses = 0
+        self.stamp = stamp
+
+    @property
+    def center(self):
+        return self.x[:2]
+
+#
+## multi frame tracker of 2D detections (IoU association + Kalman smoothing)
+##   fed by the detection subscription, queried by target selection in another thread
+#
+class DetectionTracker:
+    def __init__(self, iou_threshold=0.3, max_misses=5, min_hits=3,
+                 process_noise=1e4, measurement_noise=25.0, alpha=0.3):
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.q = process_noise
+        self.r = measurement_noise
+        self.alpha = alpha  # smoothing of size and score
+        self.lock = Lock()
+        self.tracks = []
+        self.ids = count(1)
+        self.names = {}  # class_id -> label of the fed detections
+        self.last_stamp = None
+        self.selected = None  # id of the last selected track
+
+    def update(self, batch, stamp):
+        """
+        feed one frame of detections
+        arg:
+            batch: DetectionBatch
+            stamp: frame stamp (nanoseconds)
+        """
+        with self.lock:
+            self.update_locked(batch, stamp)
+
+    def update_locked(self, batch, stamp):
+        self.names = batch.names
+        if self.last_stamp is not None and stamp <= self.last_stamp:
+            return
+        dt = 0.0 if self.last_stamp is None else (stamp - self.last_stamp) * 1e-9
+        self.last_stamp = stamp
+        for t in self.tracks:
+            t.predict(dt, self.q)
+
+        matched_t = set()
+        matched_d = set()
+        if self.tracks and len(batch):
+            centers = np.array([t.center for t in self.tracks])
+            sizes = np.array([t.size for t in self.tracks])
+            iou = iou_matrix(centers, sizes, batch.centers, batch.sizes)
+            # never associate different classes
+            iou[np.array([t.class_id for t in self.tracks])[:, None] != batch.class_ids[None, :]] = 0.0
+            rows, cols = linear_sum_assignment(1.0 - iou)
+            for ti, di in zip(rows, cols):
+                if iou[ti, di] < self.iou_threshold: continue
+                self.tracks[ti].update(batch.centers[di], batch.sizes[di], batch.scores[di], stamp, self.r, self.alpha)
+                matched_t.add(ti)
+                matched_d.add(di)
+
+        for ti, t in enumerate(self.tracks):
+            if ti not in matched_t:
+                t.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+        for di in range(len(batch)):
+            if di in matched_d: continue
+            self.tracks.append(Track(
+                next(self.ids), batch.centers[di], batch.sizes[di],
+                batch.scores[di], batch.class_ids[di], stamp, self.r))
+
+    def class_ids(self, label):
+        return [k for k, v in self.names.items() if v == label]
+
+    def stable(self, class_ids=None, min_score=0.0):
+        # confirmed tracks seen in the latest frame (call with lock held)
+        return [t for t in self.tracks
+                if t.hits >= self.min_hits and t.misses == 0 and t.score >= min_score
+                and (class_ids is None or t.class_id in class_ids)]
+
+    def select(self, x, y, class_ids=None, min_score=0.0):
+        """
+        stable track to work on: the previously selected one while it lives,
+        otherwise the one nearest to (x, y)
+        return: (id, center, score, stamp) of the track or None
+        """
+        with self.lock:
+            cand = self.stable(class_ids, min_score)
+            if not cand:
+                return None
+            target = None
+            for t in cand:
+                if t.id == self.selected: target = t
+            if target is None:
+                d = [np.hypot(t.center[0] - x, t.center[1] - y) for t in cand]
+                target = cand[int(np.argmin(d))]
+                self.selected = target.id
+            return target.id, target.center.copy(), target.score, target.stamp
+
+    def release(self):
+        # select afresh next time, e.g. after the base has moved and the image shifted
+        with self.lock:
+            self.selected = None
+
+    def reset(self):
+        with self.lock:
+            self.tracks = []
+            self.last_stamp = None
+            self.selected = None
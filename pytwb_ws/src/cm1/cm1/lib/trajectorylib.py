@@ -0,0 +1,97 @@
+from collections import OrderedDict
+from threading import Lock
+
+import numpy as np
+
+def joint_positions(joint_state, joint_names):
+    """
+    positions of joint_names from sensor_msgs/JointState
+    return: (N,) array or None when a joint is missing
+    """
+    if joint_state is None: return None
+    index = {n: i for i, n in enumerate(joint_state.name)}
+    try:
+        return np.array([joint_state.position[index[n]] for n in joint_names])
+    except (KeyError, IndexError):
+        return None
+
+#
+## planned joint trajectories of fixed configurations keyed by
+## quantized start state and goal, dropped when the planning scene changes
+#
+class TrajectoryCache:
+    def __init__(self, quantum=0.005, tolerance=0.01, size=32):
+        self.quantum = quantum  # quantization step of the key (rad)
+        self.tolerance = tolerance  # allowed start deviation of a replay (rad)
+        self.size = size
+        self.lock = Lock()
+        self.table = OrderedDict()  # key -> (trajectory, planning time)
+        self.reset_stats()
+
+    def key(self, start, goal):
+        q = self.quantum
+        return (tuple(np.round(np.asarray(start) / q).astype(int).tolist()),
+                tuple(np.round(np.asarray(goal) / q).astype(int).tolist()))
+
+    def get(self, start, goal):
+        """
+        cached trajectory from start to goal, None on a miss
+        the first point of the trajectory must be within tolerance of start
+        """
+        key = self.key(start, goal)
+        with self.lock:
+            entry = self.table.get(key)
+            if entry:
+                first = np.asarray(entry[0].points[0].positions)
+                if np.max(np.abs(first - np.asarray(start))) > self.tolerance:
+                    entry = None
+            if not entry:
+                self.misses += 1
+                return None
+            self.table.move_to_end(key)
+            self.hits += 1
+            self.saved += entry[1]
+            return entry[0]
+
+    def put(self, start, goal, trajectory, plan_time):
+        if not trajectory or not trajectory.points: return
+        # replay starts on receipt
+        trajectory.header.stamp.sec = 0
+        trajectory.header.stamp.nanosec = 0
+        with self.lock:
+            key = self.key(start, goal)
+            self.table[key] = (trajectory, plan_time)
+            self.table.move_to_end(key)
+            while len(self.table) > self.size:
+                self.table.popitem(last=False)
+            self.planning += plan_time
+
+    def drop(self, start, goal):
+        # remove an entry whose replay failed
+        with self.lock:
+            self.table.pop(self.key(start, goal), None)
+
+    def invalidate(self):
+        # collision scene changed, every trajectory has to be replanned
+        with self.lock:
+            self.table.clear()
+            self.invalidations += 1
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.saved = 0.0  # planning time avoided by replays (sec)
+        self.planning = 0.0  # planning time spent on misses (sec)
+        self.invalidations = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0,
+            'saved': self.saved,
+            'planning': self.planning,
+            'invalidations': self.invalidations,
+            'entries': len(self.table),
+        }
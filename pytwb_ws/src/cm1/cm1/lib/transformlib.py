@@ -0,0 +1,80 @@
+import numpy as np
+
+#
+## rigid transform applied to arrays of points at once
+#
+class RigidTransform:
+    __slots__ = ('rotation', 'translation')
+
+    def __init__(self, rotation=None, translation=None):
+        self.rotation = np.eye(3) if rotation is None else np.asarray(rotation, dtype=float)
+        self.translation = np.zeros(3) if translation is None else np.asarray(translation, dtype=float)
+
+    @classmethod
+    def from_quaternion(cls, qx, qy, qz, qw, tx=0.0, ty=0.0, tz=0.0):
+        n = qx*qx + qy*qy + qz*qz + qw*qw
+        s = 2.0 / n if n > 0.0 else 0.0
+        xx, yy, zz = qx*qx*s, qy*qy*s, qz*qz*s
+        xy, xz, yz = qx*qy*s, qx*qz*s, qy*qz*s
+        wx, wy, wz = qw*qx*s, qw*qy*s, qw*qz*s
+        rotation = np.array((
+            (1.0-yy-zz, xy-wz, xz+wy),
+            (xy+wz, 1.0-xx-zz, yz-wx),
+            (xz-wy, yz+wx, 1.0-xx-yy)))
+        return cls(rotation, (tx, ty, tz))
+
+    @classmethod
+    def from_msg(cls, trans):
+        """
+        build from geometry_msgs Transform or TransformStamped
+        """
+        if hasattr(trans, 'transform'):
+            trans = trans.transform
+        r = trans.rotation
+        t = trans.translation
+        return cls.from_quaternion(r.x, r.y, r.z, r.w, t.x, t.y, t.z)
+
+    @classmethod
+    def from_matrix(cls, matrix):
+        matrix = np.asarray(matrix, dtype=float)
+        return cls(matrix[:3, :3], matrix[:3, 3])
+
+    def matrix(self):
+        ret = np.eye(4)
+        ret[:3, :3] = self.rotation
+        ret[:3, 3] = self.translation
+        return ret
+
+    def apply(self, points):
+        """
+        transform points
+        arg:
+            points: (N, 3) or (3,) array like, (N, 2) is taken as z=0
+        return: array of the same shape with 3 columns
+        """
+        points = np.asarray(points, dtype=float)
+        single = points.ndim == 1
+        points = np.atleast_2d(points)
+        if points.shape[1] == 2:
+            points = np.column_stack((points, np.zeros(len(points))))
+        ret = points @ self.rotation.T + self.translation
+        return ret[0] if single else ret
+
+    def apply_point(self, x, y=0.0, z=0.0):
+        # scalar path, cheaper than numpy for a single point
+        r0, r1, r2 = self.rotation.tolist()
+        tx, ty, tz = self.translation.tolist()
+        return (
+            r0[0]*x + r0[1]*y + r0[2]*z + tx,
+            r1[0]*x + r1[1]*y + r1[2]*z + ty,
+            r2[0]*x + r2[1]*y + r2[2]*z + tz)
+
+    def inverse(self):
+        rt = self.rotation.T
+        return RigidTransform(rt, -(rt @ self.translation))
+
+    def __mul__(self, other):
+        # self after other
+        return RigidTransform(
+            self.rotation @ other.rotation,
+            self.rotation @ other.translation + self.translation)
@@ -0,0 +1,92 @@
+from threading import Condition
+from .clocklib import monotonic, sleep, wall
+
+import numpy as np
+
+WAIT_POLL = 0.02  # condition check interval (sec)
+
+def wait_condition(predicate, timeout, hold=0.0, poll=WAIT_POLL):
+    """
+    wait until predicate() holds for hold seconds
+    arg:
+        timeout: give up after (sec)
+    return: (met, waited seconds)
+    """
+    start = monotonic()
+    since = None
+    while True:
+        now = monotonic()
+        if predicate():
+            if since is None: since = now
+            if now - since >= hold:
+                return True, now - start
+        else:
+            since = None
+        if now - start >= timeout:
+            return False, now - start
+        sleep(poll)
+
+def wait_entry(name, met, waited, replaces):
+    # wait_log record, replaces: the fixed sleep the wait stands for (sec)
+    return {'wait': name, 'met': met, 'waited': waited, 'replaces': replaces}
+
+#
+## joint motion from sensor_msgs/JointState
+##   velocity field when published, finite difference of positions otherwise
+#
+class JointMotion:
+    def __init__(self, get_state, joint_names):
+        self.get_state = get_state
+        self.joint_names = joint_names
+        self.last = None  # (stamp, positions)
+        self.speed = None
+
+    def update(self):
+        """
+        return: max joint speed (rad/s or m/s), None until known
+        """
+        state = self.get_state()
+        if state is None: return self.speed
+        index = {n: i for i, n in enumerate(state.name)}
+        try:
+            idx = [index[n] for n in self.joint_names]
+        except KeyError:
+            return self.speed
+        if len(state.velocity) == len(state.name):
+            self.speed = float(np.max(np.abs(np.take(state.velocity, idx))))
+            return self.speed
+        stamp = state.header.stamp.sec + state.header.stamp.nanosec * 1e-9
+        positions = np.take(state.position, idx)
+        if self.last and stamp > self.last[0]:
+            self.speed = float(np.max(np.abs(positions - self.last[1]))) / (stamp - self.last[0])
+        if not self.last or stamp > self.last[0]:
+            self.last = (stamp, positions)
+        return self.speed
+
+    def settled(self, velocity):
+        speed = self.update()
+        return speed is not None and speed <= velocity
+
+#
+## latest signal of a topic (std_msgs/Bool, true only, or any message)
+#
+class TopicSignal:
+    def __init__(self):
+        self.received = None
+        self.cond = Condition()
+
+    # subscription callback
+    def push(self, msg):
+        if getattr(msg, 'data', True) is False: return
+        with self.cond:
+            self.received = monotonic()
+            self.cond.notify_all()
+
+    def wait_after(self, since, timeout):
+        """
+        wait for a signal received after since (monotonic sec)
+        return: True when signalled
+        """
+        with self.cond:
+            return self.cond.wait_for(
+                lambda: self.received is not None and self.received > since, wall(timeout))
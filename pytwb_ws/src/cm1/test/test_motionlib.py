@@ -0,0 +1,54 @@
+import os
+import sys
+from threading import Thread
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cm1'))
+from lib.motionlib import MotionTokens
+
+
+def run(tokens, token=None):
+    # cancelled() seen by a motion begun in another thread
+    seen = []
+    def motion():
+        with tokens.motion(token):
+            seen.append(tokens.cancelled())
+    thread = Thread(target=motion)
+    thread.start()
+    thread.join()
+    return seen[0]
+
+
+def test_cancel_before_begin_stops_the_motion():
+    tokens = MotionTokens()
+    token = tokens.issue()
+    assert tokens.cancel(token) is False  # not running yet
+    assert run(tokens, token) is True
+
+
+def test_late_cancel_leaves_the_next_motion():
+    tokens = MotionTokens()
+    abandoned = tokens.issue()
+    following = tokens.issue()
+    with tokens.motion(following):
+        assert tokens.cancel(abandoned) is False
+        assert tokens.cancelled() is False
+
+
+def test_cancel_of_running_motion():
+    tokens = MotionTokens()
+    token = tokens.issue()
+    with tokens.motion(token):
+        assert tokens.cancel(token) is True
+        # nested motions share the token
+        with tokens.motion() as inner:
+            assert inner == token
+            assert tokens.cancelled() is True
+
+
+def test_cancel_all_spares_later_motions():
+    tokens = MotionTokens()
+    with tokens.motion():
+        assert tokens.cancel() is True
+        assert tokens.cancelled() is True
+    assert run(tokens) is False
+    assert tokens.active == {}
@@ -0,0 +1,139 @@
+import os
+import sys
+from threading import Event, Lock
+from time import sleep
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'cm1'))
+from lib.flowlib import run_steps
+from lib.schedulelib import ResourceScheduler, TaskFailed
+
+TABLE = {
+    'drive': ('base',),
+    'turn': ('base',),
+    'home': ('arm',),
+    'look': ('camera', 'base', 'arm'),
+}
+
+class Recorder:
+    # runner recording start and end order, actors sleep for the given time
+    def __init__(self):
+        self.lock = Lock()
+        self.events = []
+
+    def __call__(self, name, duration=0.0, result=True, error=None):
+        with self.lock:
+            self.events.append(('start', name))
+        sleep(duration)
+        with self.lock:
+            self.events.append(('end', name))
+        if error:
+            raise error
+        return result
+
+    def index(self, event, name):
+        return self.events.index((event, name))
+
+
+@pytest.mark.parametrize('concurrent', [True, False])
+def test_shared_resource_keeps_order(concurrent):
+    runner = Recorder()
+    s = ResourceScheduler(runner, TABLE, concurrent)
+    s.start('drive', 0.05)
+    s.start('turn')
+    s.join()
+    assert runner.index('end', 'drive') < runner.index('start', 'turn')
+
+
+def test_independent_resources_overlap():
+    runner = Recorder()
+    s = ResourceScheduler(runner, TABLE)
+    s.start('drive', 0.1)
+    s.start('home', 0.1)
+    s.join()
+    assert runner.index('start', 'home') < runner.index('end', 'drive')
+
+
+def test_run_waits_for_every_resource():
+    runner = Recorder()
+    s = ResourceScheduler(runner, TABLE)
+    s.start('drive', 0.05)
+    s.start('home', 0.05)
+    assert s.run('look') is True
+    assert runner.index('start', 'look') > runner.index('end', 'drive')
+    assert runner.index('start', 'look') > runner.index('end', 'home')
+
+
+@pytest.mark.parametrize('concurrent', [True, False])
+def test_error_raised_at_next_start_on_resource(concurrent):
+    runner = Recorder()
+    s = ResourceScheduler(runner, TABLE, concurrent)
+    s.start('home', 0.02, error=RuntimeError('planning failed'))
+    # other resources are not affected
+    assert s.run('drive') is True
+    with pytest.raises(RuntimeError, match='planning failed'):
+        s.run('look')
+    assert ('start', 'look') not in runner.events
+    with pytest.raises(RuntimeError):
+        s.start('home')
+    with pytest.raises(RuntimeError):
+        s.join()
+
+
+def test_false_from_started_actor_is_failure():
+    s = ResourceScheduler(Recorder(), TABLE)
+    s.start('home', result=False)
+    with pytest.raises(TaskFailed):
+        s.run('home')
+
+
+def test_false_from_run_is_a_result():
+    s = ResourceScheduler(Recorder(), TABLE)
+    assert s.run('look', result=False) is False
+    assert s.run('look') is True
+
+
+def test_settle_waits_without_raising():
+    s = ResourceScheduler(Recorder(), TABLE)
+    s.start('home', 0.05, error=ValueError('x'))
+    task = s.start('drive', 0.05)
+    failed = s.settle()
+    assert task.done.is_set()
+    assert [t.name for t in failed] == ['home']
+
+
+def test_run_steps_waits_for_started_tasks_on_failure():
+    released = Event()
+
+    def runner(name, *args):
+        if name == 'drive':
+            released.wait(1.0)
+            return True
+        if name == 'home':
+            raise RuntimeError('arm error')
+        return True
+
+    def steps(s):
+        s.start('drive')
+        s.start('home')
+        sleep(0.05)
+        released.set()
+        s.run('look')
+        return True
+
+    s = ResourceScheduler(runner, TABLE)
+    assert run_steps(steps, s, 'test') is False
+    assert all(task.done.is_set() for task in s.tasks)
+
+
+def test_run_steps_early_return_joins():
+    runner = Recorder()
+
+    def steps(s):
+        s.start('drive', 0.05)
+        return False
+
+    s = ResourceScheduler(runner, TABLE)
+    assert run_steps(steps, s, 'test') is False
+    assert ('end', 'drive') in runner.events